@@ -1,15 +1,24 @@
 # app.py
-import random as rng
-import math
+import contextlib
+import hmac
+import os
 import time
-import base64
 import textwrap
-import copy
-from threading import Lock
 import pandas as pd
 import streamlit as st
-
-random = rng
+import streamlit.components.v1 as components
+
+from prognostico import engine, estilo, fragmentos, mesa, perfil, replay, servidor, tabelas
+from prognostico.cards import param_to_carta, peso_carta
+from prognostico.fragmentos import card_btn_html, carta_html
+from prognostico.engine import (
+    GameState,
+    ordem_da_mesa,
+    vencedor_da_vaza,
+)
+from prognostico.persistencia import SQLiteBackend
+from prognostico import salas
+from prognostico.salas import MAX_SALAS, SALA_TTL, RoomStore
 
 # =========================
 # CONFIG
@@ -17,6 +26,11 @@ random = rng
 
 st.set_page_config(page_title="Jogo de Prognóstico", page_icon="🃏", layout="wide")
 
+# tabelas de prognóstico dos bots: lidas do disco uma vez por processo
+tabelas.padrao()
+# HTML das 52 cartas e dos avatares: gerado uma vez, depois só consultado
+fragmentos.precarregar()
+
 # =========================
 # STATE INIT
 # =========================
@@ -53,6 +67,7 @@ def ss_init():
 
         "pontuou_rodada": False,
         "pending_play": None,
+        "memoria": None,
 
         "table_pop_until": 0.0,
         "winner_flash_name": None,
@@ -74,103 +89,151 @@ def ss_init():
         # visual
         "neon_mode": False,
         "hard_mode": False,
+        "expert_mode": False,
         "fast_mode": False,
         "online_mode": False,
         "room_code": "",
+        "room_snapshot": None,
+        "room_aviso": None,
         "player_name": "",
         "is_host": False,
         "players_online": [],
+        "semente_partida": None,
+        "replay_registro": None,
+        "css_variante": None,
+        "css_emitido_em": 0.0,
+        "rerun_n": 0,
+        "mesa_emissor": None,
+        "rerun_motivo": None,
+        "perfil_medicao": None,
     }
     for k, v in defaults.items():
         if k not in st.session_state:
             st.session_state[k] = v
 
 ss_init()
+st.session_state.rerun_n += 1
+
+
+# =========================
+# PERFIL DOS RERUNS
+# =========================
+# cada execução do script é medida (prognostico.perfil): o motivo vem do rerun
+# anterior, as fases são cronometradas com medir() e os bytes somados por canal
+@st.cache_resource
+def get_perfil():
+    return perfil.Perfil()
+
+
+def medir(fase: str):
+    medicao = st.session_state.get("perfil_medicao")
+    return medicao.fase(fase) if medicao is not None else contextlib.nullcontext()
+
+
+def contar_bytes(canal: str, n: int):
+    medicao = st.session_state.get("perfil_medicao")
+    if medicao is not None:
+        medicao.contar_bytes(canal, n)
+
+
+def encerrar_medicao(saida: str):
+    medicao = st.session_state.get("perfil_medicao")
+    if medicao is not None:
+        medicao.encerrar(saida)
+
+
+def markdown(body: str, **kwargs):
+    contar_bytes("markdown", len(body.encode("utf-8")))
+    st.markdown(body, **kwargs)
+
+
+def rerun(motivo: str):
+    """st.rerun anotando o motivo, que fica na medição da próxima execução."""
+    encerrar_medicao("rerun")
+    st.session_state.rerun_motivo = motivo
+    if hasattr(st, "rerun"):
+        st.rerun()
+    elif hasattr(st, "experimental_rerun"):
+        st.experimental_rerun()
+
+
+def parar():
+    encerrar_medicao("stop")
+    st.stop()
+
+
+_medicao_anterior = st.session_state.perfil_medicao
+if _medicao_anterior is not None and not _medicao_anterior.encerrada:
+    # cortada no meio (clique ou aviso de componente durante a execução)
+    _medicao_anterior.perfil.interrompida(_medicao_anterior)
+st.session_state.perfil_medicao = get_perfil().iniciar(st.session_state.rerun_motivo)
+st.session_state.rerun_motivo = None
 
 
 # =========================
 # ONLINE ROOM STORE
 # =========================
-ROOM_STATE_KEYS = [
-    "started",
-    "nomes",
-    "humanos",
-    "pontos",
-    "vazas_rodada",
-    "maos",
-    "rodada",
-    "cartas_inicio",
-    "cartas_alvo",
-    "sobras_monte",
-    "mao_da_rodada",
-    "mao_primeira_sorteada",
-    "fase",
-    "show_final",
-    "prognosticos",
-    "progn_turn_idx",
-    "ordem",
-    "turn_idx",
-    "naipe_base",
-    "mesa",
-    "primeira_vaza",
-    "copas_quebrada",
-    "pontuou_rodada",
-    "pending_play",
-    "table_pop_until",
-    "winner_flash_name",
-    "winner_flash_until",
-    "trick_pending",
-    "trick_phase",
-    "trick_resolve_at",
-    "trick_fly_until",
-    "trick_winner",
-    "trick_snapshot",
-    "pile_counts",
-    "autoplay_last",
-    "neon_mode",
-    "hard_mode",
-    "fast_mode",
-    "players_online",
-]
-
-
-class RoomStore:
-    def __init__(self):
-        self.lock = Lock()
-        self.rooms = {}
+ONLINE_WAIT_MS = 15000
+ONLINE_WAIT_SLICE_S = 0.5
+ONLINE_ACAO_TIMEOUT_S = 5.0
+
+# PROGNOSTICO_REPLAYS=pasta anota cada partida em pasta/*.plog (prognostico.replay)
+REPLAYS_DIR = os.environ.get("PROGNOSTICO_REPLAYS")
 
 
 @st.cache_resource
 def get_room_store():
-    return RoomStore()
+    # PROGNOSTICO_SALAS_DB=arquivo.db guarda as salas em SQLite, compartilhadas entre processos;
+    # com PROGNOSTICO_SALAS_UM_PROCESSO=1 (só este processo no arquivo) grava em lote
+    caminho = os.environ.get("PROGNOSTICO_SALAS_DB")
+    compartilhado = os.environ.get("PROGNOSTICO_SALAS_UM_PROCESSO") != "1"
+    return RoomStore(
+        backend=SQLiteBackend(caminho, compartilhado=compartilhado) if caminho else None,
+        ttl=float(os.environ.get("PROGNOSTICO_SALA_TTL", SALA_TTL)),
+        max_salas=int(os.environ.get("PROGNOSTICO_MAX_SALAS", MAX_SALAS)),
+    )
+
+
+@st.cache_resource
+def get_servidor():
+    return servidor.Servidor(get_room_store(), replays=REPLAYS_DIR)
+
+
+def enviar_acao(*acao):
+    """Manda a ação ao worker da sala, espera ele publicar o resultado e reroda."""
+    sync_to_room()
+    pedido = get_servidor().enviar(st.session_state.room_code, acao)
+    with medir("espera"):
+        respondeu = pedido.esperar(ONLINE_ACAO_TIMEOUT_S)
+    if not respondeu:
+        st.session_state.room_aviso = "O servidor ainda não respondeu; a jogada continua na fila."
+    elif pedido.erro:
+        st.session_state.room_aviso = f"Jogada recusada: {pedido.erro}."
+        if acao[0] == servidor.NOVA_PARTIDA:
+            # a sala não foi criada: volta para a configuração
+            st.session_state.started = False
+            st.session_state.room_aviso = f"Não foi possível criar a partida: {pedido.erro}."
+    rerun("acao_online")
 
 
 def get_room_state(code: str):
+    """Estado publicado da sala, compartilhado entre os clientes: só leitura."""
     if not code:
         return None
-    store = get_room_store()
-    with store.lock:
-        data = store.rooms.get(code)
-        return copy.deepcopy(data) if data else None
+    snap = get_room_store().get(code)
+    return snap.state if snap else None
 
 
-def save_room_state(code: str, state: dict):
-    if not code:
-        return
-    store = get_room_store()
-    with store.lock:
-        store.rooms[code] = copy.deepcopy(state)
+def room_base(code: str):
+    """Último snapshot desta sala que a sessão viu ou publicou."""
+    return salas.base_da_sessao(st.session_state, code)
 
 
 def sync_from_room():
     if not st.session_state.online_mode or not st.session_state.room_code:
         return
-    room_state = get_room_state(st.session_state.room_code)
-    if not room_state:
-        return
-    for key in ROOM_STATE_KEYS:
-        if key in room_state:
-            st.session_state[key] = room_state[key]
+    with medir("sync_from_room"):
+        salas.puxar(get_room_store(), st.session_state, st.session_state.room_code, jogador=st.session_state.player_name)
 
 
 def sync_to_room():
@@ -178,32 +241,49 @@ def sync_to_room():
         return
     if not st.session_state.is_host and not st.session_state.started:
         return
-    state = {key: copy.deepcopy(st.session_state.get(key)) for key in ROOM_STATE_KEYS}
-    save_room_state(st.session_state.room_code, state)
+    with medir("sync_to_room"):
+        ok, perdidas = salas.empurrar(
+            get_room_store(), st.session_state, st.session_state.room_code, jogador=st.session_state.player_name
+        )
+    if not ok:
+        st.session_state.room_aviso = "A sala mudou várias vezes seguidas; suas alterações não foram salvas."
+    elif perdidas:
+        st.session_state.room_aviso = "Outro jogador mexeu na sala ao mesmo tempo; valeu a versão da sala para: " + ", ".join(sorted(perdidas)) + "."
 
-def rerun_with_room_sync():
+def rerun_with_room_sync(motivo: str):
     sync_to_room()
-    if hasattr(st, "rerun"):
-        st.rerun()
-    elif hasattr(st, "experimental_rerun"):
-        st.experimental_rerun()
+    rerun(motivo)
 
 def stop_with_room_sync():
     sync_to_room()
     if hasattr(st, "stop"):
-        st.stop()
+        parar()
 
 def online_autorefresh(interval_ms: int, key: str):
-    interval_s = max(interval_ms / 1000.0, 0.2)
-    last = st.session_state.get("online_last_refresh", 0.0)
-    now = time.time()
-    if now - last >= interval_s:
-        st.session_state.online_last_refresh = now
-        time.sleep(interval_s)
-        if hasattr(st, "rerun"):
-            st.rerun()
-        elif hasattr(st, "experimental_rerun"):
-            st.experimental_rerun()
+    """Espera a sala mudar e reroda; sem mudança, reroda depois de interval_ms.
+
+    Confere a versão primeiro e só então bloqueia no aviso da sala, em fatias
+    de ONLINE_WAIT_SLICE_S: entre uma fatia e outra o placeholder é limpo, o
+    que deixa o Streamlit interromper a espera quando o usuário clica.
+    """
+    if not st.session_state.online_mode or not st.session_state.room_code:
+        return
+    code = st.session_state.room_code
+    base = room_base(code)
+    since = base.version if base else 0
+    store = get_room_store()
+    placeholder = st.empty()
+    prazo = time.time() + max(interval_ms / 1000.0, 0.2)
+    with medir("espera"):
+        while True:
+            restante = prazo - time.time()
+            if restante <= 0:
+                break
+            snap = store.wait(code, since, min(restante, ONLINE_WAIT_SLICE_S))
+            if snap is not None and snap.version > since:
+                break
+            placeholder.empty()
+    rerun(f"online:{key}")
 
 
 if not hasattr(st, "autorefresh"):
@@ -216,483 +296,28 @@ if not hasattr(st, "autorefresh"):
 # CSS
 # =========================
 def inject_css(neon: bool):
-    if neon:
-        bg1 = "#06040d"
-        bg2 = "#02030a"
-        stroke = "rgba(0,255,210,.22)"
-        card_glass = "rgba(8,12,18,.55)"
-        top_glow = "rgba(0,255,210,.08)"
-        felt1 = "rgba(0,120,90,1)"
-        felt2 = "rgba(0,60,45,1)"
-        mesa_border = "rgba(0,255,210,.18)"
-        pill_bg = "rgba(0,255,210,.08)"
-        pill_border = "rgba(0,255,210,.18)"
-        text_main = "rgba(240,255,252,.92)"
-        text_sub = "rgba(240,255,252,.84)"
-        seat_bg = "rgba(10,14,20,.70)"
-        seat_border = "rgba(0,255,210,.16)"
-        card_face_bg = "linear-gradient(180deg, rgba(255,255,255,.95) 0%, rgba(248,248,248,.92) 100%)"
-        card_face_border = "1px solid rgba(255,255,255,.22)"
-        card_shadow = "0 14px 30px rgba(0,0,0,.38)"
-    else:
-        bg1 = "#0b1220"
-        bg2 = "#0a1a14"
-        stroke = "rgba(255,255,255,.14)"
-        card_glass = "rgba(255,255,255,.10)"
-        top_glow = "rgba(255,255,255,.18)"
-        felt1 = "rgba(16,110,70,1)"
-        felt2 = "rgba(8,60,40,1)"
-        mesa_border = "rgba(255,255,255,.14)"
-        pill_bg = "rgba(255,255,255,.08)"
-        pill_border = "rgba(255,255,255,.16)"
-        text_main = "rgba(255,255,255,.92)"
-        text_sub = "rgba(255,255,255,.82)"
-        seat_bg = "rgba(255,255,255,.88)"
-        seat_border = "rgba(0,0,0,.10)"
-        card_face_bg = "linear-gradient(180deg, #ffffff 0%, #f8f8f8 100%)"
-        card_face_border = "1px solid rgba(0,0,0,.14)"
-        card_shadow = "0 10px 22px rgba(0,0,0,.12)"
-
-    css = f"""
-<style>
-:root {{
-  --app-max: 1200px;
-  --pad: .92rem;
-  --dock-h: 210px;
-
-  --bg1: {bg1};
-  --bg2: {bg2};
-  --stroke: {stroke};
-  --cardglass: {card_glass};
-
-  --textMain: {text_main};
-  --textSub: {text_sub};
-
-  --pillBg: {pill_bg};
-  --pillBorder: {pill_border};
-
-  --mesaBorder: {mesa_border};
-  --felt1: {felt1};
-  --felt2: {felt2};
-
-  --seatBg: {seat_bg};
-  --seatBorder: {seat_border};
-
-  --cardFaceBg: {card_face_bg};
-  --cardFaceBorder: {card_face_border};
-  --cardShadow: {card_shadow};
-
-  --shadow: 0 18px 44px rgba(0,0,0,.28);
-  --shadow2: 0 14px 34px rgba(0,0,0,.22);
-
-  --hand-card-w: 86px;
-  --hand-card-h: 118px;
-}}
-
-header[data-testid="stHeader"] {{
-  background: transparent !important;
-  height: 0px !important;
-}}
-div[data-testid="stToolbar"] {{ display:none !important; }}
-
-[data-testid="stAppViewContainer"] {{
-  background:
-    radial-gradient(1200px 700px at 15% 10%, rgba(56,189,248,.10), transparent 55%),
-    radial-gradient(900px 600px at 80% 35%, rgba(34,197,94,.10), transparent 55%),
-    linear-gradient(180deg, var(--bg1) 0%, var(--bg2) 100%);
-}}
-
-.block-container {{
-  padding-top: calc(var(--pad) + 18px) !important;
-  padding-bottom: var(--pad) !important;
-  max-width: var(--app-max);
-}}
-
-[data-testid="stVerticalBlock"] {{ gap: .55rem; }}
-
-html, body, [class*="css"] {{
-  letter-spacing: .1px;
-}}
-
-.titleRow {{
-  display:flex;
-  align-items:center;
-  justify-content:center;
-  margin: 10px 0 10px 0;
-}}
-.titleRow h1 {{
-  margin:0;
-  font-size: 30px;
-  font-weight: 950;
-  letter-spacing: .04em;
-  text-transform: uppercase;
-  color: #D4AF37 !important;
-  text-shadow: 0 2px 6px rgba(0,0,0,.35);
-}}
-
-/* grupo de pills dentro da topbar */
-.pillGroup{{
-  display:flex;
-  gap:8px;
-  flex-wrap:wrap;
-  justify-content:flex-end;
-  align-items:center;
-}}
-
-/* pills “secundárias” (regras) um pouco mais discretas */
-.pillSoft{{
-  opacity:.98;
-}}
-
-/* em telas menores, quebra melhor */
-@media (max-width: 900px){{
-  .pillGroup{{ justify-content:flex-start; }}
-}}
-
-.topbar {{
-  position: sticky;
-  top: .65rem;
-  z-index: 60;
-
-  border-radius: 26px;
-  border: 1px solid var(--stroke);
-  background: rgba(255,255,255,.2 8);
-  backdrop-filter: blur(16px);
-
-  box-shadow: var(--shadow2);
-  padding: 14px 16px;
-  margin-bottom: 14px;
-
-  display:flex;
-  align-items:center;
-  justify-content:space-between;
-  gap: 12px;
-}}
-
-.topbar:before {{
-  content:"";
-  position:absolute; inset:0;
-  border-radius: 26px;
-  background: radial-gradient(circle at 20% 10%, {top_glow}, transparent 40%);
-  pointer-events:none;
-}}
-
-.topLeft{{ display:flex; flex-direction:column; gap:4px; min-width: 210px; }}
-.topTitle{{ font-weight: 950; font-size: 14px; color: var(--textMain); }}
-.topSub{{ font-weight: 800; font-size: 12px; color: var(--textSub); }}
-
-.topRight{{
-  display:flex;
-  gap:8px;
-  flex-wrap:wrap;
-  justify-content:flex-end;
-  align-items:center;
-  max-width: 780px;
-}}
-
-.pill {{
-  display:inline-flex;
-  align-items:center;
-  gap:7px;
-  padding:7px 10px;
-  border-radius:999px;
-  border:1px solid var(--pillBorder);
-  background: linear-gradient(180deg, rgba(255,255,255,.10), rgba(255,255,255,.06));
-  color: var(--textMain);
-  font-weight: 900;
-  font-size: 12px;
-  white-space: nowrap;
-}}
-
-.menuCard {{
-  border-radius: 18px;
-  border: 1px solid var(--stroke);
-  background: rgba(255,255,255,.07);
-  backdrop-filter: blur(10px);
-  box-shadow: var(--shadow2);
-  padding: 10px 12px;
-  margin-top: 0;
-}}
-.menuHint {{
-  color: var(--textSub);
-  font-weight: 800;
-  font-size: 12px;
-}}
-
-.scoreItem{{
-  display:flex; justify-content:space-between;
-  padding:8px 10px;
-  border-radius:12px;
-  border:1px solid rgba(255,255,255,.10);
-  background: rgba(255,255,255,.08);
-  margin-bottom:8px;
-  color: var(--textMain);
-}}
-.scoreName{{ font-weight:900; }}
-.scorePts{{ font-weight:900; }}
-.smallMuted{{ opacity:.70; font-size:12px; color: var(--textSub); }}
-
-.mesaWrap{{ margin-top: 6px; margin-bottom: 0; }}
-.mesa{{
-  border-radius: 50% / 46%;
-  border: 1px solid transparent;
-  background: #0f7a4a !important;
-  height: 470px;
-  position: relative;
-  overflow: hidden;
-  box-shadow: var(--shadow);
-  isolation: isolate;
-}}
-
-.mesa:before{{
-  content:"";
-  position:absolute; inset:0;
-  border-radius: 50% / 46%;
-  box-shadow:
-    inset 0 0 0 26px #5a3a1e,
-    inset 0 0 0 38px #b22222,
-    inset 0 0 0 44px #d4af37,
-    0 16px 32px rgba(0,0,0,.25);
-  opacity:1;
-  pointer-events:none;
-  z-index: 1;
-}}
-.mesaCenter{{
-  position:absolute; inset:0;
-  display:flex; align-items:center; justify-content:center;
-  font-weight:900; opacity:.55;
-  pointer-events:none;
-  text-transform: uppercase;
-  letter-spacing: .08em;
-  color: rgba(255,255,255,.90);
-  z-index: 3;
-}}
-
-.seat{{
-  position:absolute;
-  padding:6px 10px;
-  border-radius:999px;
-  background: var(--seatBg);
-  border:1px solid var(--seatBorder);
-  font-size:12px;
-  white-space:nowrap;
-  z-index: 25;
-  display:flex;
-  align-items:center;
-  gap:8px;
-  color: rgba(240,255,252,.92);
-}}
-.seat.you{{ outline:2px solid rgba(34,197,94,.55); font-weight:900; }}
-.seat.dealer{{ border-color: rgba(34,197,94,.35); }}
-.seat.active{{ outline: 3px solid rgba(251,191,36,.9); box-shadow: 0 0 18px rgba(251,191,36,.45); }}
-.avatarImg{{
-  width:26px; height:26px;
-  border-radius:50%;
-  border: 1px solid rgba(0,0,0,.12);
-  background: rgba(0,0,0,.04);
-  box-shadow: 0 6px 12px rgba(0,0,0,.10);
-  flex: 0 0 auto;
-}}
-
-@keyframes winnerGlow {{
-  0% {{ box-shadow: 0 0 0 rgba(0,0,0,0); transform: translate(-50%,-50%) scale(1); }}
-  35% {{ box-shadow: 0 0 0 6px rgba(34,197,94,.22), 0 14px 28px rgba(0,0,0,.14); transform: translate(-50%,-50%) scale(1.03); }}
-  100% {{ box-shadow: 0 0 0 0 rgba(0,0,0,0); transform: translate(-50%,-50%) scale(1); }}
-}}
-.seat.winnerFlash{{
-  animation: winnerGlow 1.2s ease-out;
-  outline: 2px solid rgba(34,197,94,.55);
-  background: rgba(255,255,255,.97);
-}}
-
-.playCard{{ position:absolute; transform: translate(-50%,-50%); pointer-events:none; z-index: 18; }}
-@keyframes popIn {{
-  0% {{ transform: translate(-50%,-50%) scale(.92); opacity: 0; }}
-  100% {{ transform: translate(-50%,-50%) scale(1); opacity: 1; }}
-}}
-.playCard.pop{{ animation: popIn .16s ease-out; }}
-
-.card{{
-  width:70px;
-  height:102px;
-  border-radius:14px;
-  border:1px solid rgba(0,0,0,.16);
-  background: linear-gradient(180deg, #ffffff 0%, #f8f8f8 100%);
-  box-shadow: 0 10px 22px rgba(0,0,0,.12);
-  position:relative;
-  user-select:none;
-}}
-.card .tl{{ position:absolute; top:7px; left:7px; font-weight:900; font-size:13px; line-height:13px; }}
-.card .br{{ position:absolute; bottom:7px; right:7px; font-weight:900; font-size:13px; line-height:13px; transform:rotate(180deg); }}
-.card .mid{{ position:absolute; inset:0; display:flex; align-items:center; justify-content:center; font-size:30px; font-weight:900; opacity:.92; }}
-
-.chipWrap{{ position:absolute; transform: translate(-50%,-50%); z-index: 30; pointer-events:none; }}
-.chipRow{{ display:flex; gap:6px; flex-wrap:wrap; justify-content:center; align-items:center; max-width: 140px; }}
-.chipMini{{
-  width:22px; height:22px;
-  border-radius:50%;
-  position:relative;
-  box-shadow: 0 8px 14px rgba(0,0,0,.14);
-  border: 2px solid rgba(0,0,0,.14);
-  background:
-    radial-gradient(circle at 30% 25%, rgba(255,255,255,.35), rgba(255,255,255,0) 45%),
-    conic-gradient(from 0deg,
-      rgba(255,255,255,0) 0 18deg,
-      rgba(255,255,255,.70) 18deg 28deg,
-      rgba(255,255,255,0) 28deg 54deg,
-      rgba(255,255,255,.70) 54deg 64deg,
-      rgba(255,255,255,0) 64deg 90deg,
-      rgba(255,255,255,.70) 90deg 100deg,
-      rgba(255,255,255,0) 100deg 126deg,
-      rgba(255,255,255,.70) 126deg 136deg,
-      rgba(255,255,255,0) 136deg 162deg,
-      rgba(255,255,255,.70) 162deg 172deg,
-      rgba(255,255,255,0) 172deg 198deg,
-      rgba(255,255,255,.70) 198deg 208deg,
-      rgba(255,255,255,0) 208deg 234deg,
-      rgba(255,255,255,.70) 234deg 244deg,
-      rgba(255,255,255,0) 244deg 270deg,
-      rgba(255,255,255,.70) 270deg 280deg,
-      rgba(255,255,255,0) 280deg 306deg,
-      rgba(255,255,255,.70) 306deg 316deg,
-      rgba(255,255,255,0) 316deg 342deg,
-      rgba(255,255,255,.70) 342deg 352deg,
-      rgba(255,255,255,0) 352deg 360deg
-    );
-  background-color: var(--chip-base, rgba(16,185,129,.88));
-}}
-.chipMini:after{{
-  content:"";
-  position:absolute;
-  inset:5px;
-  border-radius:50%;
-  background: rgba(255,255,255,.78);
-  border: 1px solid rgba(0,0,0,.10);
-}}
-.chipNote{{
-  margin-top: 6px;
-  font-size: 10px;
-  font-weight: 900;
-  opacity: .85;
-  color: #111827;
-  background: rgba(255,255,255,.86);
-  border: 1px solid rgba(0,0,0,.08);
-  padding: 3px 8px;
-  border-radius: 999px;
-  display:inline-flex;
-  align-items:center;
-  justify-content:center;
-  min-width: 18px;
-}}
-
-.pileWrap{{ position:absolute; transform: translate(-50%,-50%); z-index: 15; }}
-.pileStack{{ position:relative; width:26px; height:40px; }}
-.cardBackLayer{{
-  position:absolute;
-  width:26px; height:40px;
-  border-radius:8px;
-  border:1px solid rgba(0,0,0,.18);
-  background: linear-gradient(180deg, rgba(12,110,80,.95) 0%, rgba(7,86,64,.95) 100%);
-  box-shadow: 0 6px 10px rgba(0,0,0,.12);
-  overflow:hidden;
-}}
-.cardBackLayer:before{{
-  content:"";
-  position:absolute; inset:-28%;
-  background: repeating-linear-gradient(45deg, rgba(255,255,255,.12) 0 8px, rgba(255,255,255,0) 8px 16px);
-  transform: rotate(14deg);
-}}
-.pileLabel{{
-  margin-top:4px;
-  text-align:center;
-  font-weight:900;
-  font-size:10px;
-  opacity:.74;
-  color: rgba(255,255,255,.92);
-  text-shadow: 0 2px 6px rgba(0,0,0,.25);
-}}
-
-.handDock{{
-  margin-top: 0;
-  border-radius: 18px;
-  border: none;
-  background: transparent;
-  backdrop-filter: none;
-  box-shadow: none;
-  padding: 12px;
-}}
-.handTitle{{ display:flex; align-items:center; justify-content:space-between; gap:12px; margin-bottom: 6px; }}
-.handTitle h3{{ margin:0; font-size:16px; color: var(--textMain); }}
-.hint{{ font-size:12px; opacity:.72; font-weight:800; color: var(--textSub); }}
-
-.handDock div[data-testid="column"]{{
-  position: relative;
-  min-height: var(--hand-card-h);
-}}
-.handDock .cardLink{{
-  width: var(--hand-card-w);
-  height: var(--hand-card-h);
-  margin: 0 auto;
-  display: block;
-  text-decoration: none;
-  color: inherit;
-  transition: transform .10s ease, filter .10s ease;
-}}
-.handDock .cardLink:hover{{
-  transform: translateY(-4px);
-  filter: drop-shadow(0 14px 22px rgba(0,0,0,.20));
-}}
-.handDock .cardLink.is-disabled{{
-  opacity: .28;
-  pointer-events: none;
-  transform:none;
-  filter:none;
-}}
-.handDock .cardLink.is-disabled:hover{{
-  transform:none;
-  filter:none;
-}}
-
-
-.cardBtnInner{{
-  width: var(--hand-card-w) !important;
-  height: var(--hand-card-h) !important;
-  border-radius: 14px;
-  overflow:hidden;
-  background: var(--cardFaceBg);
-  border: var(--cardFaceBorder);
-  box-shadow: var(--cardShadow);
-  position: relative;
-}}
-.cardBtnTL{{ position:absolute; top:10px; left:10px; font-weight:900; font-size:14px; line-height:14px; }}
-.cardBtnBR{{ position:absolute; bottom:10px; right:10px; font-weight:900; font-size:14px; line-height:14px; transform: rotate(180deg); }}
-.cardBtnMid{{ position:absolute; inset:0; display:flex; align-items:center; justify-content:center; font-size:34px; font-weight:900; opacity:.92; }}
-
-@keyframes flyAway {{
-  0%   {{ transform: translateY(0px) scale(1); opacity: 1; }}
-  55%  {{ transform: translateY(-26px) scale(1.03); opacity: .85; }}
-  100% {{ transform: translateY(-70px) scale(.96); opacity: 0; }}
-}}
-.flyAway{{ animation: flyAway .25s ease-in forwards; }}
-
-@media (max-width: 900px){{
-  :root{{ --pad: .62rem; --dock-h: 230px; }}
-  .block-container{{ padding-left: .55rem !important; padding-right: .55rem !important; }}
-  .titleRow h1{{ font-size: 22px; }}
-  .mesa{{ height: calc(100vh - 70px - var(--dock-h) - 24px); min-height: 340px; }}
-  .mesaWrap{{ margin-bottom: calc(var(--dock-h) + 10px); }}
-  .handDock{{ position: fixed; left: .55rem; right: .55rem; bottom: .55rem; margin-top: 0 !important; z-index: 80; }}
-  .card{{ width:62px; height:92px; border-radius: 13px; }}
-  .card .mid{{ font-size: 26px; }}
-  .topbar{{ flex-direction:column; align-items:flex-start; }}
-  .topRight{{ justify-content:flex-start; max-width: 100%; }}
-}}
-</style>
-"""
-    st.markdown(css, unsafe_allow_html=True)
+    """Instala o CSS no <head> da página; só reenvia quando a variante muda."""
+    agora = time.time()
+    if st.session_state.css_variante != neon:
+        st.session_state.css_variante = neon
+        st.session_state.css_emitido_em = agora
+    if agora - st.session_state.css_emitido_em <= estilo.CONFIRMA_S:
+        instalador = estilo.instalador(neon)
+        contar_bytes("css", len(instalador.encode("utf-8")))
+        components.html(instalador, height=0)
 
 inject_css(st.session_state.neon_mode)
 
+# =========================
+# COMPONENTE DA MESA
+# =========================
+# prognostico/componentes/mesa: guarda a mesa no navegador e troca só as regiões que mudaram
+mesa_componente = components.declare_component("mesa", path=mesa.COMPONENTE_DIR)
+MESA_COMPONENTE_KEY = "mesa_componente"
+# sem o aviso do componente (aba em segundo plano, iframe recriado) a vaza é recolhida pelo relógio
+VAZA_FOLGA_S = 0.6
+VAZA_ESPERA_SLICE_S = 0.25
+
 # =========================
 # HUMAN HELPERS
 # =========================
@@ -723,6 +348,8 @@ def current_human_turn():
     if not ordem:
         return None
     atual = ordem[st.session_state.turn_idx]
+    if st.session_state.online_mode and atual != st.session_state.player_name:
+        return None
     return atual if is_human(atual) else None
 
 # =========================
@@ -735,7 +362,7 @@ def handle_card_query_param():
     carta = param_to_carta(param)
     if param and not carta:
         st.query_params.pop("play", None)
-        st.rerun()
+        rerun("query_param")
     if not carta:
         return
     st.query_params.pop("play", None)
@@ -751,7 +378,7 @@ def handle_card_query_param():
         and (not st.session_state.trick_pending)
     ):
         st.session_state.pending_play = carta
-    st.rerun()
+    rerun("query_param")
     
 # =========================
 # ONLINE MODE SYNC
@@ -764,50 +391,15 @@ if st.session_state.online_mode and st.session_state.started:
             sync_to_room()
 
     if st.button("🔄 Atualizar sala", use_container_width=True, key="online_manual_refresh"):
-        rerun_with_room_sync()
+        rerun_with_room_sync("atualizar_sala")
 
-# =========================
-# BARALHO / REGRAS
-# =========================
-VALORES = [2,3,4,5,6,7,8,9,10,"J","Q","K","A"]
-PESO_VALOR = {v:i for i,v in enumerate(VALORES)}
-COR_NAIPE = {"♦":"#C1121F", "♥":"#C1121F", "♠":"#111827", "♣":"#111827"}
-ORDEM_NAIPE = {"♦":0, "♠":1, "♣":2, "♥":3}
-TRUNFO = "♥"
-HIGH_POINTS = {"A": 1.40, "K": 1.05, "Q": 0.80, "J": 0.55, 10: 0.35, 9: 0.20}
+    if st.session_state.room_aviso:
+        st.warning(st.session_state.room_aviso)
+        st.session_state.room_aviso = None
 
 # =========================
-# QUERY PARAMS
+# BARALHO / REGRAS
 # =========================
-NAIPE_PARAM = {"♠": "S", "♦": "D", "♣": "C", "♥": "H"}
-PARAM_NAIPE = {v: k for k, v in NAIPE_PARAM.items()}
-
-
-def carta_to_param(carta):
-    naipe, valor = carta
-    return f"{valor}{NAIPE_PARAM[naipe]}"
-
-
-def param_to_carta(param):
-    if not param:
-        return None
-    naipe = PARAM_NAIPE.get(param[-1])
-    if not naipe:
-        return None
-    valor_raw = param[:-1]
-    valor = int(valor_raw) if valor_raw.isdigit() else valor_raw
-    if valor not in VALORES:
-        return None
-    return (naipe, valor)
-
-def criar_baralho():
-    naipes = ["♠", "♦", "♣", "♥"]
-    return [(n, v) for n in naipes for v in VALORES]
-
-def peso_carta(c):
-    naipe, valor = c
-    return (ORDEM_NAIPE[naipe], PESO_VALOR[valor])
-
 def safe_peso_carta(c):
     key_fn = globals().get("peso_carta")
     if callable(key_fn):
@@ -816,147 +408,53 @@ def safe_peso_carta(c):
 def valor_str(v):
     return str(v)
 
-def carta_html(c):
-    naipe, valor = c
-    cor = COR_NAIPE[naipe]
-    vv = valor_str(valor)
-    return (
-        f'<div class="card">'
-        f'<div class="tl" style="color:{cor};">{vv}<br/>{naipe}</div>'
-        f'<div class="mid" style="color:{cor};">{naipe}</div>'
-        f'<div class="br" style="color:{cor};">{vv}<br/>{naipe}</div>'
-        f'</div>'
-    )
-
-def card_btn_html(carta, extra_class=""):
-    """Gera o HTML da carta para o botão."""
-    naipe, valor = carta
-    cor = COR_NAIPE[naipe]
-    vv = valor_str(valor)
-    return (
-        f'<div class="cardBtnInner {extra_class}">'
-        f'<div class="cardBtnTL" style="color:{cor};">{vv}<br/>{naipe}</div>'
-        f'<div class="cardBtnMid" style="color:{cor};">{naipe}</div>'
-        f'<div class="cardBtnBR" style="color:{cor};">{vv}<br/>{naipe}</div>'
-        f'</div>'
-    )
-
-# =========================
-# UTIL
-# =========================
-def ordem_da_mesa(nomes, mao_idx):
-    return [nomes[(mao_idx + i) % len(nomes)] for i in range(len(nomes))]
-
-def somente_trunfo(mao):
-    return all(n == TRUNFO for (n, _) in mao) if mao else False
-
-def tem_naipe(mao, naipe):
-    return any(n == naipe for (n, _) in mao)
-
-# =========================
-# AVATAR
-# =========================
-def avatar_svg_data_uri(idx: int) -> str:
-    skins = ["#F6D3B3", "#E9BE9D", "#D9A074", "#C6865F"]
-    hairs = ["#2F2F2F", "#5B3A29", "#C8A14A", "#7A4B2B", "#1F2937"]
-    shirts = ["#60A5FA", "#F59E0B", "#34D399", "#F472B6", "#A78BFA", "#FB7185", "#22C55E"]
-    bg = ["#E0F2FE", "#ECFDF5", "#FFF7ED", "#FDF2F8", "#EEF2FF", "#F1F5F9"]
-    skin = skins[idx % len(skins)]
-    hair = hairs[idx % len(hairs)]
-    shirt = shirts[idx % len(shirts)]
-    b = bg[idx % len(bg)]
-
-    svg = f"""
-<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64" viewBox="0 0 64 64">
-  <defs>
-    <filter id="s" x="-20%" y="-20%" width="140%" height="140%">
-      <feDropShadow dx="0" dy="2" stdDeviation="2" flood-color="#000" flood-opacity=".18"/>
-    </filter>
-  </defs>
-  <circle cx="32" cy="32" r="30" fill="{b}" filter="url(#s)"/>
-  <path d="M14 58c3-13 14-16 18-16s15 3 18 16" fill="{shirt}"/>
-  <rect x="28" y="36" width="8" height="10" rx="4" fill="{skin}"/>
-  <circle cx="32" cy="28" r="16" fill="{skin}"/>
-  <path d="M16 28c2-12 10-18 16-18s14 6 16 18c-4-7-10-9-16-9s-12 2-16 9z" fill="{hair}"/>
-  <circle cx="26" cy="28" r="2.2" fill="#111827"/>
-  <circle cx="38" cy="28" r="2.2" fill="#111827"/>
-  <path d="M26 34c2.2 2 4.4 3 6 3s3.8-1 6-3" fill="none" stroke="#111827" stroke-width="2" stroke-linecap="round"/>
-  <circle cx="22" cy="33" r="2.1" fill="#EAA5A5"/>
-  <circle cx="42" cy="33" r="2.1" fill="#EAA5A5"/>
-</svg>
-"""
-    svg_b64 = base64.b64encode(svg.encode("utf-8")).decode("ascii")
-    return f"data:image/svg+xml;base64,{svg_b64}"
-
-# =========================
-# IA
-# =========================
-def ai_prognostico(mao, cartas_por_jogador: int, hard_mode: bool = False, *_args, **_kwargs) -> int:
-    hard_mode = st.session_state.get("hard_mode", hard_mode)
-    if not mao:
-        return 0
-    suit_counts = {"♠": 0, "♦": 0, "♣": 0, "♥": 0}
-    for n, v in mao:
-        suit_counts[n] += 1
-    trumps = suit_counts["♥"]
-    strength = 0.0
-    strength += trumps * 0.95
-    for n, v in mao:
-        base = HIGH_POINTS.get(v, 0.0)
-        strength += base * (1.35 if n == "♥" else 1.00)
-    for s in ["♠", "♦", "♣"]:
-        c = suit_counts[s]
-        if c == 0:
-            strength += 0.55 + (0.25 if trumps >= 2 else 0.0)
-        elif c == 1:
-            strength += 0.30 + (0.18 if trumps >= 2 else 0.0)
-        elif c == 2:
-            strength += 0.12
-    distinct_nontrump_suits = sum(1 for s in ["♠", "♦", "♣"] if suit_counts[s] > 0)
-    if trumps == 0 and distinct_nontrump_suits >= 3:
-        strength -= 0.25
-    divisor = 2.25 if hard_mode else 2.4
-    expected = strength / divisor
-    variance = 0.12 if hard_mode else 0.25
-    expected += rng.uniform(-variance, variance)
-    guess = int(round(expected))
-    guess = max(0, min(cartas_por_jogador, guess))
-    return guess
-
 # =========================
 # GAME CORE
 # =========================
-def distribuir(cartas_alvo: int):
-    nomes = st.session_state.nomes
-    n = len(nomes)
-    baralho = criar_baralho()
-    random.shuffle(baralho)
-
-    usadas = cartas_alvo * n
-    st.session_state.sobras_monte = len(baralho) - usadas
-    st.session_state.cartas_alvo = cartas_alvo
-
-    st.session_state.maos = {nome: [] for nome in nomes}
-    for _ in range(cartas_alvo):
-        for nome in nomes:
-            st.session_state.maos[nome].append(baralho.pop())
-
-    for nome in nomes:
-        st.session_state.maos[nome] = sorted(st.session_state.maos[nome], key=peso_carta)
-
-    if not st.session_state.mao_primeira_sorteada:
-        st.session_state.mao_da_rodada = random.randint(0, n - 1)
-        st.session_state.mao_primeira_sorteada = True
-    else:
-        st.session_state.mao_da_rodada = (st.session_state.mao_da_rodada + 1) % n
+# As regras ficam em prognostico.engine; aqui só carregamos o estado do
+# session_state uma vez, chamamos o motor e gravamos o resultado de volta.
+def registro_da_partida(estado: GameState):
+    """Log da partida no modo local; no online quem anota é o worker da sala."""
+    if not REPLAYS_DIR or st.session_state.online_mode or estado.semente_partida is None:
+        return None
+    registro = st.session_state.replay_registro
+    if registro is None or registro.semente != estado.semente_partida:
+        if registro is not None:
+            registro.close()
+        os.makedirs(REPLAYS_DIR, exist_ok=True)
+        registro = replay.Registro(os.path.join(REPLAYS_DIR, f"{estado.semente_partida}.plog"), estado)
+        st.session_state.replay_registro = registro
+    return registro
+
+def fechar_registro():
+    """Fecha o log da partida local antes de reiniciar ou começar outra."""
+    registro = st.session_state.get("replay_registro")
+    if registro is not None:
+        registro.close()
+        st.session_state.replay_registro = None
+
+def reiniciar_sessao():
+    fechar_registro()
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+    ss_init()
+
+def load_game_state() -> GameState:
+    estado = GameState.from_mapping(st.session_state)
+    estado.registro = registro_da_partida(estado)
+    return estado
+
+def store_game_state(estado: GameState):
+    for key, value in estado.to_mapping().items():
+        st.session_state[key] = value
+    if estado.registro is not None:
+        estado.registro.gravar()
 
-    st.session_state.prognosticos = {}
-    st.session_state.progn_turn_idx = 0
-    st.session_state.vazas_rodada = {nome: 0 for nome in nomes}
-    st.session_state.pile_counts = {nome: 0 for nome in nomes}
+def distribuir(cartas_alvo: int):
+    estado = load_game_state()
+    engine.distribuir(estado, cartas_alvo)
+    store_game_state(estado)
 
-    st.session_state.fase = "prognostico"
-    st.session_state.pontuou_rodada = False
     st.session_state.pending_play = None
 
     st.session_state.trick_pending = False
@@ -966,76 +464,39 @@ def distribuir(cartas_alvo: int):
     st.session_state.trick_winner = None
     st.session_state.trick_snapshot = []
 
+# No modo online quem avança a mesa é o worker da sala (prognostico.servidor):
+# estes wrappers não fazem nada e as jogadas viram ações com enviar_acao.
 def advance_prognostico_until_human():
-    nomes = st.session_state.nomes
-    ordem = ordem_da_mesa(nomes, st.session_state.mao_da_rodada)
-    while st.session_state.progn_turn_idx < len(ordem):
-        nome = ordem[st.session_state.progn_turn_idx]
-        if is_human(nome):
-            return
-        if nome not in st.session_state.prognosticos:
-            st.session_state.prognosticos[nome] = ai_prognostico(
-                st.session_state.maos[nome],
-                st.session_state.cartas_alvo,
-                st.session_state.hard_mode,
-            )
-        st.session_state.progn_turn_idx += 1
+    if st.session_state.online_mode:
+        return
+    estado = load_game_state()
+    with medir("ia"):
+        engine.avancar_prognosticos(estado)
+    store_game_state(estado)
 
 def iniciar_fase_jogo():
-    nomes = st.session_state.nomes
-    st.session_state.ordem = ordem_da_mesa(nomes, st.session_state.mao_da_rodada)
-    st.session_state.turn_idx = 0
-    st.session_state.naipe_base = None
-    st.session_state.mesa = []
-    st.session_state.primeira_vaza = True
-    st.session_state.copas_quebrada = False
-    st.session_state.fase = "jogo"
-
-def cartas_validas_para_jogar(nome):
-    mao = st.session_state.maos[nome]
-    naipe_base = st.session_state.naipe_base
-    primeira_vaza = st.session_state.primeira_vaza
-    copas_quebrada = st.session_state.copas_quebrada
-
-    if not mao:
-        return []
-
-    if naipe_base and tem_naipe(mao, naipe_base):
-        return [c for c in mao if c[0] == naipe_base]
-
-    if naipe_base and not tem_naipe(mao, naipe_base):
-        if primeira_vaza and not somente_trunfo(mao):
-            return [c for c in mao if c[0] != TRUNFO]
-        return mao[:]
+    if st.session_state.online_mode:
+        return
+    estado = load_game_state()
+    engine.iniciar_fase_jogo(estado)
+    store_game_state(estado)
 
-    if naipe_base is None:
-        if primeira_vaza:
-            if somente_trunfo(mao):
-                return mao[:]
-            return [c for c in mao if c[0] != TRUNFO]
-        if not copas_quebrada and not somente_trunfo(mao):
-            return [c for c in mao if c[0] != TRUNFO]
+def registrar_prognostico(nome, valor: int):
+    estado = load_game_state()
+    engine.registrar_prognostico(estado, nome, valor)
+    store_game_state(estado)
 
-    return mao[:]
+def cartas_validas_para_jogar(nome):
+    return engine.cartas_validas_para_jogar(load_game_state(), nome)
 
 def jogar_carta(nome, carta):
-    st.session_state.maos[nome].remove(carta)
-    if st.session_state.naipe_base is None:
-        st.session_state.naipe_base = carta[0]
-    if carta[0] == TRUNFO and not st.session_state.primeira_vaza:
-        st.session_state.copas_quebrada = True
-    st.session_state.mesa.append((nome, carta))
+    estado = load_game_state()
+    engine.jogar_carta(estado, nome, carta)
+    store_game_state(estado)
     st.session_state.table_pop_until = time.time() + 0.22
 
-def vencedor_da_vaza(mesa_snapshot, naipe_base_snapshot):
-    copas = [(n, c) for (n, c) in mesa_snapshot if c[0] == TRUNFO]
-    if copas:
-        return max(copas, key=lambda x: PESO_VALOR[x[1][1]])[0]
-    base = [(n, c) for (n, c) in mesa_snapshot if c[0] == naipe_base_snapshot]
-    return max(base, key=lambda x: PESO_VALOR[x[1][1]])[0]
-
 def schedule_trick_resolution():
-    if st.session_state.online_mode and not st.session_state.is_host:
+    if st.session_state.online_mode:
         return
     if st.session_state.trick_pending:
         return
@@ -1051,36 +512,35 @@ def schedule_trick_resolution():
     st.session_state.trick_fly_until = now + show_seconds + fly_seconds
 
 def resolve_trick_if_due():
-    if st.session_state.online_mode and not st.session_state.is_host:
+    if st.session_state.online_mode:
         return False
     if not st.session_state.trick_pending:
         return False
 
     now = time.time()
+    if vaza_animada():
+        # o componente da mesa já mostrou a vaza e a fez voar até o vencedor
+        now = max(now, st.session_state.trick_fly_until)
 
     if st.session_state.trick_phase == "show":
         if now < st.session_state.trick_resolve_at:
             return False
         st.session_state.trick_phase = "fly"
-        return True
+        if now < st.session_state.trick_fly_until:
+            return True
 
     if st.session_state.trick_phase == "fly":
         if now < st.session_state.trick_fly_until:
             return False
 
         win = st.session_state.trick_winner
-        st.session_state.vazas_rodada[win] += 1
-        st.session_state.pile_counts[win] = st.session_state.pile_counts.get(win, 0) + 1
+        estado = load_game_state()
+        engine.recolher_vaza(estado, win)
+        store_game_state(estado)
 
         st.session_state.winner_flash_name = win
         st.session_state.winner_flash_until = time.time() + 1.2
 
-        ordem = st.session_state.ordem
-        st.session_state.turn_idx = ordem.index(win)
-        st.session_state.mesa = []
-        st.session_state.naipe_base = None
-        st.session_state.primeira_vaza = False
-
         st.session_state.trick_pending = False
         st.session_state.trick_phase = None
         st.session_state.trick_resolve_at = 0.0
@@ -1091,8 +551,31 @@ def resolve_trick_if_due():
 
     return False
 
+def vaza_id():
+    return f"{st.session_state.trick_fly_until:.3f}"
+
+def vaza_animada() -> bool:
+    """O componente da mesa avisou que terminou a animação da vaza atual."""
+    valor = st.session_state.get(MESA_COMPONENTE_KEY)
+    return isinstance(valor, dict) and valor.get("vaza") == vaza_id()
+
+def esperar_vaza():
+    """Espera o aviso do componente (que interrompe este rerun) ou o fim da vaza + VAZA_FOLGA_S."""
+    placeholder = st.empty()
+    prazo = st.session_state.trick_fly_until + VAZA_FOLGA_S
+    # se o aviso do componente cortar a espera, a próxima execução foi causada por ele
+    st.session_state.rerun_motivo = "vaza_animada"
+    with medir("espera"):
+        while True:
+            restante = prazo - time.time()
+            if restante <= 0:
+                break
+            time.sleep(min(restante, VAZA_ESPERA_SLICE_S))
+            placeholder.empty()
+    rerun("vaza")
+
 def rodada_terminou():
-    return all(len(st.session_state.maos[n]) == 0 for n in st.session_state.nomes)
+    return engine.rodada_terminou(load_game_state())
 
 def fim_de_rodada_pronto():
     return (
@@ -1102,187 +585,138 @@ def fim_de_rodada_pronto():
     )
 
 def pontuar_rodada():
-    if st.session_state.online_mode and not st.session_state.is_host:
-        return
-    if st.session_state.pontuou_rodada:
+    if st.session_state.online_mode:
         return
-    for n in st.session_state.nomes:
-        v = st.session_state.vazas_rodada.get(n, 0)
-        p = v + (5 if st.session_state.prognosticos.get(n) == v else 0)
-        st.session_state.pontos[n] = st.session_state.pontos.get(n, 0) + p
-    st.session_state.pontuou_rodada = True
+    estado = load_game_state()
+    engine.pontuar_rodada(estado)
+    store_game_state(estado)
 
 def ai_escolhe_carta(nome):
-    validas = cartas_validas_para_jogar(nome)
-    if not validas:
-        return None
-    if not st.session_state.hard_mode:
-        return random.choice(validas)
-
-    naipe_base = st.session_state.naipe_base
-    mesa = st.session_state.mesa
-    progn = st.session_state.prognosticos.get(nome)
-    vazas = st.session_state.vazas_rodada.get(nome, 0)
-    need_wins = None if progn is None else progn - vazas
-    remaining_cards = len(st.session_state.maos[nome])
-
-    def card_rank(carta, naipe_base_atual):
-        naipe, valor = carta
-        if naipe == TRUNFO:
-            return (2, PESO_VALOR[valor])
-        if naipe_base_atual is None:
-            return (1, PESO_VALOR[valor])
-        if naipe == naipe_base_atual:
-            return (1, PESO_VALOR[valor])
-        return (0, PESO_VALOR[valor])
-
-    def sort_key(carta):
-        rank = card_rank(carta, naipe_base)
-        return (rank[0], rank[1])
-
-    def losing_sort_key(carta):
-        naipe, valor = carta
-        is_trump = naipe == TRUNFO
-        rank = card_rank(carta, naipe_base)
-        return (is_trump, rank[0], rank[1])
-
-    def must_win_now():
-        return need_wins is not None and remaining_cards <= need_wins
-
-    def should_avoid_wins():
-        return need_wins is not None and need_wins <= 0
-
-    if not mesa or naipe_base is None:
-        if must_win_now():
-            return max(validas, key=sort_key)
-        if need_wins is not None and need_wins > 0:
-            return max(validas, key=sort_key)
-        return min(validas, key=losing_sort_key)
-
-    current_best = max(mesa, key=lambda item: card_rank(item[1], naipe_base))[1]
-    best_rank = card_rank(current_best, naipe_base)
-    winning_cards = [c for c in validas if card_rank(c, naipe_base) > best_rank]
-
-    if must_win_now():
-        if winning_cards:
-            return min(winning_cards, key=sort_key)
-        return max(validas, key=sort_key)
-
-    if need_wins is not None and need_wins > 0:
-        if winning_cards:
-            return min(winning_cards, key=sort_key)
-        return min(validas, key=losing_sort_key)
-
-    losing_cards = [c for c in validas if c not in winning_cards]
-    if losing_cards:
-        return min(losing_cards, key=losing_sort_key)
-    if should_avoid_wins():
-        return min(validas, key=losing_sort_key)
-    return min(validas, key=sort_key)
+    return engine.ai_escolhe_carta(load_game_state(), nome, timing_config()["ai_step_delay"])
+
 def avancar_ate_humano_ou_fim():
-    if st.session_state.online_mode and not st.session_state.is_host:
+    if st.session_state.online_mode:
         return
-    ordem = st.session_state.ordem
-    if not ordem:
+    if not st.session_state.ordem:
         return
 
     if st.session_state.trick_pending:
         return
 
-    limit = 2500
-    steps = 0
-    while steps < limit:
-        steps += 1
-
-        if resolve_trick_if_due():
-            return
-        if st.session_state.trick_pending:
-            return
-
-        if rodada_terminou() and (not st.session_state.trick_pending):
-            if len(st.session_state.mesa) == len(ordem):
-                schedule_trick_resolution()
-                return
+    # O laço dos bots roda sobre o GameState, sem tocar no session_state a cada jogada.
+    estado = load_game_state()
+    with medir("ia"):
+        status, jogadas = engine.avancar_ate_humano_ou_fim(estado, prazo=timing_config()["ai_step_delay"])
+    store_game_state(estado)
+    if jogadas:
+        st.session_state.table_pop_until = time.time() + 0.22
 
-        if fim_de_rodada_pronto():
-            pontuar_rodada()
-            if st.session_state.cartas_alvo <= 1:
-                st.session_state.fase = "fim"
-                st.session_state.show_final = True
-                st.rerun()
-            return
-
-        atual = ordem[st.session_state.turn_idx]
-
-        if len(st.session_state.maos[atual]) == 0:
-            st.session_state.turn_idx = (st.session_state.turn_idx + 1) % len(ordem)
-            continue
-
-        if is_human(atual) and len(st.session_state.maos[atual]) > 0:
-            return
-
-        carta = ai_escolhe_carta(atual)
-        if carta is None:
-            st.session_state.turn_idx = (st.session_state.turn_idx + 1) % len(ordem)
-            continue
-
-        jogar_carta(atual, carta)
-        st.session_state.turn_idx = (st.session_state.turn_idx + 1) % len(ordem)
+    if status == engine.VAZA_COMPLETA:
+        schedule_trick_resolution()
+        return
 
-        if len(st.session_state.mesa) == len(ordem):
-            schedule_trick_resolution()
-            return
+    if status == engine.FIM_RODADA:
+        pontuar_rodada()
+        if st.session_state.cartas_alvo <= 1:
+            st.session_state.fase = "fim"
+            st.session_state.show_final = True
+            rerun("fim_partida")
 
 def start_next_round():
     if st.session_state.cartas_alvo <= 1:
         return
+    if st.session_state.online_mode:
+        enviar_acao(servidor.PROXIMA_RODADA)
     st.session_state.rodada += 1
     prox = st.session_state.cartas_alvo - 1
     distribuir(prox)
 
-    # =========================
-# UI helpers
 # =========================
-def chip_color_for_index(idx: int) -> str:
-    palette = [
-        "rgba(16,185,129,.88)",
-        "rgba(59,130,246,.88)",
-        "rgba(245,158,11,.88)",
-        "rgba(239,68,68,.88)",
-        "rgba(168,85,247,.88)",
-        "rgba(20,184,166,.88)",
-        "rgba(100,116,139,.88)",
-        "rgba(236,72,153,.88)",
-    ]
-    return palette[idx % len(palette)]
-
-def render_progn_chips_html(prog, color: str) -> str:
-    if isinstance(prog, str) or prog is None:
-        return '<span class="chipNote">—</span>'
-    p = max(0, int(prog))
-    count_label = f'<span class="chipNote">{p}</span>'
-    show = min(p, 12)
-    chips = "".join([f'<div class="chipMini" style="--chip-base:{color};"></div>' for _ in range(show)])
-    extra = f'<span class="chipNote">+{p-12}</span>' if p > 12 else ''
-    return f'<div class="chipRow">{count_label}{chips}</div>{extra}'
-
-def render_small_pile_html(won: int) -> str:
-    layers = min(max(won, 0), 10)
-    parts = []
-    for i in range(layers):
-        dx = i * 1.1
-        dy = -i * 1.2
-        rot = (i % 3 - 1) * 2
-        parts.append(f'<div class="cardBackLayer" style="left:{dx}px; top:{dy}px; transform: rotate({rot}deg);"></div>')
-    label = f"{won}" if won > 10 else ""
-    label_html = f'<div class="pileLabel">{label}</div>' if label else ''
-    return f'<div class="pileStack">{"".join(parts)}</div>{label_html}'
+# ADMIN (?admin na URL)
+# =========================
+def admin_liberado():
+    """?admin=<PROGNOSTICO_ADMIN_TOKEN> na URL; sem a variável o painel não existe."""
+    token = os.environ.get("PROGNOSTICO_ADMIN_TOKEN")
+    if not token or "admin" not in st.query_params:
+        return False
+    return hmac.compare_digest(st.query_params.get("admin", ""), token)
+
+
+def render_admin_salas():
+    store = get_room_store()
+    resumo = store.resumo()
+    travas = store.estatisticas()
+    caches = fragmentos.cache_info().values()
+    hits = sum(c.hits for c in caches)
+    misses = sum(c.misses for c in caches)
+    fragmentos_guardados = sum(c.currsize for c in caches)
+    markdown("---")
+    markdown("## 🛠️ Salas")
+    markdown(
+        f'<div class="smallMuted">Salas: {resumo["salas"]} / {resumo["max_salas"]} • '
+        f'Memória: {resumo["bytes"] / 1024:,.1f} KB • Removidas: {resumo["removidas"]}<br>'
+        f'Acesso mais antigo: {resumo["acesso_mais_antigo_s"] / 60:,.1f} min (TTL {resumo["ttl_s"] / 60:,.0f} min)<br>'
+        f'Maior sala: {resumo["maior_sala_bytes"] / 1024:,.1f} KB<br>'
+        f'Locks: {travas["aquisicoes"]} • Contenções: {travas["contencoes"]} • '
+        f'Espera máx.: {travas["espera_max_ms"]:.1f} ms • Conflitos de versão: {travas["conflitos"]}<br>'
+        f'Cache de HTML: {hits:,} hits • {misses:,} misses ({fragmentos_guardados:,} fragmentos)</div>',
+        unsafe_allow_html=True,
+    )
+
+
+def render_admin_perfil():
+    resumo = get_perfil().resumo()
+    markdown("## ⏱️ Reruns")
+    if not resumo["execucoes"]:
+        st.info("Nenhuma execução medida ainda.")
+        return
+    total = resumo["total_ms"]
+    motivos = " • ".join(f"{motivo} {n}" for motivo, n in list(resumo["motivos"].items())[:8])
+    markdown(
+        f'<div class="smallMuted">Execuções: {resumo["execucoes"]} ({resumo["por_segundo"]:,.1f}/s) • '
+        f'Perdidas: {resumo["perdidas"]}<br>'
+        f'Total: p50 {total["p50"]:,.1f} ms • p99 {total["p99"]:,.1f} ms<br>'
+        f'Motivos: {motivos}</div>',
+        unsafe_allow_html=True,
+    )
+    linhas = {"Fase": [], "n": [], "p50 ms": [], "p99 ms": [], "máx ms": []}
+    for fase, est in resumo["fases_ms"].items():
+        linhas["Fase"].append(fase)
+        linhas["n"].append(est["n"])
+        linhas["p50 ms"].append(round(est["p50"], 2))
+        linhas["p99 ms"].append(round(est["p99"], 2))
+        linhas["máx ms"].append(round(est["max"], 2))
+    st.dataframe(pd.DataFrame(linhas), use_container_width=True, hide_index=True)
+    st.dataframe(
+        pd.DataFrame(
+            {
+                "Bytes": list(resumo["bytes"]),
+                "média": [round(est["media"]) for est in resumo["bytes"].values()],
+                "p99": [est["p99"] for est in resumo["bytes"].values()],
+                "máx": [est["max"] for est in resumo["bytes"].values()],
+            }
+        ),
+        use_container_width=True,
+        hide_index=True,
+    )
+    faixas = " ".join(f"{faixa}: {n}" for faixa, n in total["hist"].items() if n)
+    markdown(f'<div class="smallMuted">Duração das execuções (ms) — {faixas}</div>', unsafe_allow_html=True)
+    st.download_button(
+        "⬇️ Baixar JSON",
+        get_perfil().para_json(execucoes=True),
+        file_name="perfil.json",
+        mime="application/json",
+        use_container_width=True,
+    )
+    if st.button("🧹 Zerar medições", use_container_width=True, key="admin_perfil_limpar"):
+        get_perfil().limpar()
+
 
 # =========================
 # SIDEBAR
 # =========================
 with st.sidebar:
-    st.markdown("## 📊 Placar")
+    markdown("## 📊 Placar")
 
     if st.session_state.started:
         for n in st.session_state.nomes:
@@ -1290,17 +724,17 @@ with st.sidebar:
 
         ranking = sorted(st.session_state.pontos.items(), key=lambda x: x[1], reverse=True)
         for nome, pts in ranking:
-            st.markdown(
+            markdown(
                 f'<div class="scoreItem"><div class="scoreName">{nome}</div><div class="scorePts">{pts}</div></div>',
                 unsafe_allow_html=True
             )
 
-        st.markdown(
+        markdown(
             f'<div class="smallMuted">Rodada: {st.session_state.rodada} • Cartas/jogador: {st.session_state.cartas_alvo} • Sobras: {st.session_state.sobras_monte}</div>',
             unsafe_allow_html=True
         )
 
-        st.markdown("---")
+        markdown("---")
         st.session_state.neon_mode = st.toggle("✨ Modo Neon", value=st.session_state.neon_mode)
         st.session_state.fast_mode = st.toggle("⚡ Modo rápido", value=st.session_state.fast_mode)
         if st.button(
@@ -1308,17 +742,19 @@ with st.sidebar:
             use_container_width=True,
             disabled=st.session_state.online_mode and not st.session_state.is_host,
         ):
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
-            ss_init()
-            rerun_with_room_sync()
+            reiniciar_sessao()
+            rerun_with_room_sync("reiniciar")
     else:
         st.info("Inicie uma partida.")
 
+    if admin_liberado():
+        render_admin_salas()
+        render_admin_perfil()
+
 # =========================
 # HEADER (sempre)
 # =========================
-st.markdown(
+markdown(
     """
 <div class="titleRow">
   <h1 style="color:#D4AF37;">JOGO DE PROGNÓSTICO</h1>
@@ -1334,7 +770,7 @@ st.markdown(
 # SETUP
 # =========================
 if not st.session_state.started:
-    st.markdown("### Configuração")
+    markdown("### Configuração")
     mode_label = st.radio(
         "Modo de jogo",
         ["Local (hot-seat)", "Online (beta)"],
@@ -1345,6 +781,11 @@ if not st.session_state.started:
         "🔥 Modo difícil (IA mais próxima do jogador real)",
         value=st.session_state.hard_mode,
     )
+    st.session_state.expert_mode = st.toggle(
+        "🧠 Modo especialista (IA lembra as cartas e simula as mãos)",
+        value=st.session_state.expert_mode,
+        disabled=not st.session_state.hard_mode,
+    ) and st.session_state.hard_mode
     st.session_state.fast_mode = st.toggle(
         "⚡ Modo rápido (animações e IA mais ágeis)",
         value=st.session_state.fast_mode,
@@ -1363,6 +804,9 @@ if not st.session_state.started:
             "Sou o anfitrião da sala",
             value=st.session_state.is_host,
         )
+        if st.session_state.room_aviso:
+            st.warning(st.session_state.room_aviso)
+            st.session_state.room_aviso = None
         room_state = get_room_state(st.session_state.room_code)
         if room_state:
             st.info(
@@ -1370,8 +814,8 @@ if not st.session_state.started:
                 f"Humanos: {', '.join(room_state.get('humanos', []))}"
             )
             if not st.session_state.is_host:
-                st.session_state.nomes = room_state.get("nomes", st.session_state.nomes)
-                st.session_state.humanos = room_state.get("humanos", st.session_state.humanos)
+                st.session_state.nomes = list(room_state.get("nomes", st.session_state.nomes))
+                st.session_state.humanos = list(room_state.get("humanos", st.session_state.humanos))
                 if (
                     st.session_state.player_name
                     and st.session_state.player_name not in room_state.get("humanos", [])
@@ -1435,16 +879,31 @@ if not st.session_state.started:
             st.session_state.cartas_alvo = cartas_inicio
             st.session_state.rodada = 1
 
+            fechar_registro()
+            if st.session_state.online_mode:
+                # quem dá as cartas e cria a sala é o worker; a sessão recebe tudo no próximo sync_from_room
+                enviar_acao(
+                    servidor.NOVA_PARTIDA,
+                    st.session_state.player_name,
+                    nomes,
+                    st.session_state.humanos,
+                    {
+                        "hard_mode": st.session_state.hard_mode,
+                        "expert_mode": st.session_state.expert_mode,
+                        "fast_mode": st.session_state.fast_mode,
+                        "neon_mode": st.session_state.neon_mode,
+                    },
+                )
             distribuir(cartas_inicio)
-            rerun_with_room_sync()
+            rerun_with_room_sync("inicio_partida")
 
     if st.session_state.online_mode and not st.session_state.is_host and room_state:
         if room_state.get("started") and st.session_state.player_name in room_state.get("humanos", []):
             st.session_state.started = True
-            st.session_state.nomes = room_state.get("nomes", [])
-            st.session_state.humanos = room_state.get("humanos", [])
+            st.session_state.nomes = list(room_state.get("nomes", []))
+            st.session_state.humanos = list(room_state.get("humanos", []))
             sync_from_room()
-            rerun_with_room_sync()
+            rerun_with_room_sync("entrar_sala")
 
     stop_with_room_sync()
 
@@ -1482,29 +941,18 @@ def render_topbar():
         f'</div>'
         f'</div>'
     )
-    st.markdown(topbar_html, unsafe_allow_html=True)
+    markdown(topbar_html, unsafe_allow_html=True)
+
 
+# a vaza vencida (pelo relógio ou pelo aviso do componente da mesa) é recolhida
+# antes de desenhar qualquer coisa, então o mesmo rerun já mostra a mesa nova
+if st.session_state.fase == "jogo":
+    resolve_trick_if_due()
 
 render_topbar()
 
 def timing_config():
-    if st.session_state.fast_mode:
-        return {
-            "trick_show": 0.35,
-            "trick_fly": 0.20,
-            "autoplay_delay": 0.02,
-            "trick_tick": 0.02,
-            "play_delay": 0.05,
-            "ai_step_delay": 0.0,
-        }
-    return {
-        "trick_show": 1.10,
-        "trick_fly": 0.55,
-        "autoplay_delay": 0.08,
-        "trick_tick": 0.06,
-        "play_delay": 0.14,
-        "ai_step_delay": 0.03,
-    }
+    return servidor.tempos(st.session_state.fast_mode)
 
 # =========================
 # AÇÕES RÁPIDAS (SEMPRE VISÍVEIS)
@@ -1514,24 +962,22 @@ c1, c2, c3 = st.columns([1, 1, 1])
 
 with c1:
     if st.button("🔄 Reiniciar partida", use_container_width=True, key="menu_reset_icon", help="Reiniciar o jogo"):
-        for key in list(st.session_state.keys()):
-            del st.session_state[key]
-        ss_init()
-        st.rerun()
+        reiniciar_sessao()
+        rerun("reiniciar")
 
 with c2:
     can_next = (st.session_state.fase == "jogo" and fim_de_rodada_pronto() and st.session_state.cartas_alvo > 1)
     if st.button("⏭️ Próxima rodada", use_container_width=True, key="menu_next_round_icon", help="Próxima rodada", disabled=not can_next):
         start_next_round()
-        st.rerun()
+        rerun("proxima_rodada")
 
 with c3:
     neon_new = st.toggle("💚 Modo Neon", value=st.session_state.neon_mode, key="menu_neon_icon", help="Modo Neon")
     if neon_new != st.session_state.neon_mode:
         st.session_state.neon_mode = neon_new
-        st.rerun()
+        rerun("neon")
 
-st.markdown('</div>', unsafe_allow_html=True)
+markdown('</div>', unsafe_allow_html=True)
 
 # =========================
 # PROGNÓSTICO
@@ -1540,21 +986,27 @@ nomes = st.session_state.nomes
 
 if st.session_state.fase == "prognostico":
     ordem_preview = ordem_da_mesa(nomes, st.session_state.mao_da_rodada)
-    st.markdown(f"### 📌 Prognóstico — Rodada {st.session_state.rodada} ({st.session_state.cartas_alvo} cartas/jogador)")
+    markdown(f"### 📌 Prognóstico — Rodada {st.session_state.rodada} ({st.session_state.cartas_alvo} cartas/jogador)")
 
     advance_prognostico_until_human()
     if st.session_state.progn_turn_idx >= len(ordem_preview):
+        if st.session_state.online_mode:
+            st.info("Prognósticos feitos — o servidor está abrindo a rodada…")
+            online_autorefresh(ONLINE_WAIT_MS, key="online_wait_progn_fim")
         iniciar_fase_jogo()
         avancar_ate_humano_ou_fim()
-        st.rerun()
+        rerun("prognostico_fim")
 
     humano_nome = ordem_preview[st.session_state.progn_turn_idx]
+    if st.session_state.online_mode and humano_nome != st.session_state.player_name:
+        st.info(f"Aguardando o prognóstico de {safe_human_label(humano_nome)}…")
+        online_autorefresh(ONLINE_WAIT_MS, key="online_wait_progn")
     mao_humano = st.session_state.maos.get(humano_nome, [])
-    st.markdown(
+    markdown(
         f"#### 🎯 Vez de {safe_human_label(humano_nome)} — passe o dispositivo",
     )
-    st.markdown('<div class="handDock">', unsafe_allow_html=True)
-    st.markdown(
+    markdown('<div class="handDock">', unsafe_allow_html=True)
+    markdown(
     '<div class="handTitle"><h3>🃏 Cartas do jogador (prognóstico)</h3><div class="hint">Ordenadas por naipe e valor</div></div>',
     unsafe_allow_html=True,
     )
@@ -1566,13 +1018,13 @@ if st.session_state.fase == "prognostico":
     cards_html = "".join(
         carta_html(c) for c in sorted(mao_humano, key=sort_key or (lambda _c: (0, 0)))
     )
-    st.markdown(
+    markdown(
         f'<div style="display:flex; flex-wrap:wrap; gap:10px;">{cards_html}</div>',
         unsafe_allow_html=True,
     )
-    st.markdown('</div>', unsafe_allow_html=True)
+    markdown('</div>', unsafe_allow_html=True)
 
-    st.markdown("#### ✅ Prognósticos visíveis (anteriores na mesa)")
+    markdown("#### ✅ Prognósticos visíveis (anteriores na mesa)")
     vis = st.session_state.prognosticos
     if not vis:
         st.info("Este jogador é o mão — ninguém fez prognóstico antes dele.")
@@ -1589,38 +1041,20 @@ if st.session_state.fase == "prognostico":
     key=f"progn_{humano_nome}_{st.session_state.rodada}",
 )
 
-if st.button("Confirmar prognóstico", use_container_width=True):
-    st.session_state.prognosticos[humano_nome] = int(palpite)
-    st.session_state.progn_turn_idx += 1
-    if st.session_state.online_mode and not st.session_state.is_host:
-        rerun_with_room_sync()
-    else:
+    if st.button("Confirmar prognóstico", use_container_width=True):
+        if st.session_state.online_mode:
+            enviar_acao(servidor.PROGNOSTICO, humano_nome, int(palpite))
+        registrar_prognostico(humano_nome, int(palpite))
+        st.session_state.progn_turn_idx += 1
         advance_prognostico_until_human()
         if st.session_state.progn_turn_idx >= len(ordem_preview):
             iniciar_fase_jogo()
             avancar_ate_humano_ou_fim()
-        rerun_with_room_sync()
-
-if st.session_state.online_mode and not st.session_state.is_host:
-    stop_with_room_sync()
+        rerun_with_room_sync("prognostico")
 
 # =========================
 # MESA
 # =========================
-def seat_positions(ordem):
-    n = len(ordem)
-    cx, cy = 50, 50
-    rx, ry = 42, 36
-    pos = {}
-    for i, nome in enumerate(ordem):
-        ang = (2 * math.pi) * (i / n) - (math.pi / 2)
-        x = cx + rx * math.cos(ang)
-        y = cy + ry * math.sin(ang)
-        tx = cx + (rx * 0.70) * math.cos(ang)
-        ty = cy + (rx * 0.70) * math.sin(ang)
-        pos[nome] = {"seat": (x, y), "target": (tx, ty)}
-    return pos
-
 def render_mesa():
     if st.session_state.online_mode and not st.session_state.nomes:
         sync_from_room()
@@ -1633,14 +1067,12 @@ def render_mesa():
         ordem = ordem_da_mesa(nomes, st.session_state.mao_da_rodada) if nomes else []
         st.session_state.ordem = ordem
     if not ordem:
-        st.markdown(
+        markdown(
             '<div class="mesaWrap"><div class="mesa"><div class="mesaCenter">Mesa aguardando jogadores...</div></div></div>',
         )
         return
-    n = len(ordem)
     active_player = ordem[st.session_state.turn_idx] if ordem else None
     dealer = ordem[0]
-    pos = seat_positions(ordem)
 
     now = time.time()
     flash_name = st.session_state.winner_flash_name if now <= st.session_state.winner_flash_until else None
@@ -1649,89 +1081,34 @@ def render_mesa():
     mesa_to_render = st.session_state.trick_snapshot if st.session_state.trick_pending else st.session_state.mesa
     naipe_base_show = st.session_state.naipe_base
 
-    seats_html = ""
-    chips_html = ""
-    piles_html = ""
-    plays_html = ""
-    anim_css = ""
-
-    for i, nome in enumerate(ordem):
-        x, y = pos[nome]["seat"]
-        tx, ty = pos[nome]["target"]
-
-    cls = "seat"
-    label = nome
-    if is_human(nome):
-        cls += " you"
-        label = safe_human_label(nome)
-    if nome == dealer:
-        cls += " dealer"
-        label = f"{label} • mão"
+    assentos = []
+    for nome in ordem:
+        cls = "seat"
+        label = nome
+        if is_human(nome):
+            cls += " you"
+            label = safe_human_label(nome)
+        if nome == dealer:
+            cls += " dealer"
+            label = f"{label} • mão"
         if flash_name and nome == flash_name:
             cls += " winnerFlash"
-
-        avatar_src = avatar_svg_data_uri(i)
-        seats_html += f'''
-<div class="{cls}" style="left:{x}%; top:{y}%; transform:translate(-50%,-50%);">
-  <img class="avatarImg" src="{avatar_src}" alt="avatar"/>
-  <span>{label}</span>
-</div>
-'''
-
-        prog = st.session_state.prognosticos.get(nome, None)
-        won = st.session_state.pile_counts.get(nome, 0)
-        color = chip_color_for_index(i)
-
-        chips_html += f"""
-<div class="chipWrap" style="left:{tx}%; top:{ty}%;">
-  {render_progn_chips_html(prog, color)}
-</div>
-"""
-
-        if won > 0:
-            px = tx
-            py = ty + 12
-            piles_html += f"""
-<div class="pileWrap" style="left:{px}%; top:{py}%;">
-  {render_small_pile_html(won)}
-</div>
-"""
+        assentos.append((cls, label))
 
     winner = st.session_state.trick_winner
-    winner_target = None
-    if winner:
-        wx, wy = pos[winner]["target"]
-        winner_target = (wx, wy + 12)
-
-    for idx, (nome, carta) in enumerate(mesa_to_render):
-        i = ordem.index(nome)
-        ang = (2 * math.pi) * (i / n) - (math.pi / 2)
-        cx, cy = 50, 50
-        rx, ry = 42, 36
-        x = cx + (rx * 0.47) * math.cos(ang)
-        y = cy + (ry * 0.47) * math.sin(ang)
-
-        is_last = (idx == len(mesa_to_render) - 1)
-        cls = "playCard"
-        extra_style = f"left:{x}%; top:{y}%;"
-
-        if pop_active and is_last and not st.session_state.trick_pending:
-            cls += " pop"
-
-        if st.session_state.trick_pending and st.session_state.trick_phase == "fly" and winner_target:
-            tx, ty = winner_target
-            anim_name = f"flyToWinner_{idx}"
-            anim_css += f"""
-@keyframes {anim_name} {{
-  0% {{ left:{x}%; top:{y}%; opacity:1; transform:translate(-50%,-50%) scale(1); }}
-  70% {{ opacity:.85; }}
-  100% {{ left:{tx}%; top:{ty}%; opacity:.22; transform:translate(-50%,-50%) scale(.70); }}
-}}
-"""
-            extra_style = f"left:{x}%; top:{y}%; animation:{anim_name} .55s ease-in forwards;"
-
-        plays_html += f'<div class="{cls}" style="{extra_style}">{carta_html(carta)}</div>'
-    
+    vaza = None
+    if st.session_state.trick_pending and winner in ordem:
+        vaza = mesa.animacao_da_vaza(
+            ordem,
+            winner,
+            vaza_id(),
+            now,
+            st.session_state.trick_resolve_at,
+            st.session_state.trick_fly_until,
+            # online quem recolhe a vaza é o worker da sala; o aviso só geraria um rerun a mais
+            avisar=not st.session_state.online_mode,
+        )
+
     if st.session_state.trick_pending:
         centro_txt = "Vaza completa — mostrando..." if st.session_state.trick_phase == "show" else "Vaza completa — indo ao vencedor..."
     else:
@@ -1740,23 +1117,35 @@ def render_mesa():
     if naipe_base_show:
         centro_txt = f"{centro_txt} • Naipe: {naipe_base_show}"
 
-    if anim_css.strip():
-        st.markdown(f"<style>{anim_css}</style>", unsafe_allow_html=True)
-
-    st.markdown('<div class="mesaWrap">', unsafe_allow_html=True)
-    st.markdown(
-        f"""
-<div class="mesa">
-  {seats_html}
-  {chips_html}
-  {piles_html}
-  {plays_html}
-  <div class="mesaCenter">{centro_txt}</div>
-</div>
-""",
-        unsafe_allow_html=True
+    regs = mesa.regioes(
+        ordem,
+        assentos,
+        st.session_state.prognosticos,
+        st.session_state.pile_counts,
+        mesa_to_render,
+        centro_txt,
+        pop=pop_active and not st.session_state.trick_pending,
     )
-    st.markdown('</div>', unsafe_allow_html=True)
+    emitir_mesa(regs, vaza)
+
+
+def emitir_mesa(regs, vaza=None):
+    """Manda ao componente só as regiões que mudaram desde o último rerun."""
+    emissor = st.session_state.mesa_emissor
+    if emissor is None:
+        emissor = st.session_state.mesa_emissor = mesa.Emissor()
+    valor = st.session_state.get(MESA_COMPONENTE_KEY)
+    if isinstance(valor, dict) and valor.get("resync") != emissor.resync:
+        emissor.resync = valor.get("resync")
+        emissor.reset()
+    elif emissor.rerun != st.session_state.rerun_n - 1:
+        # a mesa não apareceu no rerun anterior: o iframe é novo
+        emissor.reset()
+    emissor.rerun = st.session_state.rerun_n
+    enviados = emissor.bytes_enviados
+    dados = emissor.diff(regs)
+    contar_bytes("mesa", emissor.bytes_enviados - enviados)
+    mesa_componente(dados=dados, vaza=vaza, key=MESA_COMPONENTE_KEY, default=None)
 
 # =========================
 # MÃO clicável
@@ -1769,11 +1158,11 @@ def render_hand_clickable_streamlit():
     mao = st.session_state.maos[humano]
     validas = set(cartas_validas_para_jogar(humano))
 
-    st.markdown('<div class="handDock">', unsafe_allow_html=True)
+    markdown('<div class="handDock">', unsafe_allow_html=True)
 
     mao_ord = sorted(mao, key=peso_carta)
     if not mao_ord:
-        st.markdown("</div>", unsafe_allow_html=True)
+        markdown("</div>", unsafe_allow_html=True)
         return None
     
     pending = st.session_state.pending_play
@@ -1796,22 +1185,22 @@ def render_hand_clickable_streamlit():
                 is_pending = (pending is not None and c == pending)
                 card_html = card_btn_html(c, extra_class="flyAway" if is_pending else "")
                 key = f"card_btn_{c[0]}_{c[1]}_{r}_{j}"
-                st.markdown('<div class="cardSlot">', unsafe_allow_html=True)
+                markdown('<div class="cardSlot">', unsafe_allow_html=True)
                 if st.button(" ", key=key, disabled=disabled, use_container_width=True):
                     clicked_card = c
-                st.markdown(
+                markdown(
                     f'<div class="cardOverlay">{card_html}</div></div>',
                     unsafe_allow_html=True,
                 )
     
-    st.markdown("</div>", unsafe_allow_html=True)
+    markdown("</div>", unsafe_allow_html=True)
     return clicked_card
 
 # =========================
 # PLACAR PARCIAL
 # =========================
 def render_placar_parcial():
-    st.markdown("## 🧾 Placar parcial")
+    markdown("## 🧾 Placar parcial")
     ranking = sorted(st.session_state.pontos.items(), key=lambda x: x[1], reverse=True)
 
     linhas = []
@@ -1828,7 +1217,7 @@ def render_placar_parcial():
 # TELA FINAL
 # =========================
 def render_tela_final():
-    st.markdown("## 🏁 Placar final")
+    markdown("## 🏁 Placar final")
     ranking = sorted(st.session_state.pontos.items(), key=lambda x: x[1], reverse=True)
 
     linhas = []
@@ -1844,10 +1233,8 @@ def render_tela_final():
     st.success(f"🏆 Vencedor: {vencedor} com {pts} pontos!")
 
     if st.button("🔄 Jogar novamente", use_container_width=True, key="btn_play_again"):
-        for key in list(st.session_state.keys()):
-            del st.session_state[key]
-        ss_init()
-        st.rerun()
+        reiniciar_sessao()
+        rerun("reiniciar")
 
 # =========================
 # JOGO
@@ -1855,9 +1242,6 @@ def render_tela_final():
 if st.session_state.fase == "jogo":
     handle_card_query_param()
 
-    if resolve_trick_if_due():
-        rerun_with_room_sync()
-
     if not st.session_state.ordem:
         nomes = st.session_state.nomes
         if not nomes:
@@ -1869,45 +1253,61 @@ if st.session_state.fase == "jogo":
     atual = ordem[st.session_state.turn_idx]
     humano = current_human_turn()
 
-    if rodada_terminou() and (not st.session_state.trick_pending) and (len(st.session_state.mesa) == len(ordem)):
+    if (
+        rodada_terminou()
+        and (not st.session_state.trick_pending)
+        and (len(st.session_state.mesa) == len(ordem))
+        and not st.session_state.online_mode
+    ):
         schedule_trick_resolution()
-        st.rerun()
+        rerun("vaza_completa")
 
     if fim_de_rodada_pronto():
         pontuar_rodada()
         if st.session_state.cartas_alvo <= 1:
+            if st.session_state.online_mode:
+                # online quem encerra a partida é o worker da sala
+                online_autorefresh(ONLINE_WAIT_MS, key="online_wait_fim")
             st.session_state.fase = "fim"
             st.session_state.show_final = True
-            st.rerun()
+            rerun("fim_partida")
         render_placar_parcial()
         if st.button("▶️ Continuar jogo", use_container_width=True, key="btn_continue_game"):
             start_next_round()
-            st.rerun()
-        st.stop()
+            rerun("proxima_rodada")
+        if st.session_state.online_mode:
+            online_autorefresh(ONLINE_WAIT_MS, key="online_wait_placar")
+        parar()
 
-    render_mesa()
+    with medir("render_mesa"):
+        render_mesa()
 
     if st.session_state.trick_pending:
-        time.sleep(timing_config()["trick_tick"])
-        st.rerun()
+        if st.session_state.online_mode:
+            online_autorefresh(ONLINE_WAIT_MS, key="online_wait_vaza")
+        esperar_vaza()
 
-    if not is_human(atual) and st.session_state.pending_play is None:
+    if not is_human(atual) and st.session_state.pending_play is None and not st.session_state.online_mode:
         now = time.time()
         if now - st.session_state.autoplay_last > timing_config()["autoplay_delay"]:
             st.session_state.autoplay_last = now
             avancar_ate_humano_ou_fim()
-            time.sleep(timing_config()["ai_step_delay"])
-            st.rerun()
+            with medir("espera"):
+                time.sleep(timing_config()["ai_step_delay"])
+            rerun("autoplay")
 
     clicked = render_hand_clickable_streamlit()
     if clicked is not None:
         st.session_state.pending_play = clicked
-        st.rerun()
+        rerun("pending_play")
 
     if st.session_state.pending_play is not None and atual == humano:
-        time.sleep(timing_config()["play_delay"])
+        with medir("espera"):
+            time.sleep(timing_config()["play_delay"])
         carta = st.session_state.pending_play
         st.session_state.pending_play = None
+        if st.session_state.online_mode:
+            enviar_acao(servidor.JOGAR, humano, carta)
 
         jogar_carta(humano, carta)
         st.session_state.turn_idx = (st.session_state.turn_idx + 1) % len(ordem)
@@ -1916,16 +1316,10 @@ if st.session_state.fase == "jogo":
             schedule_trick_resolution()
 
         avancar_ate_humano_ou_fim()
-        st.rerun()
+        rerun("jogada")
 
-    if (
-        not is_human(atual)
-        and st.session_state.pending_play is None
-        and (not st.session_state.online_mode or st.session_state.is_host)
-    ):
-        now = time.time()
-        if now - st.session_state.autoplay_last > timing_config()["autoplay_delay"]:
-            st.session_state.autoplay_last = now
-            avancar_ate_humano_ou_fim()
-            time.sleep(timing_config()["ai_step_delay"])
-            rerun_with_room_sync()
+    if st.session_state.online_mode and atual != st.session_state.player_name:
+        # vez de outro jogador: espera o worker da sala publicar em vez de rerodar em intervalo fixo
+        online_autorefresh(ONLINE_WAIT_MS, key="online_wait_jogo")
+
+encerrar_medicao("fim")
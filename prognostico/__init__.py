@@ -0,0 +1 @@
+"""Núcleo do Jogo de Prognóstico, independente do Streamlit."""
@@ -0,0 +1,120 @@
+# prognostico/batch.py
+"""ai_prognostico vetorizado com NumPy para lotes de mãos.
+
+As mãos entram como matriz booleana (N, 52) na ordem de prognostico.cards.
+As somas seguem a mesma ordem do laço escalar (cartas em ordem de peso_carta,
+naipes ♠, ♦, ♣), então o resultado é idêntico ao de engine.ai_prognostico
+para mãos ordenadas como o distribuir deixa, com jitter desligado ou com o
+mesmo random.Random semeado.
+"""
+import random
+
+import numpy as np
+
+from prognostico.cards import CARTA_INT, INT_CARTA, LANE, NAIPE_LANE, N_CARTAS, TRUNFO, TRUNFO_LANE
+from prognostico.engine import HIGH_POINTS
+
+# Naipes não-trunfo na ordem do laço escalar
+_LANES_SEM_TRUNFO = [NAIPE_LANE[s] for s in ["♠", "♦", "♣"]]
+
+
+def maos_para_matriz(maos):
+    """Lista de mãos (listas de tuplas) -> matriz booleana (N, 52)."""
+    matriz = np.zeros((len(maos), N_CARTAS), dtype=bool)
+    for i, mao in enumerate(maos):
+        matriz[i, [CARTA_INT[c] for c in mao]] = True
+    return matriz
+
+
+def _pontos_por_carta(mult_trunfo):
+    return np.array(
+        [HIGH_POINTS.get(v, 0.0) * (mult_trunfo if n == TRUNFO else 1.00) for n, v in INT_CARTA]
+    )
+
+
+def ai_prognostico_lote(
+    maos,
+    cartas_por_jogador,
+    hard_mode: bool = False,
+    rng=None,
+    peso_trunfo: float = 0.95,
+    mult_trunfo: float = 1.35,
+    divisor: float = None,
+):
+    """Prognóstico para cada linha de maos (N, 52).
+
+    rng=None desliga o jitter (igual a ai_prognostico(..., jitter=False)).
+    Com um random.Random o ruído é sorteado linha a linha, na mesma sequência
+    de chamadas escalares (mãos vazias não sorteiam). Com um
+    np.random.Generator o ruído sai todo de uma vez, mais rápido, mas sem
+    bater com o escalar. peso_trunfo, mult_trunfo e divisor existem para
+    recalibrar as constantes; os padrões são os do escalar.
+    """
+    maos = np.asarray(maos, dtype=bool)
+    n = maos.shape[0]
+    counts = maos.reshape(n, 4, LANE).sum(axis=2)
+    trumps = counts[:, TRUNFO_LANE]
+    tem_cartas = counts.sum(axis=1) > 0
+
+    strength = trumps * peso_trunfo
+    pontos = _pontos_por_carta(mult_trunfo)
+    for col in np.flatnonzero(pontos):
+        strength = strength + np.where(maos[:, col], pontos[col], 0.0)
+
+    dois_trunfos = trumps >= 2
+    for lane in _LANES_SEM_TRUNFO:
+        c = counts[:, lane]
+        bonus = np.select(
+            [c == 0, c == 1, c == 2],
+            [
+                np.where(dois_trunfos, 0.55 + 0.25, 0.55 + 0.0),
+                np.where(dois_trunfos, 0.30 + 0.18, 0.30 + 0.0),
+                0.12,
+            ],
+            0.0,
+        )
+        strength = strength + bonus
+    distintos = (counts[:, _LANES_SEM_TRUNFO] > 0).sum(axis=1)
+    strength = np.where((trumps == 0) & (distintos >= 3), strength - 0.25, strength)
+
+    if divisor is None:
+        divisor = 2.25 if hard_mode else 2.4
+    expected = strength / divisor
+
+    variance = 0.12 if hard_mode else 0.25
+    if isinstance(rng, np.random.Generator):
+        expected = expected + rng.uniform(-variance, variance, size=n)
+    elif rng is not None:
+        ruido = np.zeros(n)
+        for i in np.flatnonzero(tem_cartas):
+            ruido[i] = rng.uniform(-variance, variance)
+        expected = expected + ruido
+
+    guess = np.rint(expected).astype(np.int64)
+    guess = np.clip(guess, 0, cartas_por_jogador)
+    return np.where(tem_cartas, guess, 0)
+
+
+def comparar_com_escalar(n_maos: int = 10000, cartas: int = 10, hard_mode: bool = False, semente: int = 0):
+    """Confere o lote contra engine.ai_prognostico; devolve quantas mãos divergiram."""
+    from prognostico.cards import criar_baralho, peso_carta
+    from prognostico.engine import ai_prognostico
+
+    rng_maos = random.Random(semente)
+    maos = []
+    for _ in range(n_maos):
+        baralho = criar_baralho()
+        rng_maos.shuffle(baralho)
+        maos.append(sorted(baralho[:cartas], key=peso_carta))
+    matriz = maos_para_matriz(maos)
+
+    divergencias = 0
+    lote = ai_prognostico_lote(matriz, cartas, hard_mode)
+    escalar = [ai_prognostico(m, cartas, hard_mode, jitter=False) for m in maos]
+    divergencias += int((lote != np.array(escalar)).sum())
+
+    lote = ai_prognostico_lote(matriz, cartas, hard_mode, rng=random.Random(semente))
+    rng = random.Random(semente)
+    escalar = [ai_prognostico(m, cartas, hard_mode, rng=rng) for m in maos]
+    divergencias += int((lote != np.array(escalar)).sum())
+    return divergencias
@@ -0,0 +1,177 @@
+# prognostico/cards.py
+"""Baralho, formatos das cartas e a representação compacta opcional.
+
+As cartas do jogo são tuplas ("♥", "Q"). Na forma compacta cada carta vira
+um int 0..51 e cada mão um bitmask de 52 bits, com uma faixa de 13 bits por
+naipe na ordem de ORDEM_NAIPE (♦, ♠, ♣, ♥). Dentro da faixa o bit segue
+PESO_VALOR, então a ordem dos ints é a mesma de peso_carta e as copas
+(trunfo) ocupam os bits mais altos.
+"""
+# =========================
+# BARALHO
+# =========================
+NAIPES = ["♠", "♦", "♣", "♥"]
+VALORES = [2, 3, 4, 5, 6, 7, 8, 9, 10, "J", "Q", "K", "A"]
+PESO_VALOR = {v: i for i, v in enumerate(VALORES)}
+ORDEM_NAIPE = {"♦": 0, "♠": 1, "♣": 2, "♥": 3}
+TRUNFO = "♥"
+
+# =========================
+# QUERY PARAMS
+# =========================
+NAIPE_PARAM = {"♠": "S", "♦": "D", "♣": "C", "♥": "H"}
+PARAM_NAIPE = {v: k for k, v in NAIPE_PARAM.items()}
+
+
+def carta_to_param(carta):
+    naipe, valor = carta
+    return f"{valor}{NAIPE_PARAM[naipe]}"
+
+
+def param_to_carta(param):
+    if not param:
+        return None
+    naipe = PARAM_NAIPE.get(param[-1])
+    if not naipe:
+        return None
+    valor_raw = param[:-1]
+    valor = int(valor_raw) if valor_raw.isdigit() else valor_raw
+    if valor not in VALORES:
+        return None
+    return (naipe, valor)
+
+
+def criar_baralho():
+    return [(n, v) for n in NAIPES for v in VALORES]
+
+
+def peso_carta(c):
+    naipe, valor = c
+    return (ORDEM_NAIPE[naipe], PESO_VALOR[valor])
+
+
+# =========================
+# BITMASK
+# =========================
+N_CARTAS = 52
+LANE = 13
+NAIPE_LANE = dict(ORDEM_NAIPE)
+LANE_NAIPE = {lane: naipe for naipe, lane in NAIPE_LANE.items()}
+TRUNFO_LANE = NAIPE_LANE[TRUNFO]
+
+LANE_MASK = [((1 << LANE) - 1) << (LANE * lane) for lane in range(4)]
+TRUNFO_MASK = LANE_MASK[TRUNFO_LANE]
+BARALHO_MASK = (1 << N_CARTAS) - 1
+
+INT_CARTA = [(LANE_NAIPE[i // LANE], VALORES[i % LANE]) for i in range(N_CARTAS)]
+CARTA_INT = {carta: i for i, carta in enumerate(INT_CARTA)}
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def popcount(mask):
+        return bin(mask).count("1")
+
+
+# =========================
+# CONVERSÕES
+# =========================
+def carta_to_int(carta):
+    return CARTA_INT[carta]
+
+
+def int_to_carta(idx):
+    return INT_CARTA[idx]
+
+
+def int_to_param(idx):
+    return carta_to_param(INT_CARTA[idx])
+
+
+def param_to_int(param):
+    carta = param_to_carta(param)
+    return None if carta is None else CARTA_INT[carta]
+
+
+def mao_to_mask(mao):
+    mask = 0
+    for carta in mao:
+        mask |= 1 << CARTA_INT[carta]
+    return mask
+
+
+def mask_to_mao(mask):
+    """Volta para a lista de tuplas, já ordenada como peso_carta."""
+    return [INT_CARTA[i] for i in iter_bits(mask)]
+
+
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# =========================
+# CONSULTAS
+# =========================
+def lane_de(idx):
+    return idx // LANE
+
+
+def peso_de(idx):
+    return idx % LANE
+
+
+def tem_naipe_mask(mask, lane):
+    return bool(mask & LANE_MASK[lane])
+
+
+def somente_trunfo_mask(mask):
+    return bool(mask) and not (mask & ~TRUNFO_MASK)
+
+
+def menor_carta(mask):
+    return (mask & -mask).bit_length() - 1 if mask else None
+
+
+def maior_carta(mask):
+    return mask.bit_length() - 1 if mask else None
+
+
+# =========================
+# REGRAS
+# =========================
+def cartas_validas_mask(mao, naipe_base, primeira_vaza, copas_quebrada):
+    """Mesmas regras de engine.cartas_validas_para_jogar; naipe_base é a faixa (0..3) ou None."""
+    if not mao:
+        return 0
+
+    if naipe_base is not None:
+        do_naipe = mao & LANE_MASK[naipe_base]
+        if do_naipe:
+            return do_naipe
+        if primeira_vaza and (mao & ~TRUNFO_MASK):
+            return mao & ~TRUNFO_MASK
+        return mao
+
+    if primeira_vaza or not copas_quebrada:
+        sem_trunfo = mao & ~TRUNFO_MASK
+        if sem_trunfo:
+            return sem_trunfo
+    return mao
+
+
+def carta_vencedora(mesa_mask, naipe_base):
+    """Carta que leva a vaza: a copa mais alta ou, sem copas, a maior do naipe base."""
+    return maior_carta(mesa_mask & (TRUNFO_MASK | LANE_MASK[naipe_base]))
+
+
+def vencedor_da_vaza_mask(mesa_snapshot, naipe_base):
+    """mesa_snapshot é uma lista de (nome, carta_int), como a mesa do engine."""
+    mesa_mask = 0
+    dono = {}
+    for nome, idx in mesa_snapshot:
+        mesa_mask |= 1 << idx
+        dono[idx] = nome
+    return dono[carta_vencedora(mesa_mask, naipe_base)]
@@ -0,0 +1,228 @@
+# prognostico/carga.py
+"""Teste de carga das salas online, sem navegador nem rede.
+
+Cria N salas com M clientes humanos simulados cada (mais bots), todos no
+mesmo RoomStore e no mesmo Servidor que o app usa. Cada cliente é uma thread
+que faz o que uma sessão do Streamlit faz a cada rerun: puxar (sync_from_room),
+ler o estado (get_room_state), jogar quando é a sua vez (ação para o worker da
+sala) e empurrar (sync_to_room). Entre um rerun e outro o cliente espera a
+sala mudar, com no máximo --rerun-ms de intervalo, como o online_autorefresh.
+Quando uma partida acaba a sala começa outra, até o fim de --segundos.
+
+Uso:
+    python -m prognostico.carga --salas 200 --clientes 3 --bots 2 --segundos 30
+    python -m prognostico.carga --salas 50 --db /tmp/carga.db --alocacoes
+"""
+import argparse
+import os
+import random
+import threading
+import time
+import tracemalloc
+
+from prognostico import engine, salas, servidor, tabelas
+from prognostico.engine import GameState, ordem_da_mesa
+from prognostico.persistencia import SQLiteBackend
+from prognostico.salas import RoomStore
+
+
+def nomes_bots(n: int):
+    return [f"IA {i + 1}" for i in range(n)]
+
+
+def nova_partida(nome: str, humanos, args):
+    """A ação com que o anfitrião `nome` cria a sala (ou recomeça depois do fim)."""
+    opcoes = {"cartas_inicio": args.cartas, "fast_mode": True}
+    return (servidor.NOVA_PARTIDA, nome, list(humanos) + nomes_bots(args.bots), list(humanos), opcoes)
+
+
+class Medidas:
+    """Tempos (s) por operação; cada cliente tem a sua, somadas no fim."""
+
+    OPERACOES = ("get_room_state", "sync_from_room", "sync_to_room", "acao")
+
+    def __init__(self):
+        self.tempos = {op: [] for op in self.OPERACOES}
+        self.reruns = 0
+        self.acoes_recusadas = 0
+        self.partidas = 0
+
+    def mesclar(self, outra: "Medidas"):
+        for op in self.OPERACOES:
+            self.tempos[op].extend(outra.tempos[op])
+        self.reruns += outra.reruns
+        self.acoes_recusadas += outra.acoes_recusadas
+        self.partidas += outra.partidas
+
+
+def _percentil(ordenados, q: float) -> float:
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+def _acao_do_cliente(sala, nome: str, rng):
+    """A ação que este humano faria agora, ou None se não é a vez dele."""
+    fase = sala["fase"]
+    if fase == "prognostico":
+        ordem = ordem_da_mesa(sala["nomes"], sala["mao_da_rodada"])
+        idx = sala["progn_turn_idx"]
+        if idx < len(ordem) and ordem[idx] == nome:
+            return (servidor.PROGNOSTICO, nome, rng.randint(0, len(sala["maos"][nome])))
+        return None
+    if fase != "jogo" or sala["trick_pending"] or not sala["ordem"]:
+        return None
+    if servidor.fim_de_rodada_pronto(sala):
+        # o primeiro humano da lista faz o papel de quem clica em "Continuar"
+        if sala["humanos"][0] == nome and sala["cartas_alvo"] > 1:
+            return (servidor.PROXIMA_RODADA,)
+        return None
+    if sala["ordem"][sala["turn_idx"]] != nome:
+        return None
+    validas = engine.cartas_validas_para_jogar(GameState.from_mapping(sala), nome)
+    return (servidor.JOGAR, nome, rng.choice(validas)) if validas else None
+
+
+def _cliente(store, srv, code, nome, anfitriao, args, fim, medidas, seed):
+    rng = random.Random(seed)
+    sessao = {"room_snapshot": None}
+    rerun_s = args.rerun_ms / 1000.0
+    tempos = medidas.tempos
+    since = 0
+    while time.monotonic() < fim:
+        store.wait(code, since, rerun_s * rng.uniform(0.5, 1.5))
+        medidas.reruns += 1
+
+        t0 = time.perf_counter()
+        salas.puxar(store, sessao, code, jogador=nome)
+        t1 = time.perf_counter()
+        snap = store.get(code)
+        t2 = time.perf_counter()
+        tempos["sync_from_room"].append(t1 - t0)
+        tempos["get_room_state"].append(t2 - t1)
+        if snap is None:
+            continue
+        since = snap.version
+
+        if sessao.get("fase") == "fim":
+            if anfitriao:
+                medidas.partidas += 1
+                srv.enviar(code, nova_partida(nome, sessao["humanos"], args)).esperar(5.0)
+            continue
+
+        acao = _acao_do_cliente(sessao, nome, rng) if "fase" in sessao else None
+        if acao is not None:
+            t0 = time.perf_counter()
+            pedido = srv.enviar(code, acao)
+            pedido.esperar(5.0)
+            tempos["acao"].append(time.perf_counter() - t0)
+            if pedido.erro:
+                medidas.acoes_recusadas += 1
+
+        t0 = time.perf_counter()
+        salas.empurrar(store, sessao, code, jogador=nome)
+        tempos["sync_to_room"].append(time.perf_counter() - t0)
+
+
+def rodar(args):
+    backend = None
+    if args.db:
+        for sufixo in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + sufixo):
+                os.remove(args.db + sufixo)
+        backend = SQLiteBackend(args.db)
+    store = RoomStore(n_shards=args.shards, backend=backend, max_salas=max(args.salas, 1))
+    srv = servidor.Servidor(store)
+    rng = random.Random(args.seed)
+
+    tabelas.padrao()  # como o app, carrega as tabelas antes de abrir as salas
+    if args.alocacoes:
+        tracemalloc.start()
+
+    threads = []
+    medidas = []
+    for s in range(args.salas):
+        code = f"SALA{s:04d}"
+        humanos = [f"H{s}-{c}" for c in range(args.clientes)]
+        srv.enviar(code, nova_partida(humanos[0], humanos, args)).esperar(5.0)
+        for c, nome in enumerate(humanos):
+            threads.append((code, nome, c == 0))
+
+    inicio = time.perf_counter()
+    fim = time.monotonic() + args.segundos
+    vivas = []
+    for code, nome, anfitriao in threads:
+        m = Medidas()
+        medidas.append(m)
+        t = threading.Thread(
+            target=_cliente,
+            args=(store, srv, code, nome, anfitriao, args, fim, m, rng.random()),
+            daemon=True,
+        )
+        t.start()
+        vivas.append(t)
+    for t in vivas:
+        t.join()
+    duracao = time.perf_counter() - inicio
+
+    total = Medidas()
+    for m in medidas:
+        total.mesclar(m)
+    alocacao = tracemalloc.get_traced_memory() if args.alocacoes else None
+    if args.alocacoes:
+        tracemalloc.stop()
+    resumo = store.resumo()
+    travas = store.estatisticas()
+    workers = list(srv.workers.values())
+    store.close()
+    return duracao, total, resumo, travas, workers, alocacao
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga das salas online (RoomStore + workers).")
+    parser.add_argument("--salas", type=int, default=100)
+    parser.add_argument("--clientes", type=int, default=3, help="humanos (clientes) por sala")
+    parser.add_argument("--bots", type=int, default=2, help="bots por sala")
+    parser.add_argument("--cartas", type=int, default=5, help="cartas da primeira rodada (partidas mais curtas)")
+    parser.add_argument("--segundos", type=float, default=20.0)
+    parser.add_argument("--rerun-ms", type=int, default=500, help="intervalo máximo entre reruns de um cliente")
+    parser.add_argument("--shards", type=int, default=salas.N_SHARDS)
+    parser.add_argument("--db", help="usa SQLiteBackend neste arquivo (é recriado)")
+    parser.add_argument("--alocacoes", action="store_true", help="mede alocações com tracemalloc (mais lento)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    n = args.clientes + args.bots
+    if n < 2 or args.clientes < 1 or args.cartas * n > 52:
+        parser.error("precisa de pelo menos 1 cliente, 2 jogadores e --cartas × jogadores <= 52")
+
+    print(
+        f"{args.salas} salas × {args.clientes} clientes + {args.bots} bots, {args.segundos:.0f}s, "
+        f"rerun até {args.rerun_ms} ms, {args.shards} shards, backend {'SQLite' if args.db else 'memória'}"
+    )
+    duracao, total, resumo, travas, workers, alocacao = rodar(args)
+
+    print(f"\n{'Operação':<16} {'Chamadas':>9} {'Por s':>9} {'p50':>9} {'p99':>9} {'Máx':>9}")
+    for op in Medidas.OPERACOES:
+        tempos = sorted(total.tempos[op])
+        print(
+            f"{op:<16} {len(tempos):>9} {len(tempos) / duracao:>9,.0f} "
+            f"{_percentil(tempos, 0.50) * 1e3:>7.3f}ms {_percentil(tempos, 0.99) * 1e3:>7.3f}ms "
+            f"{(tempos[-1] if tempos else 0.0) * 1e3:>7.3f}ms"
+        )
+    print(f"\nReruns: {total.reruns} ({total.reruns / duracao:,.0f}/s) • Partidas completas: {total.partidas}")
+    print(f"Ações recusadas: {total.acoes_recusadas} • Conflitos de versão: {travas['conflitos']}")
+    print(
+        f"Locks: {travas['aquisicoes']} • Contenções: {travas['contencoes']} • "
+        f"Espera média {travas['espera_media_ms']:.3f} ms • máx. {travas['espera_max_ms']:.3f} ms"
+    )
+    print(
+        f"Salas na memória: {resumo['salas']} • {resumo['bytes'] / 1024:,.1f} KB "
+        f"(maior {resumo['maior_sala_bytes'] / 1024:,.1f} KB) • Workers vivos: {len(workers)}"
+    )
+    if alocacao is not None:
+        atual, pico = alocacao
+        print(f"Alocações (tracemalloc): atual {atual / 2**20:,.1f} MB • pico {pico / 2**20:,.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
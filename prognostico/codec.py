@@ -0,0 +1,409 @@
+# prognostico/codec.py
+"""Formato binário compacto e versionado para o estado das salas.
+
+    b"PG" + versão (1 byte) + flags (1 byte)
+    tabela de textos: quantidade, e cada texto em UTF-8 com o tamanho antes
+    entradas: quantidade, e cada uma = chave + valor (+ versão da chave)
+
+Inteiros são varint (zigzag). A chave é o índice em ROOM_STATE_KEYS + 1, ou 0
+seguido do texto para chaves fora da lista. Todo texto (nomes dos jogadores,
+fase, ...) entra uma vez na tabela e depois vira um índice. Uma carta é um
+byte (o int de prognostico.cards); uma mão ordenada como peso_carta é um
+bitmask de 7 bytes; MemoriaCartas vira dois bitmasks e os vazios por nome.
+A decodificação devolve os mesmos tipos (tuplas, listas, dicts) do original.
+
+Ida e volta e comparação com pickle/deepcopy:
+    python -m prognostico.codec
+"""
+import struct
+
+from prognostico.cards import CARTA_INT, INT_CARTA
+from prognostico.memoria import MemoriaCartas
+from prognostico.salas import ROOM_STATE_KEYS
+
+MAGIC = b"PG"
+VERSAO = 1
+COM_VERSOES = 1  # flag: cada entrada traz a versão em que a chave mudou
+
+_KEY_ID = {key: i + 1 for i, key in enumerate(ROOM_STATE_KEYS)}
+
+(
+    T_NONE,
+    T_FALSE,
+    T_TRUE,
+    T_INT,
+    T_FLOAT,
+    T_TEXTO,
+    T_CARTA,
+    T_MAO,
+    T_LISTA,
+    T_TUPLA,
+    T_DICT,
+    T_MEMORIA,
+    T_BYTES,
+) = range(13)
+
+_DOUBLE = struct.Struct("<d")
+
+
+class CodecError(ValueError):
+    pass
+
+
+# =========================
+# VARINT
+# =========================
+def put_uint(buf: bytearray, n: int):
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def get_uint(dados, pos: int):
+    n = shift = 0
+    while True:
+        b = dados[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+# =========================
+# ENCODE
+# =========================
+class _Encoder:
+    def __init__(self):
+        self.textos = {}
+        self.buf = bytearray()
+
+    def texto(self, s: str):
+        idx = self.textos.get(s)
+        if idx is None:
+            idx = self.textos[s] = len(self.textos)
+        put_uint(self.buf, idx)
+
+    def valor(self, v):
+        buf = self.buf
+        tipo = type(v)
+        if v is None:
+            buf.append(T_NONE)
+        elif tipo is bool:
+            buf.append(T_TRUE if v else T_FALSE)
+        elif tipo is int:
+            buf.append(T_INT)
+            put_uint(buf, v << 1 if v >= 0 else ((-v) << 1) - 1)
+        elif tipo is float:
+            buf.append(T_FLOAT)
+            buf += _DOUBLE.pack(v)
+        elif tipo is str:
+            buf.append(T_TEXTO)
+            self.texto(v)
+        elif tipo is tuple:
+            idx = _carta_int(v) if len(v) == 2 else None
+            if idx is not None and type(v[1]) is type(INT_CARTA[idx][1]):
+                buf.append(T_CARTA)
+                buf.append(idx)
+            else:
+                buf.append(T_TUPLA)
+                put_uint(buf, len(v))
+                for x in v:
+                    self.valor(x)
+        elif tipo is list:
+            mask = _mao_ordenada(v)
+            if mask is not None:
+                buf.append(T_MAO)
+                buf += mask.to_bytes(7, "little")
+            else:
+                buf.append(T_LISTA)
+                put_uint(buf, len(v))
+                for x in v:
+                    self.valor(x)
+        elif tipo is dict:
+            buf.append(T_DICT)
+            put_uint(buf, len(v))
+            for k, x in v.items():
+                self.valor(k)
+                self.valor(x)
+        elif tipo is MemoriaCartas:
+            buf.append(T_MEMORIA)
+            buf += v.restantes.to_bytes(7, "little")
+            buf += v.na_mesa.to_bytes(7, "little")
+            put_uint(buf, len(v.vazios))
+            for nome, lanes in v.vazios.items():
+                self.texto(nome)
+                buf.append(lanes)
+        elif tipo is bytes:
+            buf.append(T_BYTES)
+            put_uint(buf, len(v))
+            buf += v
+        else:
+            raise CodecError(f"tipo sem codificação: {tipo.__name__}")
+
+
+def _carta_int(v):
+    try:
+        return CARTA_INT.get(v)
+    except TypeError:  # tupla com algo não hashable
+        return None
+
+
+def _mao_ordenada(v):
+    """Bitmask se `v` é uma lista não vazia de cartas em ordem crescente, senão None."""
+    if not v:
+        return None
+    mask = 0
+    anterior = -1
+    for c in v:
+        if type(c) is not tuple:
+            return None
+        idx = CARTA_INT.get(c)
+        if idx is None or idx <= anterior or type(c[1]) is not type(INT_CARTA[idx][1]):
+            return None
+        mask |= 1 << idx
+        anterior = idx
+    return mask
+
+
+def encode(state, key_versions=None) -> bytes:
+    """Codifica um dict de estado da sala; key_versions opcional vai junto."""
+    enc = _Encoder()
+    buf = enc.buf
+    put_uint(buf, len(state))
+    for key, v in state.items():
+        key_id = _KEY_ID.get(key)
+        if key_id is None:
+            buf.append(0)
+            enc.texto(key)
+        else:
+            put_uint(buf, key_id)
+        enc.valor(v)
+        if key_versions is not None:
+            put_uint(buf, key_versions.get(key, 0))
+
+    cabecalho = bytearray(MAGIC)
+    cabecalho.append(VERSAO)
+    cabecalho.append(COM_VERSOES if key_versions is not None else 0)
+    put_uint(cabecalho, len(enc.textos))
+    for s in enc.textos:
+        raw = s.encode("utf-8")
+        put_uint(cabecalho, len(raw))
+        cabecalho += raw
+    return bytes(cabecalho + buf)
+
+
+# =========================
+# DECODE
+# =========================
+class _Decoder:
+    def __init__(self, dados):
+        self.dados = dados
+        self.pos = 0
+        self.textos = []
+
+    def uint(self):
+        n, self.pos = get_uint(self.dados, self.pos)
+        return n
+
+    def texto(self):
+        return self.textos[self.uint()]
+
+    def mask(self):
+        pos = self.pos
+        self.pos = pos + 7
+        return int.from_bytes(self.dados[pos:pos + 7], "little")
+
+    def valor(self):
+        tag = self.dados[self.pos]
+        self.pos += 1
+        if tag == T_NONE:
+            return None
+        if tag == T_FALSE:
+            return False
+        if tag == T_TRUE:
+            return True
+        if tag == T_INT:
+            n = self.uint()
+            return n >> 1 if not n & 1 else -((n + 1) >> 1)
+        if tag == T_FLOAT:
+            v = _DOUBLE.unpack_from(self.dados, self.pos)[0]
+            self.pos += 8
+            return v
+        if tag == T_TEXTO:
+            return self.texto()
+        if tag == T_CARTA:
+            self.pos += 1
+            return INT_CARTA[self.dados[self.pos - 1]]
+        if tag == T_MAO:
+            mask = self.mask()
+            mao = []
+            while mask:
+                low = mask & -mask
+                mao.append(INT_CARTA[low.bit_length() - 1])
+                mask ^= low
+            return mao
+        if tag == T_LISTA:
+            return [self.valor() for _ in range(self.uint())]
+        if tag == T_TUPLA:
+            return tuple(self.valor() for _ in range(self.uint()))
+        if tag == T_DICT:
+            n = self.uint()
+            d = {}
+            for _ in range(n):
+                k = self.valor()
+                d[k] = self.valor()
+            return d
+        if tag == T_MEMORIA:
+            memoria = MemoriaCartas.__new__(MemoriaCartas)
+            memoria.restantes = self.mask()
+            memoria.na_mesa = self.mask()
+            vazios = {}
+            for _ in range(self.uint()):
+                nome = self.texto()
+                vazios[nome] = self.dados[self.pos]
+                self.pos += 1
+            memoria.vazios = vazios
+            return memoria
+        if tag == T_BYTES:
+            n = self.uint()
+            self.pos += n
+            return bytes(self.dados[self.pos - n:self.pos])
+        raise CodecError(f"tag desconhecida: {tag}")
+
+
+def decode(dados):
+    """Volta para (state, key_versions); key_versions é None se não foi gravado.
+
+    Dados truncados, com sobra no fim ou corrompidos levantam CodecError.
+    """
+    if len(dados) < 4 or dados[:2] != MAGIC:
+        raise CodecError("não é um estado de sala codificado")
+    if dados[2] != VERSAO:
+        raise CodecError(f"versão do formato não suportada: {dados[2]}")
+    try:
+        state, key_versions, fim = _decode(dados)
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise CodecError(f"estado truncado ou corrompido: {e}") from None
+    if fim != len(dados):
+        raise CodecError(f"estado truncado ou corrompido: {fim} bytes lidos de {len(dados)}")
+    return state, key_versions
+
+
+def _decode(dados):
+    com_versoes = dados[3] & COM_VERSOES
+    dec = _Decoder(memoryview(dados))
+    dec.pos = 4
+    for _ in range(dec.uint()):
+        n = dec.uint()
+        dec.textos.append(bytes(dec.dados[dec.pos:dec.pos + n]).decode("utf-8"))
+        dec.pos += n
+
+    state = {}
+    key_versions = {} if com_versoes else None
+    for _ in range(dec.uint()):
+        key_id = dec.uint()
+        key = ROOM_STATE_KEYS[key_id - 1] if key_id else dec.texto()
+        state[key] = dec.valor()
+        if com_versoes:
+            key_versions[key] = dec.uint()
+    return state, key_versions, dec.pos
+
+
+# =========================
+# IDA E VOLTA / BENCHMARK
+# =========================
+def _estados_de_exemplo(semente: int = 0):
+    """Estados de sala em várias fases de partidas simuladas, com todas as ROOM_STATE_KEYS."""
+    import random
+
+    from prognostico import engine
+    from prognostico.engine import GameState
+
+    rng = random.Random(semente)
+    estados = []
+    for n in (2, 4, 6, 8):
+        nomes = [f"Jogador {i + 1}" for i in range(n - 1)] + ["Você ♥"]
+        estado = GameState(nomes, humanos=nomes[-1:], rng=rng)
+        estado.cartas_inicio = 52 // n
+        engine.distribuir(estado, estado.cartas_inicio)
+        extras = {
+            "started": True, "show_final": False, "pending_play": None, "table_pop_until": 0.0,
+            "winner_flash_name": None, "winner_flash_until": rng.random() * 1e9, "trick_pending": False,
+            "trick_phase": None, "trick_resolve_at": 0.0, "trick_fly_until": 0.0, "trick_winner": None,
+            "trick_snapshot": [], "autoplay_last": rng.random() * 1e9, "neon_mode": True,
+            "fast_mode": False, "players_online": nomes[-1:],
+        }
+        for fase in range(3):
+            if fase == 1:
+                estado.prognosticos = {nome: rng.randint(0, 3) for nome in nomes}
+                engine.iniciar_fase_jogo(estado)
+            elif fase == 2:
+                for _ in range(rng.randint(1, n * 2)):
+                    atual = estado.ordem[estado.turn_idx]
+                    if len(estado.mesa) == n:
+                        extras["trick_snapshot"] = list(estado.mesa)
+                        engine.recolher_vaza(estado, engine.vencedor_da_vaza(estado.mesa, estado.naipe_base))
+                        continue
+                    engine.jogar_carta(estado, atual, engine.ai_escolhe_carta(estado, atual))
+                    estado.turn_idx = (estado.turn_idx + 1) % n
+            state = dict(estado.to_mapping(), **extras)
+            estados.append({key: state[key] for key in ROOM_STATE_KEYS})
+    return estados
+
+
+def _igual(a, b) -> bool:
+    """Igualdade que também exige o mesmo tipo em todos os níveis (10 != 10.0, tupla != lista)."""
+    if type(a) is not type(b):
+        return False
+    if type(a) in (list, tuple):
+        return len(a) == len(b) and all(_igual(x, y) for x, y in zip(a, b))
+    if type(a) is dict:
+        return list(a) == list(b) and all(_igual(a[k], b[k]) for k in a)
+    return a == b
+
+
+def conferir(estados=None) -> int:
+    """Ida e volta em cada estado (com e sem versões); devolve quantos divergiram."""
+    falhas = 0
+    for state in estados or _estados_de_exemplo():
+        versoes = {key: i for i, key in enumerate(state)}
+        for kv in (None, versoes):
+            volta, volta_kv = decode(encode(state, kv))
+            if not _igual(volta, state) or volta_kv != kv:
+                falhas += 1
+    return falhas
+
+
+def main():
+    import copy
+    import pickle
+    import timeit
+
+    from prognostico.salas import copiar
+
+    estados = _estados_de_exemplo()
+    print(f"Ida e volta: {len(estados) * 2 - conferir(estados)}/{len(estados) * 2} ok")
+
+    vezes = 200
+    medidas = [
+        ("codec encode", lambda: [encode(s) for s in estados]),
+        ("codec decode", lambda: [decode(b) for b in codificados]),
+        ("codec ida e volta", lambda: [decode(encode(s)) for s in estados]),
+        ("pickle dumps", lambda: [pickle.dumps(s, pickle.HIGHEST_PROTOCOL) for s in estados]),
+        ("pickle ida e volta", lambda: [pickle.loads(pickle.dumps(s, pickle.HIGHEST_PROTOCOL)) for s in estados]),
+        ("copy.deepcopy", lambda: [copy.deepcopy(s) for s in estados]),
+        ("salas.copiar", lambda: [copiar(s) for s in estados]),
+    ]
+    codificados = [encode(s) for s in estados]
+    tam_codec = sum(len(b) for b in codificados)
+    tam_pickle = sum(len(pickle.dumps(s, pickle.HIGHEST_PROTOCOL)) for s in estados)
+    print(f"Bytes por estado: codec {tam_codec / len(estados):,.0f} • pickle {tam_pickle / len(estados):,.0f}")
+    for nome, fn in medidas:
+        t = timeit.timeit(fn, number=vezes) / (vezes * len(estados))
+        print(f"{nome:<20} {t * 1e6:>8.1f} µs/estado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+# prognostico/engine.py
+"""Regras do jogo sem Streamlit.
+
+O app.py carrega um GameState a partir do st.session_state, chama as funções
+daqui e grava o estado de volta. O simulador usa as mesmas funções direto.
+"""
+import random
+
+from prognostico.cards import PESO_VALOR, TRUNFO, criar_baralho, peso_carta
+from prognostico.memoria import MemoriaCartas
+
+# =========================
+# REGRAS
+# =========================
+HIGH_POINTS = {"A": 1.40, "K": 1.05, "Q": 0.80, "J": 0.55, 10: 0.35, 9: 0.20}
+
+# Solver double-dummy no modo difícil: até quantas cartas restando nas mãos de
+# todos e quantos nós por jogada (~30 ms no pior caso)
+SOLVER_MAX_CARTAS = 12
+SOLVER_ORCAMENTO = 10000
+
+# Resultado de avancar_ate_humano_ou_fim
+VEZ_HUMANO = "humano"
+VAZA_COMPLETA = "vaza"
+FIM_RODADA = "fim_rodada"
+
+
+def ordem_da_mesa(nomes, mao_idx):
+    return [nomes[(mao_idx + i) % len(nomes)] for i in range(len(nomes))]
+
+
+def somente_trunfo(mao):
+    return all(n == TRUNFO for (n, _) in mao) if mao else False
+
+
+def tem_naipe(mao, naipe):
+    for n, _ in mao:
+        if n == naipe:
+            return True
+    return False
+
+
+# =========================
+# ESTADO
+# =========================
+GAME_STATE_KEYS = (
+    "nomes",
+    "humanos",
+    "pontos",
+    "vazas_rodada",
+    "maos",
+    "rodada",
+    "cartas_inicio",
+    "cartas_alvo",
+    "sobras_monte",
+    "mao_da_rodada",
+    "mao_primeira_sorteada",
+    "fase",
+    "prognosticos",
+    "progn_turn_idx",
+    "ordem",
+    "turn_idx",
+    "naipe_base",
+    "mesa",
+    "primeira_vaza",
+    "copas_quebrada",
+    "pontuou_rodada",
+    "pile_counts",
+    "hard_mode",
+    "expert_mode",
+    "memoria",
+    "semente_partida",
+)
+
+
+class GameState:
+    """Estado de uma partida com os mesmos nomes de chave do st.session_state.
+
+    rng é o gerador usado para embaralhar e para as escolhas dos bots; por padrão
+    o módulo random global, ou qualquer random.Random injetado (simulador, testes).
+    memoria é a MemoriaCartas da rodada atual (cartas jogadas e vazios conhecidos).
+    semente_partida define o embaralhamento de todas as rodadas, num gerador
+    separado do rng (sorteada do rng na primeira distribuição se for None).
+    registro, se houver, é o prognostico.replay.Registro que anota a partida.
+    """
+
+    __slots__ = GAME_STATE_KEYS + ("rng", "registro")
+
+    def __init__(self, nomes, humanos=(), hard_mode=False, rng=None, expert_mode=False):
+        self.rng = rng if rng is not None else random
+        self.nomes = list(nomes)
+        self.humanos = list(humanos)
+        self.pontos = {n: 0 for n in self.nomes}
+        self.vazas_rodada = {}
+        self.maos = {}
+        self.rodada = 1
+        self.cartas_inicio = 0
+        self.cartas_alvo = 0
+        self.sobras_monte = 0
+        self.mao_da_rodada = 0
+        self.mao_primeira_sorteada = False
+        self.fase = "setup"
+        self.prognosticos = {}
+        self.progn_turn_idx = 0
+        self.ordem = []
+        self.turn_idx = 0
+        self.naipe_base = None
+        self.mesa = []
+        self.primeira_vaza = True
+        self.copas_quebrada = False
+        self.pontuou_rodada = False
+        self.pile_counts = {}
+        self.hard_mode = hard_mode
+        self.expert_mode = expert_mode
+        self.memoria = MemoriaCartas()
+        self.semente_partida = None
+        self.registro = None
+
+    @classmethod
+    def from_mapping(cls, data, rng=None, registro=None):
+        """Cria o estado lendo cada chave uma única vez (ex.: st.session_state)."""
+        estado = cls.__new__(cls)
+        for key in GAME_STATE_KEYS:
+            setattr(estado, key, data[key])
+        estado.rng = rng if rng is not None else random
+        estado.registro = registro
+        return estado
+
+    def to_mapping(self):
+        return {key: getattr(self, key) for key in GAME_STATE_KEYS}
+
+
+# =========================
+# GAME CORE
+# =========================
+def rng_da_rodada(semente_partida: int, rodada: int):
+    """Gerador do embaralhamento (e do primeiro mão) de uma rodada; não é o dos bots."""
+    return random.Random(f"{semente_partida}/{rodada}")
+
+
+def distribuir(estado, cartas_alvo: int):
+    nomes = estado.nomes
+    n = len(nomes)
+    if estado.semente_partida is None:
+        estado.semente_partida = estado.rng.getrandbits(63)
+    rng = rng_da_rodada(estado.semente_partida, estado.rodada)
+    baralho = criar_baralho()
+    rng.shuffle(baralho)
+
+    estado.sobras_monte = len(baralho) - cartas_alvo * n
+    estado.cartas_alvo = cartas_alvo
+
+    maos = {nome: [] for nome in nomes}
+    for _ in range(cartas_alvo):
+        for nome in nomes:
+            maos[nome].append(baralho.pop())
+    for nome in nomes:
+        maos[nome].sort(key=peso_carta)
+    estado.maos = maos
+
+    if not estado.mao_primeira_sorteada:
+        estado.mao_da_rodada = rng.randint(0, n - 1)
+        estado.mao_primeira_sorteada = True
+    else:
+        estado.mao_da_rodada = (estado.mao_da_rodada + 1) % n
+
+    estado.prognosticos = {}
+    estado.progn_turn_idx = 0
+    estado.vazas_rodada = {nome: 0 for nome in nomes}
+    estado.pile_counts = {nome: 0 for nome in nomes}
+
+    estado.fase = "prognostico"
+    estado.pontuou_rodada = False
+    estado.memoria = MemoriaCartas()
+
+
+def ai_prognostico(
+    mao, cartas_por_jogador: int, hard_mode: bool = False, *_args, rng=None, jitter: bool = True,
+    n_jogadores: int = None, posicao: int = 0, **_kwargs
+) -> int:
+    """Com n_jogadores usa as tabelas de prognostico.tabelas (sem jitter); sem tabela, a heurística."""
+    if not mao:
+        return 0
+    if n_jogadores is not None:
+        from prognostico import tabelas
+
+        palpite = tabelas.padrao().palpite(mao, n_jogadores, posicao, hard_mode)
+        if palpite is not None:
+            return min(palpite, cartas_por_jogador)
+    suit_counts = {"♠": 0, "♦": 0, "♣": 0, "♥": 0}
+    for n, v in mao:
+        suit_counts[n] += 1
+    trumps = suit_counts["♥"]
+    strength = 0.0
+    strength += trumps * 0.95
+    for n, v in mao:
+        base = HIGH_POINTS.get(v, 0.0)
+        strength += base * (1.35 if n == "♥" else 1.00)
+    for s in ["♠", "♦", "♣"]:
+        c = suit_counts[s]
+        if c == 0:
+            strength += 0.55 + (0.25 if trumps >= 2 else 0.0)
+        elif c == 1:
+            strength += 0.30 + (0.18 if trumps >= 2 else 0.0)
+        elif c == 2:
+            strength += 0.12
+    distinct_nontrump_suits = sum(1 for s in ["♠", "♦", "♣"] if suit_counts[s] > 0)
+    if trumps == 0 and distinct_nontrump_suits >= 3:
+        strength -= 0.25
+    divisor = 2.25 if hard_mode else 2.4
+    expected = strength / divisor
+    variance = 0.12 if hard_mode else 0.25
+    if jitter:
+        expected += (rng or random).uniform(-variance, variance)
+    guess = int(round(expected))
+    guess = max(0, min(cartas_por_jogador, guess))
+    return guess
+
+
+def registrar_prognostico(estado, nome, valor: int):
+    estado.prognosticos[nome] = valor
+    if estado.registro is not None:
+        estado.registro.prognostico(nome, valor)
+
+
+def avancar_prognosticos(estado):
+    """Faz os prognósticos dos bots até a vez de um humano (ou até todos terem feito)."""
+    ordem = ordem_da_mesa(estado.nomes, estado.mao_da_rodada)
+    humanos = estado.humanos
+    while estado.progn_turn_idx < len(ordem):
+        nome = ordem[estado.progn_turn_idx]
+        if nome in humanos:
+            return
+        if nome not in estado.prognosticos:
+            registrar_prognostico(
+                estado,
+                nome,
+                ai_prognostico(
+                    estado.maos[nome],
+                    estado.cartas_alvo,
+                    estado.hard_mode,
+                    rng=estado.rng,
+                    n_jogadores=len(ordem),
+                    posicao=estado.progn_turn_idx,
+                ),
+            )
+        estado.progn_turn_idx += 1
+
+
+def iniciar_fase_jogo(estado):
+    estado.ordem = ordem_da_mesa(estado.nomes, estado.mao_da_rodada)
+    estado.turn_idx = 0
+    estado.naipe_base = None
+    estado.mesa = []
+    estado.primeira_vaza = True
+    estado.copas_quebrada = False
+    estado.fase = "jogo"
+
+
+def cartas_validas_para_jogar(estado, nome):
+    mao = estado.maos[nome]
+    naipe_base = estado.naipe_base
+
+    if not mao:
+        return []
+
+    if naipe_base and tem_naipe(mao, naipe_base):
+        return [c for c in mao if c[0] == naipe_base]
+
+    if naipe_base and not tem_naipe(mao, naipe_base):
+        if estado.primeira_vaza and not somente_trunfo(mao):
+            return [c for c in mao if c[0] != TRUNFO]
+        return mao[:]
+
+    if naipe_base is None:
+        if estado.primeira_vaza:
+            if somente_trunfo(mao):
+                return mao[:]
+            return [c for c in mao if c[0] != TRUNFO]
+        if not estado.copas_quebrada and not somente_trunfo(mao):
+            return [c for c in mao if c[0] != TRUNFO]
+
+    return mao[:]
+
+
+def jogar_carta(estado, nome, carta):
+    estado.maos[nome].remove(carta)
+    estado.memoria.registrar_jogada(nome, carta, estado.naipe_base)
+    if estado.naipe_base is None:
+        estado.naipe_base = carta[0]
+    if carta[0] == TRUNFO and not estado.primeira_vaza:
+        estado.copas_quebrada = True
+    estado.mesa.append((nome, carta))
+    if estado.registro is not None:
+        estado.registro.jogada(nome, carta)
+
+
+def vencedor_da_vaza(mesa_snapshot, naipe_base_snapshot):
+    copas = [(n, c) for (n, c) in mesa_snapshot if c[0] == TRUNFO]
+    if copas:
+        return max(copas, key=lambda x: PESO_VALOR[x[1][1]])[0]
+    base = [(n, c) for (n, c) in mesa_snapshot if c[0] == naipe_base_snapshot]
+    return max(base, key=lambda x: PESO_VALOR[x[1][1]])[0]
+
+
+def recolher_vaza(estado, win):
+    """Entrega a vaza completa ao vencedor e passa a vez para ele."""
+    estado.vazas_rodada[win] += 1
+    estado.pile_counts[win] = estado.pile_counts.get(win, 0) + 1
+    estado.turn_idx = estado.ordem.index(win)
+    estado.memoria.registrar_vaza()
+    estado.mesa = []
+    estado.naipe_base = None
+    estado.primeira_vaza = False
+
+
+def rodada_terminou(estado):
+    maos = estado.maos
+    return all(len(maos[n]) == 0 for n in estado.nomes)
+
+
+def pontuar_rodada(estado):
+    if estado.pontuou_rodada:
+        return
+    for n in estado.nomes:
+        v = estado.vazas_rodada.get(n, 0)
+        p = v + (5 if estado.prognosticos.get(n) == v else 0)
+        estado.pontos[n] = estado.pontos.get(n, 0) + p
+    estado.pontuou_rodada = True
+    if estado.registro is not None:
+        estado.registro.pontos(estado.pontos)
+
+
+def ai_escolhe_carta(estado, nome, prazo: float = 0.0):
+    """Carta do bot. No modo especialista usa até `prazo` segundos de amostragem (PIMC)."""
+    validas = cartas_validas_para_jogar(estado, nome)
+    if not validas:
+        return None
+    if estado.expert_mode:
+        from prognostico.pimc import escolher_carta
+
+        carta = escolher_carta(estado, nome, validas, prazo)
+        if carta is not None:
+            return carta
+    elif not estado.hard_mode:
+        return estado.rng.choice(validas)
+
+    carta = escolha_heuristica(estado, nome, validas)
+
+    # Final de rodada: com poucas cartas o solver double-dummy joga perfeito.
+    progn = estado.prognosticos.get(nome)
+    if progn is not None and sum(len(m) for m in estado.maos.values()) <= SOLVER_MAX_CARTAS:
+        from prognostico.solver import melhor_carta
+
+        alvo = progn - estado.vazas_rodada.get(nome, 0)
+        exata = melhor_carta(estado, nome, alvo, preferida=carta, orcamento=SOLVER_ORCAMENTO)
+        if exata is not None:
+            return exata
+    return carta
+
+
+def escolha_heuristica(estado, nome, validas):
+    """Heurística gulosa do modo difícil: busca ou evita vazas conforme o prognóstico."""
+    naipe_base = estado.naipe_base
+    mesa = estado.mesa
+    progn = estado.prognosticos.get(nome)
+    vazas = estado.vazas_rodada.get(nome, 0)
+    need_wins = None if progn is None else progn - vazas
+    remaining_cards = len(estado.maos[nome])
+
+    def card_rank(carta, naipe_base_atual):
+        naipe, valor = carta
+        if naipe == TRUNFO:
+            return (2, PESO_VALOR[valor])
+        if naipe_base_atual is None:
+            return (1, PESO_VALOR[valor])
+        if naipe == naipe_base_atual:
+            return (1, PESO_VALOR[valor])
+        return (0, PESO_VALOR[valor])
+
+    def sort_key(carta):
+        rank = card_rank(carta, naipe_base)
+        return (rank[0], rank[1])
+
+    def losing_sort_key(carta):
+        naipe, valor = carta
+        is_trump = naipe == TRUNFO
+        rank = card_rank(carta, naipe_base)
+        return (is_trump, rank[0], rank[1])
+
+    def must_win_now():
+        return need_wins is not None and remaining_cards <= need_wins
+
+    def should_avoid_wins():
+        return need_wins is not None and need_wins <= 0
+
+    if not mesa or naipe_base is None:
+        if must_win_now():
+            return max(validas, key=sort_key)
+        if need_wins is not None and need_wins > 0:
+            # Puxar a maior carta restante de um naipe que ninguém cortou ganha sem gastar copas.
+            memoria = estado.memoria
+            donas = [
+                c for c in validas
+                if c[0] != TRUNFO
+                and memoria.eh_maior(c)
+                and not any(memoria.vazio(j, c[0]) for j in estado.ordem if j != nome)
+            ]
+            if donas:
+                return min(donas, key=sort_key)
+            return max(validas, key=sort_key)
+        return min(validas, key=losing_sort_key)
+
+    current_best = max(mesa, key=lambda item: card_rank(item[1], naipe_base))[1]
+    best_rank = card_rank(current_best, naipe_base)
+    winning_cards = [c for c in validas if card_rank(c, naipe_base) > best_rank]
+
+    if must_win_now():
+        if winning_cards:
+            return min(winning_cards, key=sort_key)
+        return max(validas, key=sort_key)
+
+    if need_wins is not None and need_wins > 0:
+        if winning_cards:
+            return min(winning_cards, key=sort_key)
+        return min(validas, key=losing_sort_key)
+
+    losing_cards = [c for c in validas if c not in winning_cards]
+    if losing_cards:
+        return min(losing_cards, key=losing_sort_key)
+    if should_avoid_wins():
+        return min(validas, key=losing_sort_key)
+    return min(validas, key=sort_key)
+
+
+def avancar_ate_humano_ou_fim(estado, limit=2500, prazo: float = 0.0):
+    """Joga as cartas dos bots até a vez de um humano, uma vaza completa ou o fim da rodada.
+
+    Retorna (status, jogadas): status é VEZ_HUMANO, VAZA_COMPLETA, FIM_RODADA ou None
+    e jogadas é quantas cartas os bots jogaram.
+    """
+    ordem = estado.ordem
+    if not ordem:
+        return None, 0
+    n = len(ordem)
+    maos = estado.maos
+    humanos = estado.humanos
+    jogadas = 0
+
+    steps = 0
+    while steps < limit:
+        steps += 1
+
+        if rodada_terminou(estado):
+            if len(estado.mesa) == n:
+                return VAZA_COMPLETA, jogadas
+            if not estado.mesa:
+                return FIM_RODADA, jogadas
+
+        atual = ordem[estado.turn_idx]
+
+        if len(maos[atual]) == 0:
+            estado.turn_idx = (estado.turn_idx + 1) % n
+            continue
+
+        if atual in humanos:
+            return VEZ_HUMANO, jogadas
+
+        carta = ai_escolhe_carta(estado, atual, prazo)
+        if carta is None:
+            estado.turn_idx = (estado.turn_idx + 1) % n
+            continue
+
+        jogar_carta(estado, atual, carta)
+        jogadas += 1
+        estado.turn_idx = (estado.turn_idx + 1) % n
+
+        if len(estado.mesa) == n:
+            return VAZA_COMPLETA, jogadas
+
+    return None, jogadas
+
+
+def jogar_rodada(estado, prazo: float = 0.0):
+    """Joga a rodada inteira só com bots, recolhendo cada vaza na hora, e pontua."""
+    avancar_prognosticos(estado)
+    iniciar_fase_jogo(estado)
+    while True:
+        status, _ = avancar_ate_humano_ou_fim(estado, prazo=prazo)
+        if status == VAZA_COMPLETA:
+            recolher_vaza(estado, vencedor_da_vaza(estado.mesa, estado.naipe_base))
+        elif status == FIM_RODADA:
+            pontuar_rodada(estado)
+            return
+        else:
+            raise RuntimeError(f"rodada parou em {status!r}; jogar_rodada só aceita bots")
+
+
+def start_next_round(estado):
+    if estado.cartas_alvo <= 1:
+        return
+    estado.rodada += 1
+    distribuir(estado, estado.cartas_alvo - 1)
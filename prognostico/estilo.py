@@ -0,0 +1,564 @@
+# prognostico/estilo.py
+"""CSS do app, gerado uma vez por variante (neon ligado ou desligado).
+
+css(neon) é o <style> completo; instalador(neon) é o HTML de um componente
+de altura zero que põe esse CSS num <style id="prognostico-css"> no <head> da
+página (trocando o conteúdo só quando a variante muda). Assim o app não
+precisa reenviar ~12 KB de CSS a cada rerun: o elemento continua na página
+mesmo quando o componente sai.
+
+Tamanho e bytes enviados por rerun, antes e depois:
+    python -m prognostico.estilo
+"""
+import json
+from functools import lru_cache
+
+ESTILO_ID = "prognostico-css"
+
+# o app continua mandando o instalador por CONFIRMA_S depois de cada troca de
+# variante: um rerun pode tirar o iframe antes de o script rodar
+CONFIRMA_S = 2.0
+
+
+@lru_cache(maxsize=None)
+def css(neon: bool) -> str:
+    if neon:
+        bg1 = "#06040d"
+        bg2 = "#02030a"
+        stroke = "rgba(0,255,210,.22)"
+        card_glass = "rgba(8,12,18,.55)"
+        top_glow = "rgba(0,255,210,.08)"
+        felt1 = "rgba(0,120,90,1)"
+        felt2 = "rgba(0,60,45,1)"
+        mesa_border = "rgba(0,255,210,.18)"
+        pill_bg = "rgba(0,255,210,.08)"
+        pill_border = "rgba(0,255,210,.18)"
+        text_main = "rgba(240,255,252,.92)"
+        text_sub = "rgba(240,255,252,.84)"
+        seat_bg = "rgba(10,14,20,.70)"
+        seat_border = "rgba(0,255,210,.16)"
+        card_face_bg = "linear-gradient(180deg, rgba(255,255,255,.95) 0%, rgba(248,248,248,.92) 100%)"
+        card_face_border = "1px solid rgba(255,255,255,.22)"
+        card_shadow = "0 14px 30px rgba(0,0,0,.38)"
+    else:
+        bg1 = "#0b1220"
+        bg2 = "#0a1a14"
+        stroke = "rgba(255,255,255,.14)"
+        card_glass = "rgba(255,255,255,.10)"
+        top_glow = "rgba(255,255,255,.18)"
+        felt1 = "rgba(16,110,70,1)"
+        felt2 = "rgba(8,60,40,1)"
+        mesa_border = "rgba(255,255,255,.14)"
+        pill_bg = "rgba(255,255,255,.08)"
+        pill_border = "rgba(255,255,255,.16)"
+        text_main = "rgba(255,255,255,.92)"
+        text_sub = "rgba(255,255,255,.82)"
+        seat_bg = "rgba(255,255,255,.88)"
+        seat_border = "rgba(0,0,0,.10)"
+        card_face_bg = "linear-gradient(180deg, #ffffff 0%, #f8f8f8 100%)"
+        card_face_border = "1px solid rgba(0,0,0,.14)"
+        card_shadow = "0 10px 22px rgba(0,0,0,.12)"
+
+    folha = f"""
+<style>
+:root {{
+  --app-max: 1200px;
+  --pad: .92rem;
+  --dock-h: 210px;
+
+  --bg1: {bg1};
+  --bg2: {bg2};
+  --stroke: {stroke};
+  --cardglass: {card_glass};
+
+  --textMain: {text_main};
+  --textSub: {text_sub};
+
+  --pillBg: {pill_bg};
+  --pillBorder: {pill_border};
+
+  --mesaBorder: {mesa_border};
+  --felt1: {felt1};
+  --felt2: {felt2};
+
+  --seatBg: {seat_bg};
+  --seatBorder: {seat_border};
+
+  --cardFaceBg: {card_face_bg};
+  --cardFaceBorder: {card_face_border};
+  --cardShadow: {card_shadow};
+
+  --shadow: 0 18px 44px rgba(0,0,0,.28);
+  --shadow2: 0 14px 34px rgba(0,0,0,.22);
+
+  --hand-card-w: 86px;
+  --hand-card-h: 118px;
+}}
+
+header[data-testid="stHeader"] {{
+  background: transparent !important;
+  height: 0px !important;
+}}
+div[data-testid="stToolbar"] {{ display:none !important; }}
+
+[data-testid="stAppViewContainer"] {{
+  background:
+    radial-gradient(1200px 700px at 15% 10%, rgba(56,189,248,.10), transparent 55%),
+    radial-gradient(900px 600px at 80% 35%, rgba(34,197,94,.10), transparent 55%),
+    linear-gradient(180deg, var(--bg1) 0%, var(--bg2) 100%);
+}}
+
+.block-container {{
+  padding-top: calc(var(--pad) + 18px) !important;
+  padding-bottom: var(--pad) !important;
+  max-width: var(--app-max);
+}}
+
+[data-testid="stVerticalBlock"] {{ gap: .55rem; }}
+
+html, body, [class*="css"] {{
+  letter-spacing: .1px;
+}}
+
+.titleRow {{
+  display:flex;
+  align-items:center;
+  justify-content:center;
+  margin: 10px 0 10px 0;
+}}
+.titleRow h1 {{
+  margin:0;
+  font-size: 30px;
+  font-weight: 950;
+  letter-spacing: .04em;
+  text-transform: uppercase;
+  color: #D4AF37 !important;
+  text-shadow: 0 2px 6px rgba(0,0,0,.35);
+}}
+
+/* grupo de pills dentro da topbar */
+.pillGroup{{
+  display:flex;
+  gap:8px;
+  flex-wrap:wrap;
+  justify-content:flex-end;
+  align-items:center;
+}}
+
+/* pills “secundárias” (regras) um pouco mais discretas */
+.pillSoft{{
+  opacity:.98;
+}}
+
+/* em telas menores, quebra melhor */
+@media (max-width: 900px){{
+  .pillGroup{{ justify-content:flex-start; }}
+}}
+
+.topbar {{
+  position: sticky;
+  top: .65rem;
+  z-index: 60;
+
+  border-radius: 26px;
+  border: 1px solid var(--stroke);
+  background: rgba(255,255,255,.2 8);
+  backdrop-filter: blur(16px);
+
+  box-shadow: var(--shadow2);
+  padding: 14px 16px;
+  margin-bottom: 14px;
+
+  display:flex;
+  align-items:center;
+  justify-content:space-between;
+  gap: 12px;
+}}
+
+.topbar:before {{
+  content:"";
+  position:absolute; inset:0;
+  border-radius: 26px;
+  background: radial-gradient(circle at 20% 10%, {top_glow}, transparent 40%);
+  pointer-events:none;
+}}
+
+.topLeft{{ display:flex; flex-direction:column; gap:4px; min-width: 210px; }}
+.topTitle{{ font-weight: 950; font-size: 14px; color: var(--textMain); }}
+.topSub{{ font-weight: 800; font-size: 12px; color: var(--textSub); }}
+
+.topRight{{
+  display:flex;
+  gap:8px;
+  flex-wrap:wrap;
+  justify-content:flex-end;
+  align-items:center;
+  max-width: 780px;
+}}
+
+.pill {{
+  display:inline-flex;
+  align-items:center;
+  gap:7px;
+  padding:7px 10px;
+  border-radius:999px;
+  border:1px solid var(--pillBorder);
+  background: linear-gradient(180deg, rgba(255,255,255,.10), rgba(255,255,255,.06));
+  color: var(--textMain);
+  font-weight: 900;
+  font-size: 12px;
+  white-space: nowrap;
+}}
+
+.menuCard {{
+  border-radius: 18px;
+  border: 1px solid var(--stroke);
+  background: rgba(255,255,255,.07);
+  backdrop-filter: blur(10px);
+  box-shadow: var(--shadow2);
+  padding: 10px 12px;
+  margin-top: 0;
+}}
+.menuHint {{
+  color: var(--textSub);
+  font-weight: 800;
+  font-size: 12px;
+}}
+
+.scoreItem{{
+  display:flex; justify-content:space-between;
+  padding:8px 10px;
+  border-radius:12px;
+  border:1px solid rgba(255,255,255,.10);
+  background: rgba(255,255,255,.08);
+  margin-bottom:8px;
+  color: var(--textMain);
+}}
+.scoreName{{ font-weight:900; }}
+.scorePts{{ font-weight:900; }}
+.smallMuted{{ opacity:.70; font-size:12px; color: var(--textSub); }}
+
+.mesaWrap{{ margin-top: 6px; margin-bottom: 0; }}
+.mesa{{
+  border-radius: 50% / 46%;
+  border: 1px solid transparent;
+  background: #0f7a4a !important;
+  height: 470px;
+  position: relative;
+  overflow: hidden;
+  box-shadow: var(--shadow);
+  isolation: isolate;
+}}
+
+.mesa:before{{
+  content:"";
+  position:absolute; inset:0;
+  border-radius: 50% / 46%;
+  box-shadow:
+    inset 0 0 0 26px #5a3a1e,
+    inset 0 0 0 38px #b22222,
+    inset 0 0 0 44px #d4af37,
+    0 16px 32px rgba(0,0,0,.25);
+  opacity:1;
+  pointer-events:none;
+  z-index: 1;
+}}
+.mesaCenter{{
+  position:absolute; inset:0;
+  display:flex; align-items:center; justify-content:center;
+  font-weight:900; opacity:.55;
+  pointer-events:none;
+  text-transform: uppercase;
+  letter-spacing: .08em;
+  color: rgba(255,255,255,.90);
+  z-index: 3;
+}}
+
+.seat{{
+  position:absolute;
+  padding:6px 10px;
+  border-radius:999px;
+  background: var(--seatBg);
+  border:1px solid var(--seatBorder);
+  font-size:12px;
+  white-space:nowrap;
+  z-index: 25;
+  display:flex;
+  align-items:center;
+  gap:8px;
+  color: rgba(240,255,252,.92);
+}}
+.seat.you{{ outline:2px solid rgba(34,197,94,.55); font-weight:900; }}
+.seat.dealer{{ border-color: rgba(34,197,94,.35); }}
+.seat.active{{ outline: 3px solid rgba(251,191,36,.9); box-shadow: 0 0 18px rgba(251,191,36,.45); }}
+.avatarImg{{
+  width:26px; height:26px;
+  border-radius:50%;
+  border: 1px solid rgba(0,0,0,.12);
+  background: rgba(0,0,0,.04);
+  box-shadow: 0 6px 12px rgba(0,0,0,.10);
+  flex: 0 0 auto;
+}}
+
+@keyframes winnerGlow {{
+  0% {{ box-shadow: 0 0 0 rgba(0,0,0,0); transform: translate(-50%,-50%) scale(1); }}
+  35% {{ box-shadow: 0 0 0 6px rgba(34,197,94,.22), 0 14px 28px rgba(0,0,0,.14); transform: translate(-50%,-50%) scale(1.03); }}
+  100% {{ box-shadow: 0 0 0 0 rgba(0,0,0,0); transform: translate(-50%,-50%) scale(1); }}
+}}
+.seat.winnerFlash{{
+  animation: winnerGlow 1.2s ease-out;
+  outline: 2px solid rgba(34,197,94,.55);
+  background: rgba(255,255,255,.97);
+}}
+
+.playCard{{ position:absolute; transform: translate(-50%,-50%); pointer-events:none; z-index: 18; }}
+@keyframes popIn {{
+  0% {{ transform: translate(-50%,-50%) scale(.92); opacity: 0; }}
+  100% {{ transform: translate(-50%,-50%) scale(1); opacity: 1; }}
+}}
+.playCard.pop{{ animation: popIn .16s ease-out; }}
+
+.card{{
+  width:70px;
+  height:102px;
+  border-radius:14px;
+  border:1px solid rgba(0,0,0,.16);
+  background: linear-gradient(180deg, #ffffff 0%, #f8f8f8 100%);
+  box-shadow: 0 10px 22px rgba(0,0,0,.12);
+  position:relative;
+  user-select:none;
+}}
+.card .tl{{ position:absolute; top:7px; left:7px; font-weight:900; font-size:13px; line-height:13px; }}
+.card .br{{ position:absolute; bottom:7px; right:7px; font-weight:900; font-size:13px; line-height:13px; transform:rotate(180deg); }}
+.card .mid{{ position:absolute; inset:0; display:flex; align-items:center; justify-content:center; font-size:30px; font-weight:900; opacity:.92; }}
+
+.chipWrap{{ position:absolute; transform: translate(-50%,-50%); z-index: 30; pointer-events:none; }}
+.chipRow{{ display:flex; gap:6px; flex-wrap:wrap; justify-content:center; align-items:center; max-width: 140px; }}
+.chipMini{{
+  width:22px; height:22px;
+  border-radius:50%;
+  position:relative;
+  box-shadow: 0 8px 14px rgba(0,0,0,.14);
+  border: 2px solid rgba(0,0,0,.14);
+  background:
+    radial-gradient(circle at 30% 25%, rgba(255,255,255,.35), rgba(255,255,255,0) 45%),
+    conic-gradient(from 0deg,
+      rgba(255,255,255,0) 0 18deg,
+      rgba(255,255,255,.70) 18deg 28deg,
+      rgba(255,255,255,0) 28deg 54deg,
+      rgba(255,255,255,.70) 54deg 64deg,
+      rgba(255,255,255,0) 64deg 90deg,
+      rgba(255,255,255,.70) 90deg 100deg,
+      rgba(255,255,255,0) 100deg 126deg,
+      rgba(255,255,255,.70) 126deg 136deg,
+      rgba(255,255,255,0) 136deg 162deg,
+      rgba(255,255,255,.70) 162deg 172deg,
+      rgba(255,255,255,0) 172deg 198deg,
+      rgba(255,255,255,.70) 198deg 208deg,
+      rgba(255,255,255,0) 208deg 234deg,
+      rgba(255,255,255,.70) 234deg 244deg,
+      rgba(255,255,255,0) 244deg 270deg,
+      rgba(255,255,255,.70) 270deg 280deg,
+      rgba(255,255,255,0) 280deg 306deg,
+      rgba(255,255,255,.70) 306deg 316deg,
+      rgba(255,255,255,0) 316deg 342deg,
+      rgba(255,255,255,.70) 342deg 352deg,
+      rgba(255,255,255,0) 352deg 360deg
+    );
+  background-color: var(--chip-base, rgba(16,185,129,.88));
+}}
+.chipMini:after{{
+  content:"";
+  position:absolute;
+  inset:5px;
+  border-radius:50%;
+  background: rgba(255,255,255,.78);
+  border: 1px solid rgba(0,0,0,.10);
+}}
+.chipNote{{
+  margin-top: 6px;
+  font-size: 10px;
+  font-weight: 900;
+  opacity: .85;
+  color: #111827;
+  background: rgba(255,255,255,.86);
+  border: 1px solid rgba(0,0,0,.08);
+  padding: 3px 8px;
+  border-radius: 999px;
+  display:inline-flex;
+  align-items:center;
+  justify-content:center;
+  min-width: 18px;
+}}
+
+.pileWrap{{ position:absolute; transform: translate(-50%,-50%); z-index: 15; }}
+.pileStack{{ position:relative; width:26px; height:40px; }}
+.cardBackLayer{{
+  position:absolute;
+  width:26px; height:40px;
+  border-radius:8px;
+  border:1px solid rgba(0,0,0,.18);
+  background: linear-gradient(180deg, rgba(12,110,80,.95) 0%, rgba(7,86,64,.95) 100%);
+  box-shadow: 0 6px 10px rgba(0,0,0,.12);
+  overflow:hidden;
+}}
+.cardBackLayer:before{{
+  content:"";
+  position:absolute; inset:-28%;
+  background: repeating-linear-gradient(45deg, rgba(255,255,255,.12) 0 8px, rgba(255,255,255,0) 8px 16px);
+  transform: rotate(14deg);
+}}
+.pileLabel{{
+  margin-top:4px;
+  text-align:center;
+  font-weight:900;
+  font-size:10px;
+  opacity:.74;
+  color: rgba(255,255,255,.92);
+  text-shadow: 0 2px 6px rgba(0,0,0,.25);
+}}
+
+.handDock{{
+  margin-top: 0;
+  border-radius: 18px;
+  border: none;
+  background: transparent;
+  backdrop-filter: none;
+  box-shadow: none;
+  padding: 12px;
+}}
+.handTitle{{ display:flex; align-items:center; justify-content:space-between; gap:12px; margin-bottom: 6px; }}
+.handTitle h3{{ margin:0; font-size:16px; color: var(--textMain); }}
+.hint{{ font-size:12px; opacity:.72; font-weight:800; color: var(--textSub); }}
+
+.handDock div[data-testid="column"]{{
+  position: relative;
+  min-height: var(--hand-card-h);
+}}
+.handDock .cardLink{{
+  width: var(--hand-card-w);
+  height: var(--hand-card-h);
+  margin: 0 auto;
+  display: block;
+  text-decoration: none;
+  color: inherit;
+  transition: transform .10s ease, filter .10s ease;
+}}
+.handDock .cardLink:hover{{
+  transform: translateY(-4px);
+  filter: drop-shadow(0 14px 22px rgba(0,0,0,.20));
+}}
+.handDock .cardLink.is-disabled{{
+  opacity: .28;
+  pointer-events: none;
+  transform:none;
+  filter:none;
+}}
+.handDock .cardLink.is-disabled:hover{{
+  transform:none;
+  filter:none;
+}}
+
+
+.cardBtnInner{{
+  width: var(--hand-card-w) !important;
+  height: var(--hand-card-h) !important;
+  border-radius: 14px;
+  overflow:hidden;
+  background: var(--cardFaceBg);
+  border: var(--cardFaceBorder);
+  box-shadow: var(--cardShadow);
+  position: relative;
+}}
+.cardBtnTL{{ position:absolute; top:10px; left:10px; font-weight:900; font-size:14px; line-height:14px; }}
+.cardBtnBR{{ position:absolute; bottom:10px; right:10px; font-weight:900; font-size:14px; line-height:14px; transform: rotate(180deg); }}
+.cardBtnMid{{ position:absolute; inset:0; display:flex; align-items:center; justify-content:center; font-size:34px; font-weight:900; opacity:.92; }}
+
+@keyframes flyAway {{
+  0%   {{ transform: translateY(0px) scale(1); opacity: 1; }}
+  55%  {{ transform: translateY(-26px) scale(1.03); opacity: .85; }}
+  100% {{ transform: translateY(-70px) scale(.96); opacity: 0; }}
+}}
+.flyAway{{ animation: flyAway .25s ease-in forwards; }}
+
+@media (max-width: 900px){{
+  :root{{ --pad: .62rem; --dock-h: 230px; }}
+  .block-container{{ padding-left: .55rem !important; padding-right: .55rem !important; }}
+  .titleRow h1{{ font-size: 22px; }}
+  .mesa{{ height: calc(100vh - 70px - var(--dock-h) - 24px); min-height: 340px; }}
+  .mesaWrap{{ margin-bottom: calc(var(--dock-h) + 10px); }}
+  .handDock{{ position: fixed; left: .55rem; right: .55rem; bottom: .55rem; margin-top: 0 !important; z-index: 80; }}
+  .card{{ width:62px; height:92px; border-radius: 13px; }}
+  .card .mid{{ font-size: 26px; }}
+  .topbar{{ flex-direction:column; align-items:flex-start; }}
+  .topRight{{ justify-content:flex-start; max-width: 100%; }}
+}}
+</style>
+"""
+    return folha
+
+
+@lru_cache(maxsize=None)
+def instalador(neon: bool) -> str:
+    """Script que instala/atualiza o <style> no documento pai (o componente roda num iframe)."""
+    conteudo = css(neon).strip()
+    conteudo = conteudo[len("<style>"):-len("</style>")]
+    return (
+        "<script>(function(){"
+        "var d=window.parent.document;"
+        f"var el=d.getElementById({json.dumps(ESTILO_ID)});"
+        f"if(!el){{el=d.createElement('style');el.id={json.dumps(ESTILO_ID)};d.head.appendChild(el);}}"
+        f"var v={json.dumps('neon' if neon else 'claro')};"
+        f"if(el.dataset.variante!==v){{el.textContent={json.dumps(conteudo)};el.dataset.variante=v;}}"
+        "})();</script>"
+    )
+
+
+# =========================
+# BENCHMARK
+# =========================
+def _bytes_por_sessao(reruns: int, intervalo_s: float, trocas: int):
+    """Bytes de CSS enviados numa sessão: antes (todo rerun) e com o instalador."""
+    troca_cada = reruns // (trocas + 1)
+    antes = depois = 0
+    neon = False
+    emitido_em = 0.0
+    for i in range(reruns):
+        agora = i * intervalo_s
+        if i and i % troca_cada == 0 and trocas:
+            neon = not neon
+            emitido_em = agora
+        antes += len(css(neon))
+        if agora - emitido_em <= CONFIRMA_S:
+            depois += len(instalador(neon))
+    return antes, depois
+
+
+def main(argv=None):
+    import argparse
+    import timeit
+
+    parser = argparse.ArgumentParser(description="Bytes de CSS por rerun, antes e depois do cache.")
+    parser.add_argument("--reruns", type=int, default=2000)
+    parser.add_argument("--intervalo-ms", type=float, default=40.0, help="intervalo entre reruns (vaza/autoplay: 20-60 ms)")
+    parser.add_argument("--trocas", type=int, default=2, help="vezes que o modo neon é trocado na sessão")
+    args = parser.parse_args(argv)
+
+    gerar = css.__wrapped__
+    vezes = 2000
+    t_gerar = timeit.timeit(lambda: gerar(True), number=vezes) / vezes
+    t_cache = timeit.timeit(lambda: css(True), number=vezes) / vezes
+    print(f"CSS: {len(css(False)):,} bytes (claro) • {len(css(True)):,} bytes (neon)")
+    print(f"Gerar: {t_gerar * 1e6:,.1f} µs • do cache: {t_cache * 1e6:,.2f} µs")
+
+    antes, depois = _bytes_por_sessao(args.reruns, args.intervalo_ms / 1000.0, args.trocas)
+    print(
+        f"{args.reruns} reruns a cada {args.intervalo_ms:.0f} ms, {args.trocas} trocas de modo: "
+        f"antes {antes / 1024:,.0f} KB ({antes / args.reruns:,.0f} B/rerun) • "
+        f"depois {depois / 1024:,.0f} KB ({depois / args.reruns:,.0f} B/rerun)"
+    )
+    print(f"info do cache: {css.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+# prognostico/fragmentos.py
+"""Pedaços de HTML da mesa e da mão, gerados uma vez e reaproveitados.
+
+Cada fragmento é uma função pura com lru_cache limitado: as 52 cartas ×
+VARIANTES_BOTAO, os avatares (índice módulo AVATAR_CICLO, o mmc das
+paletas), as fichas de prognóstico, os montinhos de vazas e as posições de
+cada lugar numa mesa de n jogadores. Com o cache quente, render_mesa e a mão
+só juntam strings, sem formatar nem codificar base64 a cada rerun.
+precarregar() gera as cartas e os avatares das mesas comuns; cache_info()
+mostra acertos e faltas de cada tabela.
+
+Tempo de montar uma mesa com o cache frio e quente:
+    python -m prognostico.fragmentos
+"""
+import base64
+import math
+from functools import lru_cache
+
+from prognostico.cards import criar_baralho
+
+COR_NAIPE = {"♦": "#C1121F", "♥": "#C1121F", "♠": "#111827", "♣": "#111827"}
+
+VARIANTES_BOTAO = ("", "flyAway")
+
+AVATAR_SKINS = ["#F6D3B3", "#E9BE9D", "#D9A074", "#C6865F"]
+AVATAR_HAIRS = ["#2F2F2F", "#5B3A29", "#C8A14A", "#7A4B2B", "#1F2937"]
+AVATAR_SHIRTS = ["#60A5FA", "#F59E0B", "#34D399", "#F472B6", "#A78BFA", "#FB7185", "#22C55E"]
+AVATAR_BG = ["#E0F2FE", "#ECFDF5", "#FFF7ED", "#FDF2F8", "#EEF2FF", "#F1F5F9"]
+AVATAR_CICLO = math.lcm(len(AVATAR_SKINS), len(AVATAR_HAIRS), len(AVATAR_SHIRTS), len(AVATAR_BG))
+
+CHIP_PALETTE = [
+    "rgba(16,185,129,.88)",
+    "rgba(59,130,246,.88)",
+    "rgba(245,158,11,.88)",
+    "rgba(239,68,68,.88)",
+    "rgba(168,85,247,.88)",
+    "rgba(20,184,166,.88)",
+    "rgba(100,116,139,.88)",
+    "rgba(236,72,153,.88)",
+]
+
+MAX_JOGADORES = 10
+
+
+# =========================
+# CARTAS
+# =========================
+@lru_cache(maxsize=52)
+def carta_html(c) -> str:
+    naipe, valor = c
+    cor = COR_NAIPE[naipe]
+    return (
+        f'<div class="card">'
+        f'<div class="tl" style="color:{cor};">{valor}<br/>{naipe}</div>'
+        f'<div class="mid" style="color:{cor};">{naipe}</div>'
+        f'<div class="br" style="color:{cor};">{valor}<br/>{naipe}</div>'
+        f'</div>'
+    )
+
+
+@lru_cache(maxsize=52 * len(VARIANTES_BOTAO))
+def card_btn_html(carta, *, extra_class: str = "") -> str:
+    """HTML da carta para o botão da mão.
+
+    extra_class é só por nome: o lru_cache guarda (carta, "x") e
+    (carta, extra_class="x") em chaves diferentes.
+    """
+    naipe, valor = carta
+    cor = COR_NAIPE[naipe]
+    return (
+        f'<div class="cardBtnInner {extra_class}">'
+        f'<div class="cardBtnTL" style="color:{cor};">{valor}<br/>{naipe}</div>'
+        f'<div class="cardBtnMid" style="color:{cor};">{naipe}</div>'
+        f'<div class="cardBtnBR" style="color:{cor};">{valor}<br/>{naipe}</div>'
+        f'</div>'
+    )
+
+
+# =========================
+# AVATAR
+# =========================
+def avatar_svg_data_uri(idx: int) -> str:
+    return _avatar(idx % AVATAR_CICLO)
+
+
+@lru_cache(maxsize=AVATAR_CICLO)
+def _avatar(idx: int) -> str:
+    skin = AVATAR_SKINS[idx % len(AVATAR_SKINS)]
+    hair = AVATAR_HAIRS[idx % len(AVATAR_HAIRS)]
+    shirt = AVATAR_SHIRTS[idx % len(AVATAR_SHIRTS)]
+    b = AVATAR_BG[idx % len(AVATAR_BG)]
+
+    svg = f"""
+<svg xmlns="http://www.w3.org/2000/svg" width="64" height="64" viewBox="0 0 64 64">
+  <defs>
+    <filter id="s" x="-20%" y="-20%" width="140%" height="140%">
+      <feDropShadow dx="0" dy="2" stdDeviation="2" flood-color="#000" flood-opacity=".18"/>
+    </filter>
+  </defs>
+  <circle cx="32" cy="32" r="30" fill="{b}" filter="url(#s)"/>
+  <path d="M14 58c3-13 14-16 18-16s15 3 18 16" fill="{shirt}"/>
+  <rect x="28" y="36" width="8" height="10" rx="4" fill="{skin}"/>
+  <circle cx="32" cy="28" r="16" fill="{skin}"/>
+  <path d="M16 28c2-12 10-18 16-18s14 6 16 18c-4-7-10-9-16-9s-12 2-16 9z" fill="{hair}"/>
+  <circle cx="26" cy="28" r="2.2" fill="#111827"/>
+  <circle cx="38" cy="28" r="2.2" fill="#111827"/>
+  <path d="M26 34c2.2 2 4.4 3 6 3s3.8-1 6-3" fill="none" stroke="#111827" stroke-width="2" stroke-linecap="round"/>
+  <circle cx="22" cy="33" r="2.1" fill="#EAA5A5"/>
+  <circle cx="42" cy="33" r="2.1" fill="#EAA5A5"/>
+</svg>
+"""
+    svg_b64 = base64.b64encode(svg.encode("utf-8")).decode("ascii")
+    return f"data:image/svg+xml;base64,{svg_b64}"
+
+
+# =========================
+# FICHAS / MONTINHOS
+# =========================
+def chip_color_for_index(idx: int) -> str:
+    return CHIP_PALETTE[idx % len(CHIP_PALETTE)]
+
+
+@lru_cache(maxsize=256)
+def render_progn_chips_html(prog, color: str) -> str:
+    if isinstance(prog, str) or prog is None:
+        return '<span class="chipNote">—</span>'
+    p = max(0, int(prog))
+    count_label = f'<span class="chipNote">{p}</span>'
+    show = min(p, 12)
+    chips = f'<div class="chipMini" style="--chip-base:{color};"></div>' * show
+    extra = f'<span class="chipNote">+{p-12}</span>' if p > 12 else ''
+    return f'<div class="chipRow">{count_label}{chips}</div>{extra}'
+
+
+@lru_cache(maxsize=64)
+def render_small_pile_html(won: int) -> str:
+    layers = min(max(won, 0), 10)
+    parts = []
+    for i in range(layers):
+        dx = i * 1.1
+        dy = -i * 1.2
+        rot = (i % 3 - 1) * 2
+        parts.append(f'<div class="cardBackLayer" style="left:{dx}px; top:{dy}px; transform: rotate({rot}deg);"></div>')
+    label = f"{won}" if won > 10 else ""
+    label_html = f'<div class="pileLabel">{label}</div>' if label else ''
+    return f'<div class="pileStack">{"".join(parts)}</div>{label_html}'
+
+
+# =========================
+# MESA
+# =========================
+@lru_cache(maxsize=MAX_JOGADORES)
+def posicoes(n: int):
+    """Por lugar i de uma mesa de n: (assento, alvo das fichas, carta jogada), em %."""
+    cx, cy = 50, 50
+    rx, ry = 42, 36
+    lugares = []
+    for i in range(n):
+        ang = (2 * math.pi) * (i / n) - (math.pi / 2)
+        seat = (cx + rx * math.cos(ang), cy + ry * math.sin(ang))
+        target = (cx + (rx * 0.70) * math.cos(ang), cy + (rx * 0.70) * math.sin(ang))
+        play = (cx + (rx * 0.47) * math.cos(ang), cy + (ry * 0.47) * math.sin(ang))
+        lugares.append((seat, target, play))
+    return tuple(lugares)
+
+
+@lru_cache(maxsize=512)
+def assento_html(n: int, i: int, cls: str, label: str) -> str:
+    x, y = posicoes(n)[i][0]
+    return f'''
+<div class="{cls}" style="left:{x}%; top:{y}%; transform:translate(-50%,-50%);">
+  <img class="avatarImg" src="{avatar_svg_data_uri(i)}" alt="avatar"/>
+  <span>{label}</span>
+</div>
+'''
+
+
+@lru_cache(maxsize=512)
+def fichas_html(n: int, i: int, prog) -> str:
+    tx, ty = posicoes(n)[i][1]
+    return f"""
+<div class="chipWrap" style="left:{tx}%; top:{ty}%;">
+  {render_progn_chips_html(prog, chip_color_for_index(i))}
+</div>
+"""
+
+
+@lru_cache(maxsize=512)
+def pilha_html(n: int, i: int, won: int) -> str:
+    tx, ty = posicoes(n)[i][1]
+    return f"""
+<div class="pileWrap" style="left:{tx}%; top:{ty + 12}%;">
+  {render_small_pile_html(won)}
+</div>
+"""
+
+
+@lru_cache(maxsize=1024)
+def jogada_html(n: int, i: int, carta, cls: str = "playCard") -> str:
+    x, y = posicoes(n)[i][2]
+    return f'<div class="{cls}" style="left:{x}%; top:{y}%;">{carta_html(carta)}</div>'
+
+
+# =========================
+# CACHE
+# =========================
+TABELAS = {
+    "carta": carta_html,
+    "botao": card_btn_html,
+    "avatar": _avatar,
+    "fichas_mini": render_progn_chips_html,
+    "pilha_mini": render_small_pile_html,
+    "posicoes": posicoes,
+    "assento": assento_html,
+    "fichas": fichas_html,
+    "pilha": pilha_html,
+    "jogada": jogada_html,
+}
+
+
+def cache_info():
+    """{tabela: CacheInfo(hits, misses, maxsize, currsize)}."""
+    return {nome: fn.cache_info() for nome, fn in TABELAS.items()}
+
+
+def cache_clear():
+    for fn in TABELAS.values():
+        fn.cache_clear()
+
+
+def precarregar():
+    """Gera as 52 cartas em todas as variantes e os avatares de uma mesa cheia."""
+    for carta in criar_baralho():
+        carta_html(carta)
+        for extra in VARIANTES_BOTAO:
+            card_btn_html(carta, extra_class=extra)
+    for i in range(MAX_JOGADORES):
+        avatar_svg_data_uri(i)
+
+
+# =========================
+# BENCHMARK
+# =========================
+def _mesa_exemplo(n: int, rng):
+    """Uma mesa no meio da rodada: (prognósticos, vazas, cartas na mesa) por lugar."""
+    baralho = criar_baralho()
+    rng.shuffle(baralho)
+    progs = [rng.randint(0, 5) for _ in range(n)]
+    vazas = [rng.randint(0, 4) for _ in range(n)]
+    return progs, vazas, baralho[:rng.randint(0, n)]
+
+
+def montar_mesa(n: int, progs, vazas, jogadas, dealer: int = 0) -> str:
+    """Junta os fragmentos de uma mesa inteira, como render_mesa fazia."""
+    seats = "".join(
+        assento_html(n, i, "seat dealer" if i == dealer else "seat", f"IA {i + 1}") for i in range(n)
+    )
+    chips = "".join(fichas_html(n, i, progs[i]) for i in range(n))
+    piles = "".join(pilha_html(n, i, vazas[i]) for i in range(n) if vazas[i] > 0)
+    plays = "".join(jogada_html(n, i, carta) for i, carta in enumerate(jogadas))
+    return f'<div class="mesa">{seats}{chips}{piles}{plays}</div>'
+
+
+def main(argv=None):
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Custo de montar o HTML da mesa com o cache de fragmentos frio e quente.")
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--reruns", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    if not 2 <= args.players <= MAX_JOGADORES:
+        parser.error(f"--players entre 2 e {MAX_JOGADORES}")
+
+    rng = random.Random(args.seed)
+    mesas = [_mesa_exemplo(args.players, rng) for _ in range(32)]
+
+    inicio = time.perf_counter()
+    for r in range(args.reruns):
+        cache_clear()
+        montar_mesa(args.players, *mesas[r % len(mesas)])
+    frio_s = time.perf_counter() - inicio
+
+    cache_clear()
+    precarregar()
+    inicio = time.perf_counter()
+    for r in range(args.reruns):
+        montar_mesa(args.players, *mesas[r % len(mesas)])
+    quente_s = time.perf_counter() - inicio
+
+    print(f"Mesa de {args.players} jogadores, {args.reruns} reruns")
+    print(f"Cache frio:   {frio_s / args.reruns * 1e6:,.1f} µs/rerun")
+    print(f"Cache quente: {quente_s / args.reruns * 1e6:,.1f} µs/rerun ({frio_s / quente_s:,.1f}×)")
+    for nome, info in cache_info().items():
+        print(f"  {nome:<12} hits {info.hits:>8} • misses {info.misses:>6} • {info.currsize}/{info.maxsize}")
+
+
+if __name__ == "__main__":
+    main()
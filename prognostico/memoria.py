@@ -0,0 +1,83 @@
+# prognostico/memoria.py
+"""Memória de cartas da rodada, atualizada a cada jogada.
+
+Tudo aqui é informação pública (o que já saiu e quem não seguiu naipe), então
+um único objeto serve a todos os bots; as consultas que dependem da mão de
+quem pergunta recebem a mão como argumento. Tudo é bitmask de
+prognostico.cards, então as consultas são O(1).
+"""
+from prognostico.cards import (
+    BARALHO_MASK,
+    CARTA_INT,
+    INT_CARTA,
+    LANE,
+    LANE_MASK,
+    NAIPE_LANE,
+    mao_to_mask,
+    maior_carta,
+    popcount,
+)
+
+
+class MemoriaCartas:
+    """restantes: cartas que ainda não foram jogadas (inclui mãos e monte).
+    na_mesa: cartas da vaza em andamento. vazios: {jogador: bitmask de faixas}.
+    """
+
+    __slots__ = ("restantes", "na_mesa", "vazios")
+
+    def __init__(self):
+        self.restantes = BARALHO_MASK
+        self.na_mesa = 0
+        self.vazios = {}
+
+    # chamadas pelo engine
+    def registrar_jogada(self, nome, carta, naipe_base):
+        bit = 1 << CARTA_INT[carta]
+        self.restantes &= ~bit
+        self.na_mesa |= bit
+        if naipe_base is not None and carta[0] != naipe_base:
+            self.vazios[nome] = self.vazios.get(nome, 0) | (1 << NAIPE_LANE[naipe_base])
+
+    def registrar_vaza(self):
+        self.na_mesa = 0
+
+    def __eq__(self, other):
+        if not isinstance(other, MemoriaCartas):
+            return NotImplemented
+        return (self.restantes, self.na_mesa, self.vazios) == (other.restantes, other.na_mesa, other.vazios)
+
+    __hash__ = None
+
+    def copiar(self):
+        nova = MemoriaCartas.__new__(MemoriaCartas)
+        nova.restantes = self.restantes
+        nova.na_mesa = self.na_mesa
+        nova.vazios = dict(self.vazios)
+        return nova
+
+    # consultas
+    def jogadas_mask(self):
+        return BARALHO_MASK & ~self.restantes
+
+    def restantes_no_naipe(self, naipe):
+        return popcount(self.restantes & LANE_MASK[NAIPE_LANE[naipe]])
+
+    def maior_restante(self, naipe):
+        idx = maior_carta(self.restantes & LANE_MASK[NAIPE_LANE[naipe]])
+        return None if idx is None else INT_CARTA[idx]
+
+    def eh_maior(self, carta):
+        """A carta é a mais alta ainda não jogada do seu naipe?"""
+        idx = CARTA_INT[carta]
+        return maior_carta(self.restantes & LANE_MASK[idx // LANE]) == idx
+
+    def vazio(self, nome, naipe):
+        return bool(self.vazios.get(nome, 0) >> NAIPE_LANE[naipe] & 1)
+
+    def vazios_de(self, nome):
+        return {naipe for naipe, lane in NAIPE_LANE.items() if self.vazios.get(nome, 0) >> lane & 1}
+
+    def desconhecidas(self, mao):
+        """Cartas não jogadas que não estão em `mao` (bitmask)."""
+        return self.restantes & ~mao_to_mask(mao)
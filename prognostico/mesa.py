@@ -0,0 +1,220 @@
+# prognostico/mesa.py
+"""Mesa em regiões e envio só do que mudou desde o último rerun.
+
+regioes() monta a mesa como um dict ordenado chave -> HTML: um assento
+("s<i>"), fichas ("c<i>") e montinho ("p<i>") por lugar, uma carta por
+posição da vaza ("j<k>") e o texto do centro. O Emissor de cada sessão
+guarda o último HTML enviado de cada região e diff() devolve só as que
+mudaram, com a versão em que se apoiam:
+
+    {"versao": v, "base": b, "chaves": [...] ou None, "html": {chave: html}}
+
+O componente da mesa (componentes/mesa/index.html) guarda um nó por região
+e troca só esses nós. base 0 é um envio completo; se o componente não está
+na versão `base` (iframe recriado), ele pede um reenvio completo devolvendo
+{"resync": n}. "chaves" só vem quando o conjunto de regiões muda.
+
+A vaza completa é animada no navegador: animacao_da_vaza() descreve quanto
+tempo mostrar as cartas e para onde voam, e o componente devolve
+{"vaza": id} quando termina. Cada vaza custa assim dois reruns (vaza
+completa e vaza recolhida) em vez de um a cada trick_tick.
+
+Reruns e bytes de uma partida simulada, com a vaza animada pelo servidor
+(um rerun por trick_tick) e pelo navegador:
+    python -m prognostico.mesa --players 6
+"""
+import json
+import os
+
+from prognostico import fragmentos
+
+COMPONENTE_DIR = os.path.join(os.path.dirname(__file__), "componentes", "mesa")
+
+
+# =========================
+# REGIÕES
+# =========================
+def regioes(ordem, assentos, prognosticos, pilhas, jogadas, centro: str, pop: bool = False):
+    """HTML da mesa por região.
+
+    assentos: (classe, rótulo) de cada lugar de `ordem`; jogadas: (nome, carta)
+    na mesa; pop: a última carta acabou de ser jogada.
+    """
+    n = len(ordem)
+    lugar = {nome: i for i, nome in enumerate(ordem)}
+    out = {}
+    for i, nome in enumerate(ordem):
+        cls, label = assentos[i]
+        out[f"s{i}"] = fragmentos.assento_html(n, i, cls, label)
+        out[f"c{i}"] = fragmentos.fichas_html(n, i, prognosticos.get(nome, None))
+        won = pilhas.get(nome, 0)
+        if won > 0:
+            out[f"p{i}"] = fragmentos.pilha_html(n, i, won)
+
+    ultima = len(jogadas) - 1
+    for idx, (nome, carta) in enumerate(jogadas):
+        cls = "playCard pop" if pop and idx == ultima else "playCard"
+        out[f"j{idx}"] = fragmentos.jogada_html(n, lugar[nome], carta, cls)
+    out["centro"] = f'<div class="mesaCenter">{centro}</div>'
+    return out
+
+
+def animacao_da_vaza(ordem, vencedor, vaza_id: str, agora: float, mostrar_ate: float, voar_ate: float, avisar: bool = True):
+    """Args da animação da vaza para o componente (prazos em time.time()).
+
+    As cartas ficam paradas até mostrar_ate e voam para o montinho do
+    vencedor até voar_ate; com `avisar`, o componente devolve {"vaza": vaza_id}
+    ao terminar (e isso gera o rerun que recolhe a vaza).
+    """
+    tx, ty = fragmentos.posicoes(len(ordem))[ordem.index(vencedor)][1]
+    inicio_voo = max(agora, mostrar_ate)
+    return {
+        "id": vaza_id,
+        "show_ms": int(max(0.0, mostrar_ate - agora) * 1000),
+        "fly_ms": int(max(0.0, voar_ate - inicio_voo) * 1000),
+        "alvo": [tx, ty + 12],
+        "texto": "Vaza completa — indo ao vencedor...",
+        "avisar": avisar,
+    }
+
+
+def html_completo(regs) -> str:
+    """A mesa inteira num bloco só (como era enviada a cada rerun)."""
+    return f'<div class="mesaWrap"><div class="mesa">{"".join(regs.values())}</div></div>'
+
+
+# =========================
+# EMISSOR
+# =========================
+class Emissor:
+    """Último HTML enviado de cada região de uma sessão, com contadores de bytes."""
+
+    __slots__ = ("ultimo", "chaves", "versao", "resync", "rerun", "envios", "bytes_mesa", "bytes_enviados")
+
+    def __init__(self):
+        self.ultimo = {}
+        self.chaves = None
+        self.versao = 0
+        self.resync = None
+        self.rerun = None
+        self.envios = 0
+        self.bytes_mesa = 0
+        self.bytes_enviados = 0
+
+    def reset(self):
+        """Próximo diff manda a mesa inteira (componente novo ou que perdeu versões)."""
+        self.ultimo = {}
+        self.chaves = None
+
+    def diff(self, regs) -> dict:
+        completo = not self.ultimo
+        base = 0 if completo else self.versao
+        html = {k: h for k, h in regs.items() if self.ultimo.get(k) != h}
+        chaves = list(regs)
+        mudou_chaves = chaves != self.chaves
+        if html or mudou_chaves or completo:
+            self.versao += 1
+        payload = {
+            "versao": self.versao,
+            "base": base,
+            "chaves": chaves if mudou_chaves else None,
+            "html": html,
+        }
+        self.ultimo = dict(regs)
+        self.chaves = chaves
+        self.envios += 1
+        self.bytes_mesa += len(html_completo(regs).encode("utf-8"))
+        self.bytes_enviados += len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+        return payload
+
+
+# =========================
+# BENCHMARK
+# =========================
+def _partida_em_reruns(n_jogadores: int, rng, ticks_show: int, ticks_fly: int):
+    """Gera as regiões de cada rerun de uma partida só de bots, como o app as mostraria."""
+    from prognostico import engine
+    from prognostico.engine import GameState
+
+    nomes = [f"IA {i + 1}" for i in range(n_jogadores)]
+    estado = GameState(nomes, rng=rng)
+    estado.cartas_inicio = 52 // n_jogadores
+    engine.distribuir(estado, estado.cartas_inicio)
+
+    def quadro(centro, pop=False, flash=None):
+        ordem = estado.ordem
+        assentos = []
+        for i, nome in enumerate(ordem):
+            cls = "seat dealer" if i == 0 else "seat"
+            if nome == flash:
+                cls += " winnerFlash"
+            assentos.append((cls, f"{nome} • mão" if i == 0 else nome))
+        return regioes(ordem, assentos, estado.prognosticos, estado.pile_counts, estado.mesa, centro, pop)
+
+    while True:
+        engine.avancar_prognosticos(estado)
+        engine.iniciar_fase_jogo(estado)
+        flash = None
+        while not engine.rodada_terminou(estado):
+            nome = estado.ordem[estado.turn_idx]
+            engine.jogar_carta(estado, nome, engine.ai_escolhe_carta(estado, nome))
+            estado.turn_idx = (estado.turn_idx + 1) % n_jogadores
+            yield quadro("Vaza em andamento", pop=True, flash=flash)
+            yield quadro("Vaza em andamento", flash=flash)
+            flash = None
+            if len(estado.mesa) == n_jogadores:
+                win = engine.vencedor_da_vaza(estado.mesa, estado.naipe_base)
+                for _ in range(ticks_show):
+                    yield quadro("Vaza completa — mostrando...")
+                for _ in range(ticks_fly):
+                    yield quadro("Vaza completa — indo ao vencedor...")
+                engine.recolher_vaza(estado, win)
+                flash = win
+                yield quadro("Aguardando jogada", flash=flash)
+        engine.pontuar_rodada(estado)
+        if estado.cartas_alvo <= 1:
+            return
+        engine.start_next_round(estado)
+
+
+def _medir(n_jogadores: int, seed: int, ticks_show: int, ticks_fly: int):
+    import random
+
+    emissor = Emissor()
+    trocadas = total = 0
+    for regs in _partida_em_reruns(n_jogadores, random.Random(seed), ticks_show, ticks_fly):
+        trocadas += len(emissor.diff(regs)["html"])
+        total += len(regs)
+    return emissor, trocadas, total
+
+
+def main(argv=None):
+    import argparse
+
+    from prognostico.servidor import TEMPOS_NORMAL
+
+    parser = argparse.ArgumentParser(description="Reruns e bytes da mesa numa partida: vaza animada pelo servidor x pelo navegador.")
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    vazas = sum(range(1, 52 // args.players + 1))
+    # antes: um rerun a cada trick_tick enquanto a vaza é mostrada e voa
+    servidor = (
+        round(TEMPOS_NORMAL["trick_show"] / TEMPOS_NORMAL["trick_tick"]),
+        round(TEMPOS_NORMAL["trick_fly"] / TEMPOS_NORMAL["trick_tick"]),
+    )
+    # agora: o rerun da vaza completa e o do aviso do componente (o de recolher)
+    navegador = (1, 0)
+    print(f"Partida de {args.players} jogadores, {vazas} vazas")
+    for nome, (show, fly) in (("servidor", servidor), ("navegador", navegador)):
+        emissor, trocadas, total = _medir(args.players, args.seed, show, fly)
+        print(
+            f"Vaza animada pelo {nome:<9}: {emissor.envios:>5} reruns ({show + fly + 1} por vaza) • "
+            f"mesa inteira {emissor.bytes_mesa / 1024:,.0f} KB • só mudanças {emissor.bytes_enviados / 1024:,.0f} KB • "
+            f"regiões trocadas {trocadas:,} de {total:,}"
+        )
+
+
+if __name__ == "__main__":
+    main()
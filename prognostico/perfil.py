@@ -0,0 +1,229 @@
+# prognostico/perfil.py
+"""Medição dos reruns do app: por que rodou, quanto cada fase levou e quantos bytes saíram.
+
+O app abre uma Medicao no começo de cada execução do script, com o motivo
+que o rerun anterior deixou anotado ("autoplay", "vaza", "pending_play",
+"query_param", "online:<chave>"...; "interacao" quando foi um clique ou o
+primeiro carregamento). As fases (sync_from_room, render_mesa, ia,
+sync_to_room, espera) são cronometradas com `with medicao.fase(nome)` e os
+bytes mandados ao navegador são somados por canal (markdown, mesa, css). A
+Medicao é encerrada com o jeito que a execução terminou ("rerun", "stop",
+"fim"). Uma execução cortada no meio (clique, aviso de componente) é
+encerrada pela seguinte como "interrompida"; se a seguinte demorou mais de
+INTERROMPIDA_MAX_S para começar (erro, aba fechada), ela só é contada.
+
+Perfil guarda as últimas `janela` execuções do processo e resume tudo em
+histogramas de faixas fixas (FAIXAS_MS, FAIXAS_BYTES). Só usa
+time.perf_counter e a soma dos tamanhos; o resumo é calculado quando alguém
+pede (painel ?admin ou salvar()).
+
+Resumo de um arquivo salvo pelo painel:
+    python -m prognostico.perfil perfil.json
+"""
+import bisect
+import json
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+JANELA = 2000
+
+FASES = ("sync_from_room", "render_mesa", "ia", "sync_to_room", "espera")
+FAIXAS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+FAIXAS_BYTES = (256, 1024, 4096, 16384, 65536, 262144)
+
+MOTIVO_INTERACAO = "interacao"
+INTERROMPIDA_MAX_S = 10.0
+
+
+# =========================
+# MEDIÇÃO DE UMA EXECUÇÃO
+# =========================
+class Medicao:
+    """Uma execução do script; fases em segundos, bytes por canal."""
+
+    __slots__ = ("perfil", "motivo", "inicio", "fases", "bytes", "encerrada")
+
+    def __init__(self, perfil: "Perfil", motivo: str):
+        self.perfil = perfil
+        self.motivo = motivo or MOTIVO_INTERACAO
+        self.inicio = time.perf_counter()
+        self.fases = {}
+        self.bytes = {}
+        self.encerrada = False
+
+    @contextmanager
+    def fase(self, nome: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nome] = self.fases.get(nome, 0.0) + time.perf_counter() - t0
+
+    def contar_bytes(self, canal: str, n: int):
+        self.bytes[canal] = self.bytes.get(canal, 0) + n
+
+    def encerrar(self, saida: str):
+        if self.encerrada:
+            return
+        self.encerrada = True
+        self.perfil.registrar(
+            {
+                "motivo": self.motivo,
+                "saida": saida,
+                "fim": time.time(),
+                "total_ms": (time.perf_counter() - self.inicio) * 1e3,
+                "fases_ms": {nome: s * 1e3 for nome, s in self.fases.items()},
+                "bytes": dict(self.bytes),
+            }
+        )
+
+
+# =========================
+# AGREGADO DO PROCESSO
+# =========================
+def _histograma(valores, faixas):
+    contagem = [0] * (len(faixas) + 1)
+    for v in valores:
+        contagem[bisect.bisect_left(faixas, v)] += 1
+    rotulos = [f"<={f:g}" for f in faixas] + [f">{faixas[-1]:g}"]
+    return dict(zip(rotulos, contagem))
+
+
+def _estatisticas(valores, faixas):
+    ordenados = sorted(valores)
+    n = len(ordenados)
+    if not n:
+        return {"n": 0}
+    return {
+        "n": n,
+        "media": sum(ordenados) / n,
+        "p50": ordenados[n // 2],
+        "p90": ordenados[min(n - 1, int(0.90 * n))],
+        "p99": ordenados[min(n - 1, int(0.99 * n))],
+        "max": ordenados[-1],
+        "hist": _histograma(ordenados, faixas),
+    }
+
+
+class Perfil:
+    """Últimas `janela` execuções de todas as sessões do processo."""
+
+    def __init__(self, janela: int = JANELA):
+        self.lock = threading.Lock()
+        self.execucoes = deque(maxlen=janela)
+        self.perdidas = 0
+        self.desde = time.time()
+
+    def iniciar(self, motivo: str) -> Medicao:
+        return Medicao(self, motivo)
+
+    def registrar(self, execucao: dict):
+        with self.lock:
+            self.execucoes.append(execucao)
+
+    def interrompida(self, medicao: Medicao):
+        """A execução seguinte começou sem que `medicao` fosse encerrada."""
+        if time.perf_counter() - medicao.inicio <= INTERROMPIDA_MAX_S:
+            medicao.encerrar("interrompida")
+            return
+        medicao.encerrada = True
+        with self.lock:
+            self.perdidas += 1
+
+    def resumo(self) -> dict:
+        with self.lock:
+            execucoes = list(self.execucoes)
+            perdidas = self.perdidas
+        if execucoes:
+            segundos = max(execucoes[-1]["fim"] - execucoes[0]["fim"], 1e-9)
+        else:
+            segundos = 0.0
+        fases = {}
+        for nome in FASES + tuple(sorted({f for e in execucoes for f in e["fases_ms"]} - set(FASES))):
+            valores = [e["fases_ms"][nome] for e in execucoes if nome in e["fases_ms"]]
+            if valores:
+                fases[nome] = _estatisticas(valores, FAIXAS_MS)
+        canais = sorted({c for e in execucoes for c in e["bytes"]})
+        return {
+            "execucoes": len(execucoes),
+            "perdidas": perdidas,
+            "por_segundo": len(execucoes) / segundos if len(execucoes) > 1 else 0.0,
+            "motivos": dict(Counter(e["motivo"] for e in execucoes).most_common()),
+            "saidas": dict(Counter(e["saida"] for e in execucoes).most_common()),
+            "total_ms": _estatisticas([e["total_ms"] for e in execucoes], FAIXAS_MS),
+            "fases_ms": fases,
+            "bytes": {
+                canal: _estatisticas([e["bytes"].get(canal, 0) for e in execucoes], FAIXAS_BYTES)
+                for canal in canais
+            },
+        }
+
+    def para_json(self, execucoes: bool = False) -> str:
+        dados = {"desde": self.desde, "resumo": self.resumo()}
+        if execucoes:
+            with self.lock:
+                dados["execucoes"] = list(self.execucoes)
+        return json.dumps(dados, ensure_ascii=False, indent=1)
+
+    def salvar(self, caminho: str):
+        with open(caminho, "w", encoding="utf-8") as f:
+            f.write(self.para_json(execucoes=True))
+
+    def limpar(self):
+        with self.lock:
+            self.execucoes.clear()
+            self.perdidas = 0
+            self.desde = time.time()
+
+
+# =========================
+# CLI
+# =========================
+def imprimir(resumo: dict):
+    print(
+        f"{resumo['execucoes']} execuções ({resumo['por_segundo']:,.1f}/s) • "
+        f"perdidas: {resumo['perdidas']}"
+    )
+    print("Motivos: " + ", ".join(f"{m} {n}" for m, n in resumo["motivos"].items()))
+    print("Saídas:  " + ", ".join(f"{m} {n}" for m, n in resumo["saidas"].items()))
+    print(f"\n{'Fase':<16} {'n':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'máx':>9}")
+    linhas = [("total", resumo["total_ms"])] + list(resumo["fases_ms"].items())
+    for nome, est in linhas:
+        if est["n"]:
+            print(
+                f"{nome:<16} {est['n']:>7} {est['p50']:>7.2f}ms {est['p90']:>7.2f}ms "
+                f"{est['p99']:>7.2f}ms {est['max']:>7.2f}ms"
+            )
+    for canal, est in resumo["bytes"].items():
+        print(f"\nBytes {canal}: média {est['media']:,.0f} • p99 {est['p99']:,.0f} • máx. {est['max']:,.0f}")
+        print("  " + " ".join(f"{faixa}:{n}" for faixa, n in est["hist"].items() if n))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resumo de um perfil de reruns salvo pelo app (?admin).")
+    parser.add_argument("arquivo")
+    parser.add_argument("--motivo", help="só as execuções com este motivo")
+    args = parser.parse_args(argv)
+
+    with open(args.arquivo, encoding="utf-8") as f:
+        dados = json.load(f)
+    execucoes = dados.get("execucoes")
+    if execucoes is None:
+        if args.motivo:
+            parser.error("o arquivo só tem o resumo, sem as execuções")
+        imprimir(dados["resumo"])
+        return
+    perfil = Perfil(janela=max(len(execucoes), 1))
+    for execucao in execucoes:
+        if not args.motivo or execucao["motivo"] == args.motivo:
+            perfil.registrar(execucao)
+    perfil.perdidas = dados["resumo"]["perdidas"]
+    imprimir(perfil.resumo())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+# prognostico/persistencia.py
+"""Backends do RoomStore: só memória (padrão) ou um arquivo SQLite.
+
+O RoomStore continua sendo o cache em memória dos snapshots; o backend
+recebe cada versão publicada e devolve versões que este processo ainda não
+tem (depois de reiniciar, ou publicadas por outro processo no mesmo
+arquivo). O SQLite guarda o estado no formato de prognostico.codec e usa
+WAL com synchronous=NORMAL, então um commit não faz fsync.
+
+save(snap, anterior) devolve False quando outro processo já gravou outra
+versão da sala, e o RoomStore trata isso como conflito (ConflitoVersao). Por
+isso, no modo compartilhado (padrão) cada publicação é gravada na hora com
+UPDATE ... WHERE version = anterior. Com compartilhado=False (um processo
+só no arquivo) a gravação é em segundo plano: as publicações de um
+intervalo viram uma transação só, com apenas a última versão de cada sala.
+Se a transação falhar (arquivo travado, disco cheio), o erro vai para o log
+e as salas continuam pendentes até a próxima volta.
+
+Teste com vários processos no mesmo arquivo, incluindo salas em que todos
+escrevem (termina com erro se alguma soma aceita sumir do arquivo):
+    python -m prognostico.persistencia --db /tmp/salas.db --processos 4
+"""
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from multiprocessing import Pool
+
+from prognostico import codec
+
+INTERVALO_ESCRITA = 0.05
+
+log = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    """Não guarda nada: as salas vivem só no RoomStore do processo."""
+
+    poll_s = None
+
+    def version(self, code: str):
+        return None
+
+    def load(self, code: str):
+        return None
+
+    def save(self, snap, anterior: int) -> bool:
+        return True
+
+    def codes(self):
+        return []
+
+    def close(self):
+        pass
+
+
+def serializar(snap) -> bytes:
+    return codec.encode(snap.state, snap.key_versions)
+
+
+def desserializar(code: str, version: int, dados: bytes):
+    from prognostico.salas import RoomSnapshot
+
+    state, key_versions = codec.decode(dados)
+    return RoomSnapshot(code, version, state, key_versions)
+
+
+class SQLiteBackend:
+    """Salas num arquivo SQLite (WAL).
+
+    compartilhado: cada publicação grava na hora, condicionada à versão
+    anterior. Sem ele, escrita em lote a cada `intervalo` s (um processo só).
+    """
+
+    def __init__(self, caminho: str, intervalo: float = INTERVALO_ESCRITA, compartilhado: bool = True):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.compartilhado = compartilhado
+        self.poll_s = intervalo
+        self.publicacoes = 0
+        self.transacoes = 0
+        self.linhas = 0
+        self.conflitos = 0
+        self.falhas = 0
+
+        self._leitura = self._conectar()
+        self._escrita = self._conectar()
+        self._escrita.execute(
+            "CREATE TABLE IF NOT EXISTS rooms ("
+            "code TEXT PRIMARY KEY, version INTEGER NOT NULL, dados BLOB NOT NULL, atualizado REAL NOT NULL)"
+        )
+        self._lock_leitura = threading.Lock()
+        self._lock_escrita = threading.Lock()
+        self._lock_pendentes = threading.Lock()
+        self._pendentes = {}
+        self._parar = threading.Event()
+        self._thread = None
+        if not compartilhado:
+            self._thread = threading.Thread(target=self._escrever, name="salas-sqlite", daemon=True)
+            self._thread.start()
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.caminho, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # leitura
+    def version(self, code: str):
+        with self._lock_leitura:
+            row = self._leitura.execute("SELECT version FROM rooms WHERE code = ?", (code,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, code: str):
+        with self._lock_leitura:
+            row = self._leitura.execute("SELECT version, dados FROM rooms WHERE code = ?", (code,)).fetchone()
+        return desserializar(code, row[0], row[1]) if row else None
+
+    def codes(self):
+        with self._lock_leitura:
+            return [row[0] for row in self._leitura.execute("SELECT code FROM rooms")]
+
+    # escrita
+    def save(self, snap, anterior: int) -> bool:
+        """Grava `snap` se a sala ainda está na versão `anterior` (0 = sala nova)."""
+        if not self.compartilhado:
+            with self._lock_pendentes:
+                self._pendentes[snap.code] = snap
+                self.publicacoes += 1
+            return True
+        dados = serializar(snap)
+        with self._lock_escrita:
+            self.publicacoes += 1
+            if anterior == 0:
+                cur = self._escrita.execute(
+                    "INSERT INTO rooms (code, version, dados, atualizado) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(code) DO NOTHING",
+                    (snap.code, snap.version, dados, time.time()),
+                )
+            else:
+                cur = self._escrita.execute(
+                    "UPDATE rooms SET version = ?, dados = ?, atualizado = ? WHERE code = ? AND version = ?",
+                    (snap.version, dados, time.time(), snap.code, anterior),
+                )
+            self.transacoes += 1
+            if cur.rowcount == 0:
+                self.conflitos += 1
+                return False
+            self.linhas += 1
+        return True
+
+    def _escrever(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.flush()
+            except Exception:
+                # flush devolveu as linhas para _pendentes; tenta de novo na próxima volta
+                self.falhas += 1
+                log.exception("falha gravando salas em %s", self.caminho)
+
+    def flush(self):
+        with self._lock_pendentes:
+            pendentes, self._pendentes = self._pendentes, {}
+        if not pendentes:
+            return
+        try:
+            self._gravar_lote(pendentes)
+        except BaseException:
+            with self._lock_pendentes:
+                # o que foi publicado nesse meio-tempo é mais novo e fica
+                for code, snap in pendentes.items():
+                    self._pendentes.setdefault(code, snap)
+            raise
+
+    def _gravar_lote(self, pendentes):
+        agora = time.time()
+        linhas = [(s.code, s.version, serializar(s), agora) for s in pendentes.values()]
+        with self._lock_escrita:
+            conn = self._escrita
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO rooms (code, version, dados, atualizado) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(code) DO UPDATE SET version = excluded.version, dados = excluded.dados, "
+                    "atualizado = excluded.atualizado WHERE excluded.version > rooms.version",
+                    linhas,
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            self.transacoes += 1
+            self.linhas += len(linhas)
+
+    def close(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        self._leitura.close()
+        self._escrita.close()
+
+
+# =========================
+# TESTE COM VÁRIOS PROCESSOS
+# =========================
+def _processo(args):
+    """Publica em salas próprias e lê as dos outros; no fim espera ver todas completas.
+
+    Depois soma 1 em salas comuns a todos os processos, sempre condicionado à
+    versão lida; devolve quantas somas foram aceitas para main() conferir o total.
+    """
+    caminho, idx, processos, salas, jogadas, comuns, somas = args
+    from prognostico.salas import ConflitoVersao, RoomStore
+
+    store = RoomStore(backend=SQLiteBackend(caminho))
+    rng = random.Random(idx)
+    minhas = [f"P{idx}-S{s}" for s in range(salas)]
+    outras = [f"P{p}-S{s}" for p in range(processos) if p != idx for s in range(salas)]
+
+    inicio = time.perf_counter()
+    for j in range(jogadas):
+        code = rng.choice(minhas)
+        store.publish(code, {"jogada": j, "mesa": [("P", (rng.choice("♠♦♣♥"), rng.randint(2, 10)))]})
+        if outras:
+            store.get(rng.choice(outras))
+    publicar_s = time.perf_counter() - inicio
+    store.backend.flush()
+
+    # cada processo marca as suas salas com "fim" e espera ver a marca nas dos outros
+    inicio = time.perf_counter()
+    faltando = set(outras)
+    while faltando and time.perf_counter() - inicio < 30:
+        for code in list(faltando):
+            snap = store.get(code)
+            if snap is not None and snap.state.get("fim"):
+                faltando.discard(code)
+        for code in minhas:
+            snap = store.get(code)
+            if snap is None or not snap.state.get("fim"):
+                store.publish(code, {"fim": True})
+        store.backend.flush()
+        time.sleep(0.01)
+    convergir_s = time.perf_counter() - inicio
+
+    aceitas = conflitos = 0
+    for _ in range(somas):
+        code = f"COMUM-{rng.randrange(comuns)}"
+        for _ in range(1000):
+            snap = store.get(code)
+            total = snap.state["total"] if snap is not None else 0
+            try:
+                store.publish(code, {"total": total + 1}, esperado=snap.version if snap is not None else 0)
+            except ConflitoVersao:
+                conflitos += 1
+                continue
+            aceitas += 1
+            break
+
+    backend = store.backend
+    store.close()
+    return idx, publicar_s, convergir_s, len(faltando), backend.publicacoes, backend.transacoes, aceitas, conflitos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vários processos publicando no mesmo arquivo SQLite.")
+    parser.add_argument("--db", required=True, help="arquivo SQLite (é recriado)")
+    parser.add_argument("--processos", type=int, default=4)
+    parser.add_argument("--salas", type=int, default=25, help="salas por processo")
+    parser.add_argument("--jogadas", type=int, default=5000, help="publicações por processo")
+    parser.add_argument("--comuns", type=int, default=2, help="salas em que todos os processos escrevem")
+    parser.add_argument("--somas", type=int, default=500, help="somas por processo nas salas comuns")
+    args = parser.parse_args(argv)
+
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + sufixo):
+            os.remove(args.db + sufixo)
+    SQLiteBackend(args.db).close()  # cria a tabela antes dos processos
+
+    tarefas = [
+        (args.db, i, args.processos, args.salas, args.jogadas, args.comuns, args.somas) for i in range(args.processos)
+    ]
+    with Pool(args.processos) as pool:
+        resultados = pool.map(_processo, tarefas)
+
+    print(f"{'Proc':>4} {'Publicar':>9} {'Pub/s':>9} {'Convergir':>10} {'Faltando':>9} {'Publicações':>12} {'Transações':>11}")
+    for idx, publicar_s, convergir_s, faltando, publicacoes, transacoes, _, _ in resultados:
+        print(
+            f"{idx:>4} {publicar_s:>8.2f}s {args.jogadas / max(publicar_s, 1e-9):>9,.0f} "
+            f"{convergir_s:>9.2f}s {faltando:>9} {publicacoes:>12} {transacoes:>11}"
+        )
+
+    backend = SQLiteBackend(args.db)
+    no_arquivo = 0
+    for code in backend.codes():
+        if code.startswith("COMUM-"):
+            no_arquivo += backend.load(code).state["total"]
+    backend.close()
+    aceitas = sum(r[6] for r in resultados)
+    print(
+        f"\nSalas comuns: {aceitas} somas aceitas • {no_arquivo} no arquivo • "
+        f"{sum(r[7] for r in resultados)} conflitos de versão"
+    )
+    if no_arquivo != aceitas:
+        raise SystemExit(f"{aceitas - no_arquivo} somas aceitas sumiram do arquivo")
+
+
+if __name__ == "__main__":
+    main()
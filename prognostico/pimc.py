@@ -0,0 +1,116 @@
+# prognostico/pimc.py
+"""IA do modo especialista: Monte Carlo com determinização (PIMC).
+
+Em cada jogada sorteia distribuições das cartas não vistas que respeitam o
+que já saiu na rodada e os naipes que cada jogador mostrou não ter. Para
+cada amostra, joga cada carta legal e termina a rodada com a heurística do
+modo difícil; fica com a carta de menor distância média entre as vazas
+finais e o prognóstico. Para quando o prazo (em segundos) acaba.
+"""
+import time
+
+from prognostico import engine
+from prognostico.cards import mask_to_mao, peso_carta
+from prognostico.engine import GameState
+
+TENTATIVAS_SORTEIO = 20
+MONTE = None  # destino das cartas que ficaram fora da distribuição
+
+
+def sortear_maos(desconhecidas, tamanhos, vazios, rng):
+    """Reparte as cartas desconhecidas respeitando tamanhos e vazios; None se não achar.
+
+    O que sobra vai para o monte (chave MONTE), que aceita qualquer naipe.
+    """
+    vagas_iniciais = dict(tamanhos)
+    vagas_iniciais[MONTE] = len(desconhecidas) - sum(tamanhos.values())
+    for _ in range(TENTATIVAS_SORTEIO):
+        cartas = desconhecidas[:]
+        rng.shuffle(cartas)
+        # cartas com menos destinos possíveis primeiro
+        cartas.sort(key=lambda c: sum(1 for j in tamanhos if c[0] not in vazios.get(j, ())))
+        vagas = dict(vagas_iniciais)
+        maos = {j: [] for j in vagas}
+        for carta in cartas:
+            destinos = [j for j, v in vagas.items() if v > 0 and carta[0] not in vazios.get(j, ())]
+            if not destinos:
+                break
+            j = rng.choice(destinos)
+            maos[j].append(carta)
+            vagas[j] -= 1
+        else:
+            del maos[MONTE]
+            return maos
+    return None
+
+
+def _clonar(estado, maos):
+    clone = GameState.from_mapping(estado.to_mapping(), rng=estado.rng)
+    clone.maos = maos
+    clone.mesa = estado.mesa[:]
+    clone.vazas_rodada = dict(estado.vazas_rodada)
+    clone.pile_counts = dict(estado.pile_counts)
+    clone.memoria = estado.memoria.copiar()
+    return clone
+
+
+def _terminar_rodada(estado):
+    """Joga o resto da rodada com a heurística do modo difícil para todos."""
+    ordem = estado.ordem
+    n = len(ordem)
+    maos = estado.maos
+    while True:
+        if len(estado.mesa) == n:
+            engine.recolher_vaza(estado, engine.vencedor_da_vaza(estado.mesa, estado.naipe_base))
+            continue
+        atual = ordem[estado.turn_idx]
+        if not maos[atual]:
+            if not estado.mesa and all(not maos[j] for j in ordem):
+                return
+            estado.turn_idx = (estado.turn_idx + 1) % n
+            continue
+        validas = engine.cartas_validas_para_jogar(estado, atual)
+        engine.jogar_carta(estado, atual, engine.escolha_heuristica(estado, atual, validas))
+        estado.turn_idx = (estado.turn_idx + 1) % n
+
+
+def escolher_carta(estado, nome, validas, prazo: float):
+    """Carta com menor distância esperada ao prognóstico, ou None sem prazo/prognóstico."""
+    progn = estado.prognosticos.get(nome)
+    if prazo <= 0 or progn is None or len(validas) < 2:
+        return None
+    fim = time.perf_counter() + prazo
+    rng = estado.rng
+
+    memoria = estado.memoria
+    minha = estado.maos[nome]
+    desconhecidas = mask_to_mao(memoria.desconhecidas(minha))
+    vazios = {j: memoria.vazios_de(j) for j in memoria.vazios}
+    tamanhos = {j: len(m) for j, m in estado.maos.items() if j != nome and m}
+
+    distancias = {c: 0 for c in validas}
+    amostras = 0
+    while True:
+        sorteio = sortear_maos(desconhecidas, tamanhos, vazios, rng)
+        if sorteio is None:
+            break
+        for carta in validas:
+            maos = {j: sorted(m, key=peso_carta) for j, m in sorteio.items()}
+            maos.update({j: [] for j in estado.maos if j not in maos})
+            maos[nome] = minha[:]
+            clone = _clonar(estado, maos)
+            engine.jogar_carta(clone, nome, carta)
+            clone.turn_idx = (clone.turn_idx + 1) % len(clone.ordem)
+            _terminar_rodada(clone)
+            distancias[carta] += abs(clone.vazas_rodada[nome] - progn)
+        amostras += 1
+        if time.perf_counter() >= fim:
+            break
+
+    if not amostras:
+        return None
+    preferida = engine.escolha_heuristica(estado, nome, validas)
+    melhor = min(distancias.values())
+    if distancias[preferida] == melhor:
+        return preferida
+    return next(c for c in validas if distancias[c] == melhor)
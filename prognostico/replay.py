@@ -0,0 +1,345 @@
+# prognostico/replay.py
+"""Log de partida só de acréscimo e reprodução a partir dele.
+
+As cartas de cada rodada vêm de engine.rng_da_rodada(semente_partida,
+rodada), então o log não guarda as mãos, só a semente e as decisões:
+
+    b"PL" + versão (1 byte) + semente + cartas_inicio + nomes
+    registros: tipo (1 byte) + campos varint
+        R_PROGNOSTICO  assento, valor
+        R_JOGADA       assento, carta (1 byte, o int de prognostico.cards)
+        R_PONTOS       pontos acumulados de cada assento (fim da rodada)
+        R_VERSAO       versão da sala em que os registros seguintes foram publicados
+
+As jogadas dos bots também entram, então a reprodução não depende do rng
+dos bots. Registro junta os registros e só os escreve no arquivo em gravar()
+(quem publica com CAS descarta os de uma tentativa que perdeu). Uma partida
+de 6 jogadores do começo ao fim tem menos de 1 KB.
+
+No modo online cada processo anota no próprio arquivo as ações que o worker
+dele publicou, cada bloco com a versão da sala (R_VERSAO); juntar() monta o
+log da partida ordenando os blocos de todos os arquivos pela versão.
+
+Ver uma partida, ou medir com partidas simuladas:
+    python -m prognostico.replay partida.plog
+    python -m prognostico.replay replays/SALA-123-*.plog
+    python -m prognostico.replay --bench 2000 --players 6
+"""
+import argparse
+import io
+import os
+import random
+import time
+
+from prognostico import engine
+from prognostico.cards import CARTA_INT, INT_CARTA
+from prognostico.codec import get_uint, put_uint
+from prognostico.engine import GameState
+
+MAGIC = b"PL"
+VERSAO = 2
+VERSOES_LIDAS = (1, 2)
+
+R_PROGNOSTICO = 1
+R_JOGADA = 2
+R_PONTOS = 3
+R_VERSAO = 4
+
+
+class ReplayError(ValueError):
+    pass
+
+
+# =========================
+# ESCRITA
+# =========================
+class Registro:
+    """Anota uma partida em `destino` (caminho, aberto em modo append, ou arquivo binário).
+
+    O cabeçalho só é escrito se o arquivo estiver vazio, então um worker que
+    reabre o log no meio da partida continua do ponto em que parou.
+    """
+
+    def __init__(self, destino, estado):
+        self.arquivo = open(destino, "ab") if isinstance(destino, (str, os.PathLike)) else destino
+        self.semente = estado.semente_partida
+        self.assentos = {nome: i for i, nome in enumerate(estado.nomes)}
+        self.buf = bytearray()
+        if self.arquivo.tell() == 0:
+            cab = bytearray(MAGIC)
+            cab.append(VERSAO)
+            put_uint(cab, estado.semente_partida)
+            put_uint(cab, estado.cartas_inicio)
+            put_uint(cab, len(estado.nomes))
+            for nome in estado.nomes:
+                dados = nome.encode("utf-8")
+                put_uint(cab, len(dados))
+                cab += dados
+            self.arquivo.write(cab)
+
+    # chamadas pelo engine
+    def prognostico(self, nome, valor: int):
+        self.buf.append(R_PROGNOSTICO)
+        put_uint(self.buf, self.assentos[nome])
+        put_uint(self.buf, valor)
+
+    def jogada(self, nome, carta):
+        self.buf.append(R_JOGADA)
+        put_uint(self.buf, self.assentos[nome])
+        self.buf.append(CARTA_INT[carta])
+
+    def pontos(self, pontos):
+        self.buf.append(R_PONTOS)
+        for nome in self.assentos:
+            put_uint(self.buf, pontos.get(nome, 0))
+
+    def gravar(self, versao: int = None):
+        """Escreve os registros juntados; `versao` é a versão da sala que os publicou."""
+        if self.buf:
+            if versao is not None:
+                marca = bytearray((R_VERSAO,))
+                put_uint(marca, versao)
+                self.arquivo.write(marca)
+            self.arquivo.write(self.buf)
+            self.arquivo.flush()
+            self.buf = bytearray()
+
+    def descartar(self):
+        self.buf = bytearray()
+
+    def close(self):
+        self.gravar()
+        self.arquivo.close()
+
+
+# =========================
+# LEITURA / REPRODUÇÃO
+# =========================
+def _cabecalho(dados):
+    if bytes(dados[:2]) != MAGIC:
+        raise ReplayError("não é um log de partida")
+    if dados[2] not in VERSOES_LIDAS:
+        raise ReplayError(f"versão {dados[2]} não suportada")
+    semente, pos = get_uint(dados, 3)
+    cartas_inicio, pos = get_uint(dados, pos)
+    n, pos = get_uint(dados, pos)
+    nomes = []
+    for _ in range(n):
+        tam, pos = get_uint(dados, pos)
+        if pos + tam > len(dados):
+            raise ReplayError("log truncado")
+        try:
+            nomes.append(bytes(dados[pos:pos + tam]).decode("utf-8"))
+        except UnicodeDecodeError:
+            raise ReplayError(f"nome inválido no cabeçalho (byte {pos})") from None
+        pos += tam
+    return semente, cartas_inicio, nomes, pos
+
+
+def _registros(dados, n: int, pos: int):
+    """Gera (posição, tipo, a, b) lendo o log em sequência; R_PONTOS traz a lista em `a`."""
+    fim = len(dados)
+    while pos < fim:
+        inicio = pos
+        tipo = dados[pos]
+        if tipo == R_JOGADA:
+            assento, pos = get_uint(dados, pos + 1)
+            yield inicio, tipo, assento, dados[pos]
+            pos += 1
+        elif tipo == R_PROGNOSTICO:
+            assento, pos = get_uint(dados, pos + 1)
+            valor, pos = get_uint(dados, pos)
+            yield inicio, tipo, assento, valor
+        elif tipo == R_PONTOS:
+            pos += 1
+            pontos = []
+            for _ in range(n):
+                p, pos = get_uint(dados, pos)
+                pontos.append(p)
+            yield inicio, tipo, pontos, None
+        elif tipo == R_VERSAO:
+            versao, pos = get_uint(dados, pos + 1)
+            yield inicio, tipo, versao, None
+        else:
+            raise ReplayError(f"registro desconhecido {tipo} na posição {pos}")
+
+
+def ler(dados):
+    """(semente, cartas_inicio, nomes, registros); cada registro é (posição, tipo, a, b)."""
+    dados = memoryview(dados)
+    try:
+        semente, cartas_inicio, nomes, pos = _cabecalho(dados)
+        return semente, cartas_inicio, nomes, list(_registros(dados, len(nomes), pos))
+    except IndexError:
+        raise ReplayError("log truncado") from None
+
+
+def juntar(partes):
+    """Um log só com os arquivos da mesma partida gravados por processos diferentes.
+
+    Os cabeçalhos precisam ser iguais; os blocos de cada arquivo (o que vem
+    depois de cada R_VERSAO) são ordenados pela versão da sala. Registros sem
+    R_VERSAO (partida local) ficam no começo, na ordem em que estão.
+    """
+    cabecalho = None
+    blocos = []
+    for dados in partes:
+        dados = memoryview(dados)
+        try:
+            semente, cartas_inicio, nomes, pos = _cabecalho(dados)
+            if cabecalho is None:
+                cabecalho = bytes(dados[:pos])
+            elif bytes(dados[:pos]) != cabecalho:
+                raise ReplayError("os arquivos são de partidas diferentes")
+            versao, inicio = 0, pos
+            for onde, tipo, a, _ in _registros(dados, len(nomes), pos):
+                if tipo == R_VERSAO:
+                    if onde > inicio:
+                        blocos.append((versao, bytes(dados[inicio:onde])))
+                    versao, inicio = a, onde
+            if len(dados) > inicio:
+                blocos.append((versao, bytes(dados[inicio:])))
+        except IndexError:
+            raise ReplayError("log truncado") from None
+    if cabecalho is None:
+        raise ReplayError("nenhum log para juntar")
+    blocos.sort(key=lambda bloco: bloco[0])
+    return cabecalho + b"".join(bloco for _, bloco in blocos)
+
+
+def reproduzir(dados, ao_recolher=None):
+    """Refaz a partida pelas regras do engine e devolve o GameState final.
+
+    Lê o log em sequência, sem montar a lista de registros. Confere a vez, se
+    a carta é válida, os pontos de cada R_PONTOS e se as versões da sala
+    crescem (arquivos de vários processos passam antes por juntar());
+    qualquer diferença levanta ReplayError. ao_recolher(estado, mesa, vencedor) é chamada a cada vaza
+    (para mostrar a partida).
+    """
+    dados = memoryview(dados)
+    try:
+        semente, cartas_inicio, nomes, pos = _cabecalho(dados)
+        return _reproduzir(dados, semente, cartas_inicio, nomes, pos, ao_recolher)
+    except IndexError:
+        raise ReplayError("log truncado") from None
+
+
+def _reproduzir(dados, semente, cartas_inicio, nomes, pos, ao_recolher):
+    estado = GameState(nomes)
+    estado.semente_partida = semente
+    estado.cartas_inicio = cartas_inicio
+    engine.distribuir(estado, cartas_inicio)
+    n = len(nomes)
+    ordem_progn = engine.ordem_da_mesa(nomes, estado.mao_da_rodada)
+    validas = engine.cartas_validas_para_jogar
+    jogar = engine.jogar_carta
+    versao = 0
+
+    for onde, tipo, a, b in _registros(dados, n, pos):
+        if tipo == R_JOGADA:
+            nome = nomes[a]
+            carta = INT_CARTA[b]
+            if estado.fase != "jogo" or estado.ordem[estado.turn_idx] != nome:
+                raise ReplayError(f"byte {onde}: jogada de {nome} fora da vez")
+            if carta not in validas(estado, nome):
+                raise ReplayError(f"byte {onde}: {nome} não podia jogar {carta}")
+            jogar(estado, nome, carta)
+            estado.turn_idx = (estado.turn_idx + 1) % n
+            if len(estado.mesa) == n:
+                mesa = estado.mesa
+                win = engine.vencedor_da_vaza(mesa, estado.naipe_base)
+                engine.recolher_vaza(estado, win)
+                if ao_recolher is not None:
+                    ao_recolher(estado, mesa, win)
+
+        elif tipo == R_PROGNOSTICO:
+            nome = nomes[a]
+            if estado.fase != "prognostico" or ordem_progn[estado.progn_turn_idx] != nome:
+                raise ReplayError(f"byte {onde}: prognóstico de {nome} fora da vez")
+            engine.registrar_prognostico(estado, nome, b)
+            estado.progn_turn_idx += 1
+            if estado.progn_turn_idx == n:
+                engine.iniciar_fase_jogo(estado)
+
+        elif tipo == R_VERSAO:
+            if a <= versao:
+                raise ReplayError(f"byte {onde}: versão {a} da sala depois da {versao}; use juntar()")
+            versao = a
+
+        else:
+            if not engine.rodada_terminou(estado) or estado.mesa:
+                raise ReplayError(f"byte {onde}: pontos antes do fim da rodada {estado.rodada}")
+            engine.pontuar_rodada(estado)
+            obtidos = [estado.pontos[nome] for nome in nomes]
+            if obtidos != a:
+                raise ReplayError(f"byte {onde}: rodada {estado.rodada} deu {obtidos}, o log tem {a}")
+            if estado.cartas_alvo > 1:
+                engine.start_next_round(estado)
+                ordem_progn = engine.ordem_da_mesa(nomes, estado.mao_da_rodada)
+    return estado
+
+
+# =========================
+# CLI / BENCHMARK
+# =========================
+def _partida_registrada(n_jogadores: int, rng):
+    """Uma partida só de bots anotada num buffer em memória: (bytes do log, pontos finais)."""
+    nomes = [f"IA {i + 1}" for i in range(n_jogadores)]
+    estado = GameState(nomes, rng=rng)
+    estado.cartas_inicio = 52 // n_jogadores
+    estado.semente_partida = rng.getrandbits(63)
+    buf = io.BytesIO()
+    estado.registro = Registro(buf, estado)
+    engine.distribuir(estado, estado.cartas_inicio)
+    while True:
+        engine.jogar_rodada(estado)
+        if estado.cartas_alvo <= 1:
+            break
+        engine.start_next_round(estado)
+    estado.registro.gravar()
+    return buf.getvalue(), dict(estado.pontos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mostra ou confere logs de partida (.plog).")
+    parser.add_argument("arquivos", nargs="*", help="log de uma partida (vários: os de cada processo)")
+    parser.add_argument("--bench", type=int, default=0, metavar="N", help="simula N partidas e mede a reprodução")
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.arquivos:
+        partes = []
+        for caminho in args.arquivos:
+            with open(caminho, "rb") as f:
+                partes.append(f.read())
+        dados = partes[0] if len(partes) == 1 else juntar(partes)
+        semente, cartas_inicio, nomes, registros = ler(dados)
+        print(f"Semente {semente} • {len(nomes)} jogadores: {', '.join(nomes)} • {len(dados)} bytes")
+
+        def mostrar(estado, mesa, win):
+            cartas = " ".join(f"{nome}:{naipe}{valor}" for nome, (naipe, valor) in mesa)
+            print(f"  rodada {estado.rodada} • {cartas} → {win}")
+
+        estado = reproduzir(dados, ao_recolher=mostrar)
+        print("Pontos:", ", ".join(f"{nome} {estado.pontos[nome]}" for nome in nomes))
+        return
+
+    if not args.bench:
+        parser.error("informe um arquivo ou --bench N")
+    rng = random.Random(args.seed)
+    inicio = time.perf_counter()
+    partidas = [_partida_registrada(args.players, rng) for _ in range(args.bench)]
+    simular_s = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    divergentes = sum(reproduzir(dados).pontos != pontos for dados, pontos in partidas)
+    reproduzir_s = time.perf_counter() - inicio
+    tamanhos = sorted(len(dados) for dados, _ in partidas)
+    print(f"{args.bench} partidas de {args.players} jogadores (simuladas em {simular_s:.2f}s)")
+    print(f"Log: média {sum(tamanhos) / len(tamanhos):,.0f} bytes • máx. {tamanhos[-1]:,} bytes")
+    print(f"Reprodução: {args.bench / reproduzir_s:,.0f} partidas/s • pontos divergentes: {divergentes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,499 @@
+# prognostico/salas.py
+"""Salas online em memória, como snapshots imutáveis e versionados.
+
+Quem escreve copia (com copiar, fora do lock) só as chaves que mudou e
+publica; a publicação monta o snapshot novo a partir do anterior e troca a
+referência da sala, então quem lê pega o snapshot atual sem lock e sem
+cópia. Cada chave guarda a versão em que mudou pela última vez, e quem já
+viu a versão N pede só o delta desde N. Um snapshot publicado nunca é
+alterado: quem precisa mexer no estado copia os valores antes.
+
+Salas sem acesso há mais de `ttl` segundos saem da memória, e acima de
+`max_salas` saem as acessadas há mais tempo, desde que paradas há pelo menos
+`ociosa_min` segundos: uma partida em andamento nunca é descartada, então
+max_salas pode ser ultrapassado enquanto todas estiverem ativas. Com o
+backend SQLite as salas removidas continuam no arquivo e voltam no próximo
+get. Com o SQLite a publicação
+condicional vale também entre processos (persistencia.SQLiteBackend.save).
+"""
+import copy
+import sys
+import time
+import zlib
+from threading import Condition, Lock
+from types import MappingProxyType
+
+N_SHARDS = 64
+SALA_TTL = 6 * 3600
+MAX_SALAS = 2000
+SALA_OCIOSA_MIN = 600
+LIMPEZA_S = 30.0
+CAS_TENTATIVAS = 5
+
+# chaves do session_state que vão para a sala (a ordem faz parte do formato de
+# prognostico.codec: chaves novas entram no fim)
+ROOM_STATE_KEYS = [
+    "started",
+    "nomes",
+    "humanos",
+    "pontos",
+    "vazas_rodada",
+    "maos",
+    "rodada",
+    "cartas_inicio",
+    "cartas_alvo",
+    "sobras_monte",
+    "mao_da_rodada",
+    "mao_primeira_sorteada",
+    "fase",
+    "show_final",
+    "prognosticos",
+    "progn_turn_idx",
+    "ordem",
+    "turn_idx",
+    "naipe_base",
+    "mesa",
+    "primeira_vaza",
+    "copas_quebrada",
+    "pontuou_rodada",
+    "pending_play",
+    "memoria",
+    "table_pop_until",
+    "winner_flash_name",
+    "winner_flash_until",
+    "trick_pending",
+    "trick_phase",
+    "trick_resolve_at",
+    "trick_fly_until",
+    "trick_winner",
+    "trick_snapshot",
+    "pile_counts",
+    "autoplay_last",
+    "neon_mode",
+    "hard_mode",
+    "expert_mode",
+    "fast_mode",
+    "players_online",
+    "semente_partida",
+]
+
+# as únicas chaves que um cliente publica (empurrar); o resto do estado da sala
+# só muda pelas ações do worker (prognostico.servidor)
+CHAVES_DA_SESSAO = frozenset({"players_online", "neon_mode", "fast_mode"})
+
+# tuplas entram aqui porque no estado da sala só há tuplas de cartas e de
+# (nome, carta), imutáveis até o fim
+_IMUTAVEIS = frozenset({type(None), bool, int, float, str, bytes, tuple, frozenset})
+
+
+def copiar(valor):
+    """deepcopy para os tipos que aparecem no estado da sala, bem mais rápido.
+
+    Imutáveis são reaproveitados; objetos com um método copiar()
+    (MemoriaCartas) se copiam sozinhos; o resto cai no copy.deepcopy.
+    """
+    tipo = type(valor)
+    if tipo in _IMUTAVEIS:
+        return valor
+    if tipo is list:
+        return [v if type(v) in _IMUTAVEIS else copiar(v) for v in valor]
+    if tipo is dict:
+        return {k: v if type(v) in _IMUTAVEIS else copiar(v) for k, v in valor.items()}
+    if tipo is set:
+        return set(valor)
+    metodo = getattr(valor, "copiar", None)
+    if metodo is not None:
+        return metodo()
+    return copy.deepcopy(valor)
+
+
+class RoomSnapshot:
+    """Estado publicado de uma sala.
+
+    version cresce a cada publicação da sala; key_versions diz em que versão
+    cada chave mudou pela última vez.
+    """
+
+    __slots__ = ("code", "version", "state", "key_versions", "tamanhos", "publicado_em")
+
+    def __init__(self, code: str, version: int, state: dict, key_versions: dict, tamanhos=None):
+        self.code = code
+        self.version = version
+        self.state = MappingProxyType(state)
+        self.key_versions = key_versions
+        # bytes aproximados por chave; só as chaves publicadas são medidas de novo
+        self.tamanhos = tamanhos if tamanhos is not None else {k: bytes_aproximados(v) for k, v in state.items()}
+        self.publicado_em = time.time()
+
+    @property
+    def bytes(self):
+        return sum(self.tamanhos.values())
+
+    def changed_since(self, version: int):
+        """Chaves que mudaram depois de `version` (0 = todas)."""
+        return [key for key, v in self.key_versions.items() if v > version]
+
+
+def bytes_aproximados(valor) -> int:
+    """sys.getsizeof somado pelo conteúdo das listas, tuplas e dicts."""
+    tipo = type(valor)
+    if tipo is list or tipo is tuple:
+        return sys.getsizeof(valor) + sum(bytes_aproximados(v) for v in valor)
+    if tipo is dict:
+        return sys.getsizeof(valor) + sum(bytes_aproximados(k) + bytes_aproximados(v) for k, v in valor.items())
+    return sys.getsizeof(valor)
+
+
+def _versao(snap):
+    return snap.version if snap is not None else 0
+
+
+def _montar(code: str, anterior, changes: dict) -> RoomSnapshot:
+    """Snapshot seguinte a `anterior` (None = sala nova) com `changes` aplicadas."""
+    versao = _versao(anterior) + 1
+    if anterior is None:
+        state, key_versions, tamanhos = dict(changes), {}, {}
+    else:
+        state, key_versions = dict(anterior.state), dict(anterior.key_versions)
+        tamanhos = dict(anterior.tamanhos)
+        state.update(changes)
+    key_versions.update(dict.fromkeys(changes, versao))
+    for key, v in changes.items():
+        tamanhos[key] = bytes_aproximados(v)
+    return RoomSnapshot(code, versao, state, key_versions, tamanhos)
+
+
+class ConflitoVersao(Exception):
+    """publish(esperado=N) encontrou a sala em outra versão; `atual` é o snapshot dela."""
+
+    def __init__(self, code: str, esperado: int, atual):
+        super().__init__(f"sala {code}: esperava a versão {esperado}, está na {_versao(atual)}")
+        self.code = code
+        self.esperado = esperado
+        self.atual = atual
+
+
+class ChaveDoServidor(ValueError):
+    """Um cliente tentou publicar uma chave fora de CHAVES_DA_SESSAO."""
+
+
+class _Shard:
+    __slots__ = ("lock", "cond", "rooms", "aquisicoes", "contencoes", "espera_total", "espera_max")
+
+    def __init__(self):
+        self.lock = Lock()
+        self.cond = Condition(self.lock)
+        self.rooms = {}
+        self.aquisicoes = 0
+        self.contencoes = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+
+class RoomStore:
+    """Salas divididas em N_SHARDS pelo crc32 do código, cada grupo com seu lock.
+
+    Só a publicação trava, e só o grupo da sala. O tempo de espera por lock é
+    medido quando a tentativa sem bloqueio falha e aparece em estatisticas().
+
+    backend (prognostico.persistencia) recebe cada versão publicada. Se ele
+    tem poll_s, get() confere no máximo a cada poll_s se outro processo
+    publicou uma versão mais nova da sala e a traz para a memória.
+    """
+
+    def __init__(self, n_shards: int = N_SHARDS, backend=None, ttl: float = SALA_TTL,
+                 max_salas: int = MAX_SALAS, ociosa_min: float = SALA_OCIOSA_MIN):
+        if backend is None:
+            from prognostico.persistencia import MemoryBackend
+
+            backend = MemoryBackend()
+        self.backend = backend
+        self.shards = [_Shard() for _ in range(n_shards)]
+        self.ttl = ttl
+        self.max_salas = max_salas
+        self.ociosa_min = ociosa_min
+        self.removidas = 0
+        self.conflitos = 0
+        self._conferido = {}
+        self._acesso = {}
+        self._ultima_limpeza = time.monotonic()
+
+    def _shard(self, code: str) -> _Shard:
+        return self.shards[zlib.crc32(code.encode("utf-8")) % len(self.shards)]
+
+    def get(self, code: str):
+        """Snapshot atual ou None. Não usa lock: a troca da referência é atômica."""
+        snap = self._shard(code).rooms.get(code)
+        agora = time.monotonic()
+        if snap is not None:
+            self._acesso[code] = agora
+        poll_s = self.backend.poll_s
+        if poll_s is None:
+            return snap
+        if snap is not None and agora - self._conferido.get(code, 0.0) < poll_s:
+            return snap
+        # só salas na memória entram em _conferido: códigos desconhecidos não acumulam
+        versao = self.backend.version(code)
+        if versao is None or versao <= _versao(snap):
+            if snap is not None:
+                self._conferido[code] = agora
+            return snap
+        carregado = self._instalar(self.backend.load(code))
+        self._conferido[code] = agora
+        self._acesso[code] = agora
+        return carregado
+
+    def _instalar(self, carregado):
+        """Põe na memória um snapshot vindo do backend, se ele for mais novo."""
+        shard = self._shard(carregado.code)
+        with shard.cond:
+            atual = shard.rooms.get(carregado.code)
+            if carregado.version > _versao(atual):
+                shard.rooms[carregado.code] = carregado
+                shard.cond.notify_all()
+                return carregado
+            return atual
+
+    def delta(self, code: str, since: int = 0):
+        """(snapshot atual, {chave: valor} do que mudou depois de `since`); valores só leitura."""
+        snap = self.get(code)
+        if snap is not None and snap.version < since:
+            since = 0  # a sala foi removida e criada de novo: manda tudo
+        if snap is None or snap.version <= since:
+            return snap, {}
+        state = snap.state
+        return snap, {key: state[key] for key in snap.changed_since(since)}
+
+    def publish(self, code: str, changes: dict, esperado: int = None, cliente: bool = False) -> RoomSnapshot:
+        """Publica uma nova versão com `changes` sobre o estado atual.
+
+        Com `esperado`, só publica se a sala ainda estiver nessa versão (0 = sala
+        nova); senão levanta ConflitoVersao e quem chamou refaz a alteração
+        sobre o snapshot atual. O backend também confere a versão (outro
+        processo pode ter gravado no mesmo arquivo): se ele recusa, a versão
+        dele vem para a memória e vale a mesma regra; sem `esperado`, as
+        mudanças são aplicadas de novo sobre ela.
+        Com `cliente` (empurrar) só valem as chaves de CHAVES_DA_SESSAO; as
+        outras levantam ChaveDoServidor.
+        O store passa a ser dono dos valores de `changes`.
+        """
+        if cliente and not CHAVES_DA_SESSAO.issuperset(changes):
+            proibidas = ", ".join(sorted(set(changes) - CHAVES_DA_SESSAO))
+            raise ChaveDoServidor(f"sala {code}: só o servidor publica {proibidas}")
+        self.get(code)  # traz a versão de outro processo, se houver
+        shard = self._shard(code)
+        self._travar(shard)
+        try:
+            for _ in range(CAS_TENTATIVAS):
+                anterior = shard.rooms.get(code)
+                if esperado is not None and _versao(anterior) != esperado:
+                    self.conflitos += 1
+                    raise ConflitoVersao(code, esperado, anterior)
+                snap = _montar(code, anterior, changes)
+                if self.backend.save(snap, _versao(anterior)):
+                    break
+                # outro processo gravou antes: a versão dele passa a ser a atual
+                atual = self.backend.load(code)
+                self._conferido[code] = time.monotonic()
+                if atual is not None and atual.version > _versao(anterior):
+                    shard.rooms[code] = atual
+                    shard.cond.notify_all()
+            else:
+                self.conflitos += 1
+                raise ConflitoVersao(code, _versao(anterior), shard.rooms.get(code))
+            shard.rooms[code] = snap
+            self._acesso[code] = time.monotonic()
+            shard.cond.notify_all()
+        finally:
+            shard.lock.release()
+        if anterior is None or time.monotonic() - self._ultima_limpeza > LIMPEZA_S:
+            self.limpar()
+        return snap
+
+    def wait(self, code: str, since: int, timeout: float):
+        """Espera a sala passar da versão `since` (até `timeout` s); devolve o snapshot atual.
+
+        Olha a versão antes de travar. O aviso é por grupo, então uma
+        publicação em outra sala do mesmo grupo só faz a espera conferir de novo.
+        """
+        fim = time.monotonic() + timeout
+        shard = self._shard(code)
+        while True:
+            snap = self.get(code)
+            restante = fim - time.monotonic()
+            if _versao(snap) > since or restante <= 0:
+                return snap
+            if self.backend.poll_s is not None:
+                restante = min(restante, self.backend.poll_s)
+            with shard.cond:
+                if _versao(shard.rooms.get(code)) <= since:
+                    shard.cond.wait(restante)
+
+    def _travar(self, shard: _Shard):
+        if not shard.lock.acquire(blocking=False):
+            inicio = time.perf_counter()
+            shard.lock.acquire()
+            espera = time.perf_counter() - inicio
+            shard.contencoes += 1
+            shard.espera_total += espera
+            shard.espera_max = max(shard.espera_max, espera)
+        shard.aquisicoes += 1
+
+    def limpar(self, agora: float = None):
+        """Remove salas paradas há mais de ttl e, acima de max_salas, as de acesso mais antigo
+        entre as paradas há pelo menos ociosa_min."""
+        agora = time.monotonic() if agora is None else agora
+        self._ultima_limpeza = agora
+        acessos = sorted((self._acesso.get(code, 0.0), code) for code in self.codigos())
+        excesso = len(acessos) - self.max_salas
+        removidas = 0
+        for i, (acesso, code) in enumerate(acessos):
+            parada = agora - acesso
+            if parada <= self.ttl and (i >= excesso or parada < self.ociosa_min):
+                break
+            shard = self._shard(code)
+            with shard.cond:
+                # pode ter sido acessada enquanto a lista era montada
+                if self._acesso.get(code, 0.0) != acesso:
+                    continue
+                shard.rooms.pop(code, None)
+            self._acesso.pop(code, None)
+            self._conferido.pop(code, None)
+            removidas += 1
+        self.removidas += removidas
+        return removidas
+
+    def resumo(self):
+        """Para o painel de admin: salas, bytes aproximados e atividade (sem códigos de sala)."""
+        agora = time.monotonic()
+        snaps = [shard.rooms.get(code) for shard in self.shards for code in list(shard.rooms)]
+        snaps = [s for s in snaps if s is not None]
+        acessos = [self._acesso.get(s.code, agora) for s in snaps]
+        return {
+            "salas": len(snaps),
+            "bytes": sum(s.bytes for s in snaps),
+            "maior_sala_bytes": max((s.bytes for s in snaps), default=0),
+            "acesso_mais_antigo_s": agora - min(acessos) if acessos else 0.0,
+            "publicacao_mais_antiga": min((s.publicado_em for s in snaps), default=None),
+            "removidas": self.removidas,
+            "ttl_s": self.ttl,
+            "max_salas": self.max_salas,
+        }
+
+    def codigos(self):
+        """Códigos das salas na memória, sem travar nenhum grupo."""
+        return [code for shard in self.shards for code in list(shard.rooms)]
+
+    def close(self):
+        """Grava o que o backend ainda tem pendente."""
+        self.backend.close()
+
+    def __len__(self):
+        return sum(len(shard.rooms) for shard in self.shards)
+
+    def estatisticas(self):
+        aquisicoes = sum(s.aquisicoes for s in self.shards)
+        contencoes = sum(s.contencoes for s in self.shards)
+        espera_total = sum(s.espera_total for s in self.shards)
+        return {
+            "salas": len(self),
+            "shards": len(self.shards),
+            "aquisicoes": aquisicoes,
+            "contencoes": contencoes,
+            "espera_total_ms": espera_total * 1000,
+            "espera_media_ms": espera_total * 1000 / contencoes if contencoes else 0.0,
+            "espera_max_ms": max(s.espera_max for s in self.shards) * 1000,
+            "conflitos": self.conflitos,
+        }
+
+
+# =========================
+# SESSÃO <-> SALA
+# =========================
+# `sessao` é o st.session_state (ou um dict, no teste de carga): as chaves de
+# ROOM_STATE_KEYS mais "room_snapshot", o último snapshot que a sessão viu.
+# Com `jogador`, a sessão só recebe a mão dele; as dos outros chegam como
+# listas de None do mesmo tamanho (dá para contar as cartas, não para vê-las).
+# As chaves de SO_NO_SERVIDOR chegam como None: com a semente da partida dá
+# para refazer as mãos de todos (engine.rng_da_rodada).
+SO_NO_SERVIDOR = frozenset({"semente_partida"})
+
+
+def ocultar_maos(maos, jogador: str):
+    """`maos` como `jogador` pode vê-las."""
+    return {nome: copiar(mao) if nome == jogador else [None] * len(mao) for nome, mao in maos.items()}
+
+
+def _para_sessao(key: str, valor, jogador):
+    if jogador is not None:
+        if key in SO_NO_SERVIDOR:
+            return None
+        if key == "maos" and type(valor) is dict:
+            return ocultar_maos(valor, jogador)
+    return copiar(valor)
+
+
+def base_da_sessao(sessao, code: str):
+    """Último snapshot desta sala que a sessão viu ou publicou."""
+    base = sessao.get("room_snapshot")
+    return base if base is not None and base.code == code else None
+
+
+def puxar(store: RoomStore, sessao, code: str, jogador: str = None) -> bool:
+    """Copia para a sessão só as chaves que mudaram desde a base; True se havia algo novo."""
+    base = base_da_sessao(sessao, code)
+    snap, changes = store.delta(code, base.version if base else 0)
+    if not snap or snap is base:
+        return False
+    for key, valor in changes.items():
+        if key in ROOM_STATE_KEYS:
+            sessao[key] = _para_sessao(key, valor, jogador)
+    sessao["room_snapshot"] = snap
+    return True
+
+
+def empurrar(store: RoomStore, sessao, code: str, tentativas: int = CAS_TENTATIVAS, jogador: str = None):
+    """Publica as chaves de CHAVES_DA_SESSAO que a sessão mudou em relação à base,
+    condicionado à versão da base.
+
+    As outras chaves do estado são do worker: se a sessão mexeu nelas, voltam
+    ao valor da base (como puxar as entregaria) e não vão para a sala. Sem
+    base a sessão ainda não viu a sala e não há o que publicar. Em conflito
+    traz o delta e tenta de novo; as chaves que os dois lados mudaram ficam
+    com o valor da sala. Devolve (ok, perdidas): ok é False se as tentativas
+    acabaram; perdidas são as chaves descartadas.
+    """
+    perdidas = set()
+    for _ in range(tentativas):
+        base = base_da_sessao(sessao, code)
+        if base is None:
+            return True, perdidas
+        base_state = base.state
+        changes = {}
+        for key in ROOM_STATE_KEYS:
+            if key not in base_state:
+                continue
+            valor = sessao.get(key)
+            if key in CHAVES_DA_SESSAO:
+                if base_state[key] != valor:
+                    changes[key] = copiar(valor)
+                continue
+            da_sala = base_state[key]
+            if jogador is not None and (key == "maos" or key in SO_NO_SERVIDOR):
+                da_sala = _para_sessao(key, da_sala, jogador)
+            if da_sala != valor:
+                sessao[key] = copiar(da_sala)
+        if not changes:
+            return True, perdidas
+        try:
+            sessao["room_snapshot"] = store.publish(code, changes, esperado=base.version, cliente=True)
+            return True, perdidas
+        except ConflitoVersao:
+            snap, delta = store.delta(code, base.version)
+            for key, valor in delta.items():
+                if key in changes and changes[key] != valor:
+                    perdidas.add(key)
+                if key in ROOM_STATE_KEYS:
+                    sessao[key] = _para_sessao(key, valor, jogador)
+            sessao["room_snapshot"] = snap
+    return False, perdidas
@@ -0,0 +1,396 @@
+# prognostico/servidor.py
+"""Worker por sala no modo online: o servidor é quem avança a mesa.
+
+Os clientes só mandam ações (nova partida, prognóstico, carta jogada,
+próxima rodada) para a fila da sala; o worker é o único que escreve o estado
+do jogo (a sala nasce de um NOVA_PARTIDA) e um cliente só publica as chaves
+da própria sessão (salas.CHAVES_DA_SESSAO). Uma thread por sala aplica cada
+ação com as regras do engine, joga os bots, cuida dos tempos da vaza
+(mostrar, voar, recolher) e publica a nova versão no RoomStore. A mesa anda
+mesmo que a aba do anfitrião esteja em segundo plano. O worker termina
+depois de OCIOSO_S sem ações nem prazos e é recriado na próxima ação. Com
+vários processos, cada ação é processada pelo worker do processo que a
+recebeu.
+
+A publicação é condicional à versão lida (RoomStore.publish com esperado).
+Se um cliente ou o worker de outro processo publicou no meio, a ação é aplicada de novo sobre o
+snapshot novo, até CAS_TENTATIVAS vezes. Ação recusada ou tentativas
+esgotadas ficam em Pedido.erro para o cliente mostrar.
+
+Com `replays`, cada processo anota as ações que publicou numa partida em
+<replays>/<sala>-<semente>-<pid>.plog (prognostico.replay), cada bloco com a
+versão da sala; replay.juntar() monta a partida com os arquivos de todos os
+processos. Os registros de uma tentativa que perdeu o CAS são descartados.
+"""
+import os
+import queue
+import threading
+import time
+
+from prognostico import engine, replay
+from prognostico.engine import GameState, ordem_da_mesa, vencedor_da_vaza
+from prognostico.salas import ROOM_STATE_KEYS, ConflitoVersao, copiar
+
+OCIOSO_S = 300.0
+CAS_TENTATIVAS = 8
+
+NOVA_PARTIDA = "nova_partida"
+PROGNOSTICO = "prognostico"
+JOGAR = "jogar"
+PROXIMA_RODADA = "proxima_rodada"
+AVANCAR = "avancar"
+
+TEMPOS_NORMAL = {
+    "trick_show": 1.10,
+    "trick_fly": 0.55,
+    "autoplay_delay": 0.08,
+    "trick_tick": 0.06,
+    "play_delay": 0.14,
+    "ai_step_delay": 0.03,
+}
+TEMPOS_RAPIDO = {
+    "trick_show": 0.35,
+    "trick_fly": 0.20,
+    "autoplay_delay": 0.02,
+    "trick_tick": 0.02,
+    "play_delay": 0.05,
+    "ai_step_delay": 0.0,
+}
+
+
+def tempos(fast_mode: bool) -> dict:
+    return dict(TEMPOS_RAPIDO if fast_mode else TEMPOS_NORMAL)
+
+
+class AcaoInvalida(Exception):
+    pass
+
+
+# chaves da sala que não são do GameState, com os valores de uma sala nova
+PADRAO_SALA = {
+    "started": True,
+    "show_final": False,
+    "pending_play": None,
+    "table_pop_until": 0.0,
+    "winner_flash_name": None,
+    "winner_flash_until": 0.0,
+    "trick_pending": False,
+    "trick_phase": None,
+    "trick_resolve_at": 0.0,
+    "trick_fly_until": 0.0,
+    "trick_winner": None,
+    "trick_snapshot": [],
+    "autoplay_last": 0.0,
+    "neon_mode": False,
+    "fast_mode": True,
+    "players_online": [],
+}
+
+# o que NOVA_PARTIDA aceita em `opcoes`
+OPCOES_PARTIDA = ("cartas_inicio", "hard_mode", "expert_mode", "fast_mode", "neon_mode")
+
+
+def nova_sala(nomes, humanos, rng=None, **opcoes):
+    """Estado de uma sala com uma partida nova, já com as cartas da primeira rodada.
+
+    opcoes: as de OPCOES_PARTIDA (cartas_inicio padrão 52 // jogadores) e players_online.
+    """
+    estado = GameState(nomes, humanos=humanos, rng=rng,
+                       hard_mode=bool(opcoes.pop("hard_mode", False)),
+                       expert_mode=bool(opcoes.pop("expert_mode", False)))
+    cartas = opcoes.pop("cartas_inicio", None)
+    estado.cartas_inicio = int(cartas) if cartas else 52 // len(estado.nomes)
+    engine.distribuir(estado, estado.cartas_inicio)
+    sala = dict(PADRAO_SALA, **opcoes)
+    sala.update(estado.to_mapping())
+    return {key: sala[key] for key in ROOM_STATE_KEYS}
+
+
+# =========================
+# REGRAS DA SALA
+# =========================
+# `sala` é um dict com as chaves de ROOM_STATE_KEYS, já copiado do snapshot.
+def _limpar_vaza(sala):
+    sala["trick_pending"] = False
+    sala["trick_phase"] = None
+    sala["trick_resolve_at"] = 0.0
+    sala["trick_fly_until"] = 0.0
+    sala["trick_winner"] = None
+    sala["trick_snapshot"] = []
+
+
+def fim_de_rodada_pronto(sala) -> bool:
+    return engine.rodada_terminou(GameState.from_mapping(sala)) and not sala["trick_pending"] and not sala["mesa"]
+
+
+def aplicar_acao(sala, acao, agora: float, registro=None):
+    """Aplica a ação de um jogador; AcaoInvalida se ela não vale neste estado."""
+    tipo = acao[0]
+    if tipo == AVANCAR:
+        return
+
+    if tipo == NOVA_PARTIDA:
+        # `sala` vazia = a sala ainda não existe
+        _, nome, nomes, humanos, opcoes = acao
+        if sala and sala["fase"] != "fim":
+            raise AcaoInvalida("a sala já tem uma partida em andamento")
+        nomes, humanos = list(nomes), list(humanos)
+        if len(nomes) < 2 or len(set(nomes)) != len(nomes):
+            raise AcaoInvalida("a partida precisa de pelo menos 2 jogadores com nomes diferentes")
+        if nome not in humanos or not set(humanos) <= set(nomes):
+            raise AcaoInvalida(f"{nome} precisa estar entre os humanos da partida")
+        extras = set(opcoes) - set(OPCOES_PARTIDA)
+        if extras:
+            raise AcaoInvalida(f"opções desconhecidas: {', '.join(sorted(extras))}")
+        cartas = opcoes.get("cartas_inicio")
+        if cartas is not None and not 1 <= int(cartas) <= 52 // len(nomes):
+            raise AcaoInvalida(f"cartas por jogador fora do intervalo: {cartas}")
+        sala.clear()
+        sala.update(nova_sala(nomes, humanos, players_online=[nome], **opcoes))
+        return
+
+    if tipo == PROGNOSTICO:
+        _, nome, valor = acao
+        if sala["fase"] != "prognostico":
+            raise AcaoInvalida("fora da fase de prognóstico")
+        ordem = ordem_da_mesa(sala["nomes"], sala["mao_da_rodada"])
+        idx = sala["progn_turn_idx"]
+        if idx >= len(ordem) or ordem[idx] != nome:
+            raise AcaoInvalida(f"não é a vez de {nome} fazer o prognóstico")
+        if not 0 <= int(valor) <= len(sala["maos"].get(nome, [])):
+            raise AcaoInvalida(f"prognóstico fora do intervalo: {valor}")
+        estado = GameState.from_mapping(sala, registro=registro)
+        engine.registrar_prognostico(estado, nome, int(valor))
+        estado.progn_turn_idx = idx + 1
+        sala.update(estado.to_mapping())
+        return
+
+    if tipo == JOGAR:
+        _, nome, carta = acao
+        if sala["fase"] != "jogo" or sala["trick_pending"]:
+            raise AcaoInvalida("a mesa não está esperando jogada")
+        ordem = sala["ordem"]
+        if not ordem or ordem[sala["turn_idx"]] != nome:
+            raise AcaoInvalida(f"não é a vez de {nome}")
+        estado = GameState.from_mapping(sala, registro=registro)
+        if carta not in engine.cartas_validas_para_jogar(estado, nome):
+            raise AcaoInvalida(f"carta inválida: {carta}")
+        engine.jogar_carta(estado, nome, carta)
+        estado.turn_idx = (estado.turn_idx + 1) % len(ordem)
+        sala.update(estado.to_mapping())
+        sala["pending_play"] = None
+        sala["table_pop_until"] = agora + 0.22
+        return
+
+    if tipo == PROXIMA_RODADA:
+        if sala["fase"] != "jogo" or not fim_de_rodada_pronto(sala) or sala["cartas_alvo"] <= 1:
+            raise AcaoInvalida("a rodada ainda não acabou")
+        estado = GameState.from_mapping(sala)
+        engine.start_next_round(estado)
+        sala.update(estado.to_mapping())
+        sala["pending_play"] = None
+        _limpar_vaza(sala)
+        return
+
+    raise AcaoInvalida(f"ação desconhecida: {tipo!r}")
+
+
+def avancar_sala(sala, agora: float, registro=None):
+    """Joga os bots e os tempos da vaza até parar; devolve o próximo prazo (time.time()) ou None."""
+    t = tempos(sala.get("fast_mode"))
+
+    if sala["fase"] == "prognostico":
+        estado = GameState.from_mapping(sala, registro=registro)
+        engine.avancar_prognosticos(estado)
+        if estado.progn_turn_idx >= len(ordem_da_mesa(estado.nomes, estado.mao_da_rodada)):
+            engine.iniciar_fase_jogo(estado)
+        sala.update(estado.to_mapping())
+
+    if sala["fase"] != "jogo" or not sala["ordem"]:
+        return None
+
+    n = len(sala["ordem"])
+    while True:
+        if sala["trick_pending"]:
+            # mostrar e voar são animados no navegador; o worker só acorda para recolher
+            if agora < sala["trick_fly_until"]:
+                return sala["trick_fly_until"]
+            win = sala["trick_winner"]
+            estado = GameState.from_mapping(sala)
+            engine.recolher_vaza(estado, win)
+            sala.update(estado.to_mapping())
+            sala["winner_flash_name"] = win
+            sala["winner_flash_until"] = agora + 1.2
+            _limpar_vaza(sala)
+            continue
+
+        if len(sala["mesa"]) == n:
+            sala["trick_pending"] = True
+            sala["trick_phase"] = "show"
+            sala["trick_snapshot"] = sala["mesa"][:]
+            sala["trick_winner"] = vencedor_da_vaza(sala["trick_snapshot"], sala["naipe_base"])
+            sala["trick_resolve_at"] = agora + t["trick_show"]
+            sala["trick_fly_until"] = agora + t["trick_show"] + t["trick_fly"]
+            continue
+
+        estado = GameState.from_mapping(sala, registro=registro)
+        if engine.rodada_terminou(estado):
+            engine.pontuar_rodada(estado)
+            sala.update(estado.to_mapping())
+            if sala["cartas_alvo"] <= 1:
+                sala["fase"] = "fim"
+                sala["show_final"] = True
+            return None
+
+        status, jogadas = engine.avancar_ate_humano_ou_fim(estado, prazo=t["ai_step_delay"])
+        sala.update(estado.to_mapping())
+        if jogadas:
+            sala["table_pop_until"] = agora + 0.22
+        if status not in (engine.VAZA_COMPLETA, engine.FIM_RODADA):
+            return None
+
+
+# =========================
+# WORKERS
+# =========================
+class Pedido:
+    """Uma ação na fila; `feito` é marcado depois que o resultado foi publicado."""
+
+    __slots__ = ("acao", "feito", "erro", "tentativas")
+
+    def __init__(self, acao: tuple):
+        self.acao = acao
+        self.feito = threading.Event()
+        self.erro = None
+        self.tentativas = 0
+
+    def esperar(self, timeout: float) -> bool:
+        return self.feito.wait(timeout)
+
+
+class SalaWorker(threading.Thread):
+    def __init__(self, servidor: "Servidor", code: str):
+        super().__init__(name=f"sala-{code}", daemon=True)
+        self.servidor = servidor
+        self.code = code
+        self.fila = queue.Queue()
+        self.processadas = 0
+        self.rejeitadas = 0
+        self.conflitos = 0
+        self.ultimo_erro = None
+        self.registro = None
+
+    def run(self):
+        prazo = None
+        while True:
+            espera = OCIOSO_S if prazo is None else max(0.0, prazo - time.time())
+            try:
+                pedido = self.fila.get(timeout=espera)
+            except queue.Empty:
+                if prazo is None and self.servidor._encerrar(self):
+                    if self.registro is not None:
+                        self.registro.close()
+                    return
+                pedido = None
+            prazo = self._ciclo(pedido)
+            if pedido is not None:
+                if pedido.erro is not None:
+                    self.ultimo_erro = pedido.erro
+                pedido.feito.set()
+
+    def _registro(self, sala):
+        """Log da partida atual da sala (um arquivo por semente e processo), se o servidor anota partidas.
+
+        Dois processos nunca escrevem no mesmo arquivo: com SQLite compartilhado
+        o worker de cada um anota só o que publicou.
+        """
+        semente = sala.get("semente_partida")
+        if not self.servidor.replays or semente is None:
+            return None
+        if self.registro is None or self.registro.semente != semente:
+            if self.registro is not None:
+                self.registro.close()
+            os.makedirs(self.servidor.replays, exist_ok=True)
+            caminho = os.path.join(self.servidor.replays, f"{self.code}-{semente}-{os.getpid()}.plog")
+            self.registro = replay.Registro(caminho, GameState.from_mapping(sala))
+        return self.registro
+
+    def _ciclo(self, pedido):
+        """Aplica o pedido (ou só os prazos) e publica; refaz tudo se a sala mudou no meio."""
+        store = self.servidor.store
+        for tentativa in range(1, CAS_TENTATIVAS + 1):
+            snap = store.get(self.code)
+            if snap is None and (pedido is None or pedido.acao[0] != NOVA_PARTIDA):
+                if pedido is not None:
+                    pedido.erro = "sala não encontrada"
+                return None
+            sala = {key: copiar(v) for key, v in snap.state.items()} if snap is not None else {}
+            registro = self._registro(sala)
+            agora = time.time()
+            erro = None
+            if pedido is not None:
+                pedido.tentativas = tentativa
+                try:
+                    aplicar_acao(sala, pedido.acao, agora, registro)
+                except AcaoInvalida as e:
+                    erro = str(e)
+                registro = self._registro(sala)  # NOVA_PARTIDA troca a semente
+            if not sala:
+                pedido.erro = erro
+                self.rejeitadas += 1
+                return None
+            prazo = avancar_sala(sala, agora, registro)
+            estado = snap.state if snap is not None else {}
+            changes = {key: v for key, v in sala.items() if key not in estado or estado[key] != v}
+            publicado = None
+            try:
+                if changes:
+                    publicado = store.publish(self.code, changes, esperado=snap.version if snap is not None else 0)
+            except ConflitoVersao:
+                self.conflitos += 1
+                if registro is not None:
+                    registro.descartar()
+                continue
+            if registro is not None:
+                registro.gravar(publicado.version if publicado is not None else None)
+            if pedido is not None:
+                pedido.erro = erro
+                if erro is None:
+                    self.processadas += 1
+                else:
+                    self.rejeitadas += 1
+            return prazo
+        if pedido is not None:
+            pedido.erro = f"a sala mudou {CAS_TENTATIVAS} vezes seguidas; tente de novo"
+            self.rejeitadas += 1
+        return time.time()  # os prazos da mesa ficam para a próxima volta
+
+
+class Servidor:
+    """Registro dos workers ativos, um por sala."""
+
+    def __init__(self, store, replays: str = None):
+        self.store = store
+        self.replays = replays
+        self.lock = threading.Lock()
+        self.workers = {}
+
+    def enviar(self, code: str, acao: tuple) -> Pedido:
+        """Põe a ação na fila da sala; Pedido.esperar() espera o resultado ser publicado."""
+        pedido = Pedido(acao)
+        with self.lock:
+            worker = self.workers.get(code)
+            if worker is None:
+                worker = self.workers[code] = SalaWorker(self, code)
+                worker.start()
+            worker.fila.put(pedido)
+        return pedido
+
+    def _encerrar(self, worker: SalaWorker) -> bool:
+        """Chamado pelo worker ocioso; só sai se nenhuma ação chegou nesse meio-tempo."""
+        with self.lock:
+            if not worker.fila.empty():
+                return False
+            if self.workers.get(worker.code) is worker:
+                del self.workers[worker.code]
+            return True
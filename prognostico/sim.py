@@ -0,0 +1,176 @@
+# prognostico/sim.py
+"""Simulador em lote de partidas completas, sem Streamlit.
+
+Uso:
+    python -m prognostico.sim --players 6 --games 100000 --hard
+    python -m prognostico.sim --players 6 --games 100000 --workers 0 --seed 42
+
+As partidas são divididas em lotes de tamanho fixo (LOTE) e cada lote recebe
+uma semente derivada da semente mestre. Como a divisão não depende de quantos
+processos existem, a mesma --seed dá o mesmo resultado com qualquer --workers.
+Cada processo devolve só o Resumo agregado do lote, nunca as partidas.
+"""
+import argparse
+import math
+import os
+import random
+import time
+from collections import Counter
+from multiprocessing import Pool
+
+from prognostico import engine
+from prognostico.engine import GameState
+
+
+LOTE = 500
+
+
+def simular_partida(n_jogadores: int, hard_mode: bool = False, rng=None, prazo: float = 0.0):
+    """Joga uma partida de 52 // n cartas até 1 carta. Retorna (pontos por assento, rodadas).
+
+    prazo > 0 liga o modo especialista com esse tempo (s) por jogada.
+    """
+    nomes = [f"IA {i + 1}" for i in range(n_jogadores)]
+    estado = GameState(nomes, hard_mode=hard_mode or prazo > 0, rng=rng, expert_mode=prazo > 0)
+    cartas_inicio = 52 // n_jogadores
+    estado.cartas_inicio = cartas_inicio
+    engine.distribuir(estado, cartas_inicio)
+
+    rodadas = 0
+    while True:
+        engine.jogar_rodada(estado, prazo)
+        rodadas += 1
+        if estado.cartas_alvo <= 1:
+            break
+        engine.start_next_round(estado)
+    return [estado.pontos[nome] for nome in nomes], rodadas
+
+
+class Resumo:
+    """Agregado por assento: histograma de pontos, vitórias e contadores."""
+
+    def __init__(self, n_jogadores: int):
+        self.n_jogadores = n_jogadores
+        self.partidas = 0
+        self.rodadas = 0
+        self.pontos = [Counter() for _ in range(n_jogadores)]
+        self.vitorias = [0] * n_jogadores
+
+    def registrar(self, pontos, rodadas: int):
+        self.partidas += 1
+        self.rodadas += rodadas
+        melhor = max(pontos)
+        for seat, p in enumerate(pontos):
+            self.pontos[seat][p] += 1
+            if p == melhor:
+                self.vitorias[seat] += 1
+
+    def mesclar(self, outro: "Resumo"):
+        self.partidas += outro.partidas
+        self.rodadas += outro.rodadas
+        for seat in range(self.n_jogadores):
+            self.pontos[seat].update(outro.pontos[seat])
+            self.vitorias[seat] += outro.vitorias[seat]
+
+    def estatisticas(self, seat: int):
+        hist = self.pontos[seat]
+        total = sum(hist.values())
+        if not total:
+            return None
+        media = sum(p * c for p, c in hist.items()) / total
+        var = sum(c * (p - media) ** 2 for p, c in hist.items()) / total
+        return {
+            "media": media,
+            "desvio": math.sqrt(var),
+            "min": min(hist),
+            "p50": _percentil(hist, total, 0.50),
+            "p90": _percentil(hist, total, 0.90),
+            "max": max(hist),
+            "vitorias": self.vitorias[seat] / total,
+        }
+
+
+def _percentil(hist, total, q):
+    alvo = q * total
+    acumulado = 0
+    for p in sorted(hist):
+        acumulado += hist[p]
+        if acumulado >= alvo:
+            return p
+    return max(hist)
+
+
+def semente_do_lote(semente: int, lote: int) -> int:
+    return random.Random(f"{semente}/{lote}").getrandbits(64)
+
+
+def _rodar_lote(args):
+    n_jogadores, partidas, hard_mode, prazo, semente = args
+    rng = random.Random(semente)
+    resumo = Resumo(n_jogadores)
+    for _ in range(partidas):
+        pontos, rodadas = simular_partida(n_jogadores, hard_mode, rng, prazo)
+        resumo.registrar(pontos, rodadas)
+    return resumo
+
+
+def rodar(n_jogadores: int, partidas: int, hard_mode: bool = False, semente: int = 0, workers: int = 1,
+          prazo: float = 0.0) -> Resumo:
+    tarefas = [
+        (n_jogadores, min(LOTE, partidas - inicio), hard_mode, prazo, semente_do_lote(semente, lote))
+        for lote, inicio in enumerate(range(0, partidas, LOTE))
+    ]
+    resumo = Resumo(n_jogadores)
+    if workers <= 1 or len(tarefas) <= 1:
+        for tarefa in tarefas:
+            resumo.mesclar(_rodar_lote(tarefa))
+        return resumo
+    with Pool(min(workers, len(tarefas))) as pool:
+        for parcial in pool.imap_unordered(_rodar_lote, tarefas):
+            resumo.mesclar(parcial)
+    return resumo
+
+
+def formatar_relatorio(resumo: Resumo, segundos: float) -> str:
+    segundos = max(segundos, 1e-9)
+    linhas = [
+        f"Partidas: {resumo.partidas} • Rodadas: {resumo.rodadas} • Tempo: {segundos:.2f}s",
+        f"Partidas/s: {resumo.partidas / segundos:,.1f} • Rodadas/s: {resumo.rodadas / segundos:,.1f}",
+        "",
+        f"{'Assento':>7} {'Média':>8} {'Desvio':>8} {'Mín':>5} {'P50':>5} {'P90':>5} {'Máx':>5} {'Vitórias':>9}",
+    ]
+    for seat in range(resumo.n_jogadores):
+        e = resumo.estatisticas(seat)
+        if e is None:
+            continue
+        linhas.append(
+            f"{seat + 1:>7} {e['media']:>8.2f} {e['desvio']:>8.2f} {e['min']:>5} {e['p50']:>5} "
+            f"{e['p90']:>5} {e['max']:>5} {e['vitorias']:>8.1%}"
+        )
+    return "\n".join(linhas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simula partidas completas do Jogo de Prognóstico.")
+    parser.add_argument("--players", type=int, default=4, help="jogadores na mesa (2 a 52)")
+    parser.add_argument("--games", type=int, default=1000, help="partidas a simular")
+    parser.add_argument("--hard", action="store_true", help="IA do modo difícil")
+    parser.add_argument("--expert", type=float, default=0.0, metavar="SEGUNDOS",
+                        help="IA do modo especialista com esse prazo por jogada (não é reprodutível)")
+    parser.add_argument("--seed", type=int, default=None, help="semente mestre para reproduzir a execução")
+    parser.add_argument("--workers", type=int, default=1, help="processos em paralelo (0 = todos os núcleos)")
+    args = parser.parse_args(argv)
+
+    if not 2 <= args.players <= 52:
+        parser.error("--players precisa estar entre 2 e 52")
+    semente = args.seed if args.seed is not None else random.SystemRandom().getrandbits(32)
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
+    inicio = time.perf_counter()
+    resumo = rodar(args.players, args.games, args.hard, semente, workers, args.expert)
+    print(f"Semente: {semente} • Processos: {workers}")
+    print(formatar_relatorio(resumo, time.perf_counter() - inicio))
+
+
+if __name__ == "__main__":
+    main()
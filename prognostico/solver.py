@@ -0,0 +1,231 @@
+# prognostico/solver.py
+"""Solver double-dummy para finais de rodada (poucas cartas na mão).
+
+Vê todas as mãos e faz alfa-beta "paranoico": o jogador avaliado maximiza e
+todos os outros jogam contra ele. As posições no início de cada vaza ficam
+numa tabela de transposição indexada pelas mãos restantes (bitmasks de
+prognostico.cards). Como a chave descreve a posição inteira, a tabela é
+compartilhada entre chamadas: a jogada seguinte do mesmo bot reaproveita a
+busca anterior. Um orçamento de nós limita a busca; se ele acabar, as funções
+públicas devolvem None e quem chamou usa a heurística.
+"""
+from prognostico.cards import (
+    CARTA_INT,
+    INT_CARTA,
+    LANE,
+    LANE_MASK,
+    NAIPE_LANE,
+    TRUNFO_LANE,
+    carta_vencedora,
+    cartas_validas_mask,
+    mao_to_mask,
+)
+
+ORCAMENTO_PADRAO = 10000
+LIMITE_TT = 100000
+
+_EXATO, _INFERIOR, _SUPERIOR = 0, 1, 2
+
+_tt = {}
+
+
+class OrcamentoEsgotado(Exception):
+    pass
+
+
+class _Busca:
+    def __init__(self, n, eu, alvo, orcamento):
+        self.n = n
+        self.eu = eu
+        self.alvo = alvo
+        self.orcamento = orcamento
+        self.nos = 0
+        if len(_tt) > LIMITE_TT:
+            _tt.clear()
+        self.tt = _tt
+
+    def valor(self, maos, mesa, turno, naipe, primeira, quebrada, ganhas, alpha, beta):
+        """Com alvo=None devolve as vazas de `eu` daqui em diante; senão -|ganhas - alvo| no fim."""
+        self.nos += 1
+        if self.nos > self.orcamento:
+            raise OrcamentoEsgotado
+
+        if len(mesa) == self.n:
+            mesa_mask = 0
+            for _, c in mesa:
+                mesa_mask |= 1 << c
+            vencedora = carta_vencedora(mesa_mask, naipe)
+            win = next(seat for seat, c in mesa if c == vencedora)
+            g = 1 if win == self.eu else 0
+            if self.alvo is None:
+                return g + self.valor(maos, (), win, None, False, quebrada, 0, alpha - g, beta - g)
+            return self.valor(maos, (), win, None, False, quebrada, ganhas + g, alpha, beta)
+
+        if not mesa and not any(maos):
+            return 0 if self.alvo is None else -abs(ganhas - self.alvo)
+
+        chave = None
+        if not mesa:
+            # no modo alvo o valor só depende de quantas vazas ainda faltam
+            falta = None if self.alvo is None else self.alvo - ganhas
+            chave = (maos, turno, primeira, quebrada, self.eu, falta)
+            entrada = self.tt.get(chave)
+            if entrada is not None:
+                v, tipo = entrada
+                if tipo == _EXATO:
+                    return v
+                if tipo == _INFERIOR and v >= beta:
+                    return v
+                if tipo == _SUPERIOR and v <= alpha:
+                    return v
+
+        alpha_orig, beta_orig = alpha, beta
+        maximiza = turno == self.eu
+        melhor = None
+        proximo = (turno + 1) % self.n
+        for c in self.jogadas(maos, mesa, turno, naipe, primeira, quebrada):
+            lane = c // LANE
+            novas = maos[:turno] + (maos[turno] & ~(1 << c),) + maos[turno + 1:]
+            v = self.valor(
+                novas,
+                mesa + ((turno, c),),
+                proximo,
+                lane if naipe is None else naipe,
+                primeira,
+                quebrada or (lane == TRUNFO_LANE and not primeira),
+                ganhas,
+                alpha,
+                beta,
+            )
+            if maximiza:
+                if melhor is None or v > melhor:
+                    melhor = v
+                alpha = max(alpha, v)
+            else:
+                if melhor is None or v < melhor:
+                    melhor = v
+                beta = min(beta, v)
+            if alpha >= beta:
+                break
+
+        if chave is not None:
+            if melhor <= alpha_orig:
+                self.tt[chave] = (melhor, _SUPERIOR)
+            elif melhor >= beta_orig:
+                self.tt[chave] = (melhor, _INFERIOR)
+            else:
+                self.tt[chave] = (melhor, _EXATO)
+        return melhor
+
+    def jogadas(self, maos, mesa, turno, naipe, primeira, quebrada):
+        """Cartas legais, do maior para o menor, sem repetir cartas equivalentes em sequência."""
+        minha = maos[turno]
+        validas = cartas_validas_mask(minha, naipe, primeira, quebrada)
+        outras = 0
+        for seat, m in enumerate(maos):
+            if seat != turno:
+                outras |= m
+        for _, c in mesa:
+            outras |= 1 << c
+
+        jogadas = []
+        anterior = None
+        while validas:
+            low = validas & -validas
+            c = low.bit_length() - 1
+            validas ^= low
+            if anterior is not None and anterior // LANE == c // LANE:
+                entre = ((1 << c) - 1) & ~((1 << (anterior + 1)) - 1)
+                if not (outras & entre):
+                    jogadas[-1] = c
+                    anterior = c
+                    continue
+            jogadas.append(c)
+            anterior = c
+        jogadas.reverse()
+        return jogadas
+
+
+def _converter(ordem, maos, mesa, naipe_base):
+    seat = {nome: i for i, nome in enumerate(ordem)}
+    maos_mask = tuple(mao_to_mask(maos[nome]) for nome in ordem)
+    mesa_int = tuple((seat[nome], CARTA_INT[carta]) for nome, carta in mesa)
+    naipe = None if naipe_base is None else NAIPE_LANE[naipe_base]
+    return seat, maos_mask, mesa_int, naipe
+
+
+def vazas_garantidas(ordem, maos, mesa, naipe_base, primeira_vaza, copas_quebrada, turn_idx,
+                     orcamento: int = ORCAMENTO_PADRAO):
+    """Quantas vazas cada jogador consegue forçar daqui até o fim da rodada.
+
+    Recebe os mesmos formatos do GameState (mãos e mesa com tuplas). Devolve
+    {nome: vazas} ou None se o orçamento de nós acabar.
+    """
+    _, maos_mask, mesa_int, naipe = _converter(ordem, maos, mesa, naipe_base)
+    resultado = {}
+    restante = orcamento
+    for eu, nome in enumerate(ordem):
+        busca = _Busca(len(ordem), eu, None, restante)
+        try:
+            resultado[nome] = busca.valor(
+                maos_mask, mesa_int, turn_idx, naipe, primeira_vaza, copas_quebrada, 0, -1, 53
+            )
+        except OrcamentoEsgotado:
+            return None
+        restante -= busca.nos
+    return resultado
+
+
+def melhor_carta(estado, nome, alvo: int, preferida=None, orcamento: int = ORCAMENTO_PADRAO):
+    """Carta de `nome` que deixa o total de vazas restantes o mais perto de `alvo`.
+
+    Em empate fica com `preferida` (a escolha da heurística), se ela estiver
+    entre as melhores. Devolve None se o orçamento acabar.
+    """
+    seat, maos_mask, mesa_int, naipe = _converter(estado.ordem, estado.maos, estado.mesa, estado.naipe_base)
+    eu = seat[nome]
+    busca = _Busca(len(estado.ordem), eu, max(alvo, 0), orcamento)
+    proximo = (eu + 1) % busca.n
+    notas = {}
+    try:
+        for c in busca.jogadas(maos_mask, mesa_int, eu, naipe, estado.primeira_vaza, estado.copas_quebrada):
+            lane = c // LANE
+            novas = maos_mask[:eu] + (maos_mask[eu] & ~(1 << c),) + maos_mask[eu + 1:]
+            notas[c] = busca.valor(
+                novas,
+                mesa_int + ((eu, c),),
+                proximo,
+                lane if naipe is None else naipe,
+                estado.primeira_vaza,
+                estado.copas_quebrada or (lane == TRUNFO_LANE and not estado.primeira_vaza),
+                0,
+                -53,
+                1,
+            )
+    except OrcamentoEsgotado:
+        return None
+    if not notas:
+        return None
+
+    melhor = max(notas.values())
+    if preferida is not None:
+        p = CARTA_INT[preferida]
+        # a preferida pode ter sido agrupada com uma equivalente da mesma sequência
+        for c, v in notas.items():
+            if v == melhor and (c == p or _equivalentes(c, p, maos_mask, mesa_int, eu)):
+                return preferida
+    return INT_CARTA[max(c for c, v in notas.items() if v == melhor)]
+
+
+def _equivalentes(a, b, maos_mask, mesa_int, eu):
+    if a // LANE != b // LANE or not (maos_mask[eu] >> b) & 1:
+        return False
+    lo, hi = min(a, b), max(a, b)
+    outras = 0
+    for seat, m in enumerate(maos_mask):
+        if seat != eu:
+            outras |= m
+    for _, c in mesa_int:
+        outras |= 1 << c
+    entre = ((1 << hi) - 1) & ~((1 << (lo + 1)) - 1) & LANE_MASK[a // LANE]
+    return not (outras & entre)
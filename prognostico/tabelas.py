@@ -0,0 +1,218 @@
+# prognostico/tabelas.py
+"""Tabelas de prognóstico geradas por simulação.
+
+Para cada (jogadores, cartas por jogador, modo) a tabela diz, para cada
+combinação de características da mão, quantas vazas saem com mais
+frequência. O bônus só vem com o prognóstico exato, então a tabela guarda a
+moda da distribuição e não a média. Células com poucas amostras ficam como
+SEM_DADO e o engine volta para a heurística.
+
+Gerar (ou completar) o arquivo:
+    python -m prognostico.tabelas --deals 1000000 --workers 0
+    python -m prognostico.tabelas --players 4 6 --modo dificil --deals 50000
+"""
+import argparse
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from prognostico import engine
+from prognostico.cards import TRUNFO
+from prognostico.engine import GameState, ordem_da_mesa
+
+ARQUIVO_PADRAO = os.path.join(os.path.dirname(__file__), "dados", "tabelas_prognostico.npz")
+MAX_JOGADORES = 10
+MIN_AMOSTRAS = 50
+SEM_DADO = 255
+LOTE = 1000
+
+# trunfos (0..6+), copas Q/K/A (0..3), ases e reis fora do trunfo (0..5+),
+# naipes curtos fora do trunfo (0..3), posição (primeiro, meio, último)
+FORMA = (7, 4, 6, 4, 3)
+_TRUNFOS_ALTOS = {"Q", "K", "A"}
+_ALTAS = {"K", "A"}
+
+
+def caracteristicas(mao, posicao: int, n_jogadores: int):
+    """Índice da mão na tabela."""
+    trunfos = altos = altas = 0
+    por_naipe = {"♠": 0, "♦": 0, "♣": 0}
+    for n, v in mao:
+        if n == TRUNFO:
+            trunfos += 1
+            if v in _TRUNFOS_ALTOS:
+                altos += 1
+        else:
+            por_naipe[n] += 1
+            if v in _ALTAS:
+                altas += 1
+    curtos = sum(1 for c in por_naipe.values() if c <= 1)
+    if posicao == 0:
+        pos = 0
+    elif posicao == n_jogadores - 1:
+        pos = 2
+    else:
+        pos = 1
+    return (min(trunfos, 6), altos, min(altas, 5), curtos, pos)
+
+
+def _chave(n_jogadores: int, cartas: int, hard_mode: bool) -> str:
+    return f"n{n_jogadores}_c{cartas}_{'dificil' if hard_mode else 'normal'}"
+
+
+class TabelasPrognostico:
+    """{chave: array uint8 com a forma FORMA}; vazia quando não há arquivo."""
+
+    def __init__(self, tabelas=None):
+        self.tabelas = tabelas or {}
+
+    def __len__(self):
+        return len(self.tabelas)
+
+    def palpite(self, mao, n_jogadores: int, posicao: int, hard_mode: bool):
+        """Vazas mais prováveis para a mão, ou None se a tabela não cobre o caso."""
+        tabela = self.tabelas.get(_chave(n_jogadores, len(mao), hard_mode))
+        if tabela is None:
+            return None
+        v = int(tabela[caracteristicas(mao, posicao, n_jogadores)])
+        return None if v == SEM_DADO else v
+
+    @classmethod
+    def carregar(cls, caminho: str = ARQUIVO_PADRAO):
+        """Lê o .npz; arquivo ausente ou de outra versão dá uma tabela vazia."""
+        if not os.path.exists(caminho):
+            return cls()
+        with np.load(caminho) as dados:
+            if tuple(dados["forma"]) != FORMA:
+                return cls()
+            return cls({k: dados[k] for k in dados.files if k != "forma"})
+
+    def salvar(self, caminho: str = ARQUIVO_PADRAO):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, "wb") as f:
+            np.savez_compressed(f, forma=np.array(FORMA), **self.tabelas)
+
+
+_padrao = None
+
+
+def padrao() -> TabelasPrognostico:
+    """Tabelas do ARQUIVO_PADRAO, carregadas uma única vez por processo."""
+    global _padrao
+    if _padrao is None:
+        _padrao = TabelasPrognostico.carregar()
+    return _padrao
+
+
+# =========================
+# GERAÇÃO
+# =========================
+def _simular_lote(args):
+    """Histograma (FORMA + vazas) de um lote de distribuições e acertos da heurística por célula."""
+    n_jogadores, cartas, hard_mode, deals, semente = args
+    rng = random.Random(semente)
+    nomes = [f"IA {i + 1}" for i in range(n_jogadores)]
+    hist = np.zeros(FORMA + (cartas + 1,), dtype=np.uint32)
+    acertos = np.zeros(FORMA, dtype=np.uint32)
+    for _ in range(deals):
+        estado = GameState(nomes, hard_mode=hard_mode, rng=rng)
+        engine.distribuir(estado, cartas)
+        indices = {}
+        for pos, nome in enumerate(ordem_da_mesa(nomes, estado.mao_da_rodada)):
+            mao = estado.maos[nome]
+            indices[nome] = caracteristicas(mao, pos, n_jogadores)
+            # sem n_jogadores o engine usa a heurística, não a tabela em construção
+            estado.prognosticos[nome] = engine.ai_prognostico(mao, cartas, hard_mode, rng=rng)
+        estado.progn_turn_idx = n_jogadores
+        engine.jogar_rodada(estado)
+        for nome in nomes:
+            vazas = estado.vazas_rodada[nome]
+            hist[indices[nome] + (vazas,)] += 1
+            acertos[indices[nome]] += estado.prognosticos[nome] == vazas
+    return _chave(n_jogadores, cartas, hard_mode), hist, acertos
+
+
+def _tarefas(jogadores, modos, deals, semente):
+    tarefas = []
+    for n in jogadores:
+        for cartas in range(1, 52 // n + 1):
+            for hard_mode in modos:
+                for lote, inicio in enumerate(range(0, deals, LOTE)):
+                    chave = _chave(n, cartas, hard_mode)
+                    s = random.Random(f"{semente}/{chave}/{lote}").getrandbits(64)
+                    tarefas.append((n, cartas, hard_mode, min(LOTE, deals - inicio), s))
+    return tarefas
+
+
+def gerar(jogadores, modos, deals: int, semente: int = 0, workers: int = 1):
+    """Simula `deals` distribuições por par.
+
+    Devolve ({chave: tabela}, {chave: (acertos da heurística, acertos com a
+    tabela, amostras)}), com os acertos medidos na própria amostra.
+    """
+    tarefas = _tarefas(jogadores, modos, deals, semente)
+    hists, acertos = {}, {}
+
+    def juntar(resultado):
+        chave, hist, a = resultado
+        if chave in hists:
+            hists[chave] += hist
+            acertos[chave] += a
+        else:
+            hists[chave] = hist
+            acertos[chave] = a
+
+    if workers <= 1 or len(tarefas) <= 1:
+        for tarefa in tarefas:
+            juntar(_simular_lote(tarefa))
+    else:
+        with Pool(min(workers, len(tarefas))) as pool:
+            for resultado in pool.imap_unordered(_simular_lote, tarefas, chunksize=4):
+                juntar(resultado)
+
+    tabelas, resumo = {}, {}
+    for chave, hist in hists.items():
+        amostras = hist.sum(axis=-1)
+        cobertas = amostras >= MIN_AMOSTRAS
+        tabela = np.where(cobertas, hist.argmax(axis=-1), SEM_DADO).astype(np.uint8)
+        tabelas[chave] = tabela
+        # células sem dado continuam com a heurística
+        com_tabela = hist.max(axis=-1)[cobertas].sum() + acertos[chave][~cobertas].sum()
+        resumo[chave] = (int(acertos[chave].sum()), int(com_tabela), int(amostras.sum()))
+    return tabelas, resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera as tabelas de prognóstico dos bots.")
+    parser.add_argument("--players", type=int, nargs="+", default=list(range(2, MAX_JOGADORES + 1)),
+                        help=f"quantidades de jogadores (padrão: 2 a {MAX_JOGADORES})")
+    parser.add_argument("--modo", choices=["normal", "dificil", "ambos"], default="ambos")
+    parser.add_argument("--deals", type=int, default=10000, help="distribuições por (jogadores, cartas, modo)")
+    parser.add_argument("--seed", type=int, default=0, help="semente mestre")
+    parser.add_argument("--workers", type=int, default=1, help="processos em paralelo (0 = todos os núcleos)")
+    parser.add_argument("--saida", default=ARQUIVO_PADRAO, help="arquivo .npz (chaves existentes são mantidas)")
+    args = parser.parse_args(argv)
+
+    if any(not 2 <= n <= 52 for n in args.players):
+        parser.error("--players precisa estar entre 2 e 52")
+    modos = {"normal": [False], "dificil": [True], "ambos": [False, True]}[args.modo]
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+
+    inicio = time.perf_counter()
+    tabelas, resumo = gerar(args.players, modos, args.deals, args.seed, workers)
+    existentes = TabelasPrognostico.carregar(args.saida)
+    existentes.tabelas.update(tabelas)
+    existentes.salvar(args.saida)
+
+    heur = sum(r[0] for r in resumo.values())
+    tab = sum(r[1] for r in resumo.values())
+    total = sum(r[2] for r in resumo.values()) or 1
+    print(f"Tabelas: {len(tabelas)} • Tempo: {time.perf_counter() - inicio:.1f}s • Arquivo: {args.saida}")
+    print(f"Acerto exato na amostra: heurística {heur / total:.1%} • com tabela {tab / total:.1%}")
+
+
+if __name__ == "__main__":
+    main()
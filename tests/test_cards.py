@@ -0,0 +1,103 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from prognostico import cards, engine
+from prognostico.cards import NAIPE_LANE, TRUNFO, criar_baralho
+
+
+def _validas_engine(mao, naipe, primeira, quebrada):
+    estado = SimpleNamespace(maos={"J": list(mao)}, naipe_base=naipe, primeira_vaza=primeira, copas_quebrada=quebrada)
+    return set(engine.cartas_validas_para_jogar(estado, "J"))
+
+
+def _validas_mask(mao, naipe, primeira, quebrada):
+    lane = None if naipe is None else NAIPE_LANE[naipe]
+    return set(cards.mask_to_mao(cards.cartas_validas_mask(cards.mao_to_mask(mao), lane, primeira, quebrada)))
+
+
+def _casos(rng):
+    baralho = criar_baralho()
+    copas = [c for c in baralho if c[0] == TRUNFO]
+    for _ in range(2000):
+        if rng.random() < 0.15:
+            # só copas: a proibição de ♥ não tem o que oferecer no lugar
+            mao = rng.sample(copas, rng.randint(1, 5))
+        else:
+            mao = rng.sample(baralho, rng.randint(1, 13))
+        naipe = rng.choice([None, None, "♠", "♦", "♣", "♥"])
+        primeira = rng.random() < 0.4
+        quebrada = rng.random() < 0.5
+        yield mao, naipe, primeira, quebrada
+
+
+def test_mascara_e_engine_dao_as_mesmas_cartas_validas():
+    vistos = set()
+    for mao, naipe, primeira, quebrada in _casos(random.Random(2)):
+        esperado = _validas_engine(mao, naipe, primeira, quebrada)
+        assert _validas_mask(mao, naipe, primeira, quebrada) == esperado, (mao, naipe, primeira, quebrada)
+        so_copas = all(c[0] == TRUNFO for c in mao)
+        if naipe is None and primeira and not so_copas:
+            vistos.add("primeira vaza sem ♥")
+        if naipe is None and not primeira and not quebrada and not so_copas:
+            vistos.add("♥ ainda não quebrada")
+        if naipe is None and not quebrada and so_copas:
+            vistos.add("só ♥ na mão")
+        if naipe is not None and not any(c[0] == naipe for c in mao) and primeira:
+            vistos.add("sem o naipe na primeira vaza")
+    assert vistos == {"primeira vaza sem ♥", "♥ ainda não quebrada", "só ♥ na mão", "sem o naipe na primeira vaza"}
+
+
+@pytest.mark.parametrize("primeira, quebrada, esperado", [
+    (True, False, {("♠", 2)}),
+    (True, True, {("♠", 2)}),
+    (False, False, {("♠", 2)}),
+    (False, True, {("♠", 2), ("♥", "A")}),
+])
+def test_abrir_vaza_com_copas(primeira, quebrada, esperado):
+    mao = [("♠", 2), ("♥", "A")]
+    assert _validas_engine(mao, None, primeira, quebrada) == esperado
+    assert _validas_mask(mao, None, primeira, quebrada) == esperado
+
+
+def test_sem_o_naipe_na_primeira_vaza_nao_descarta_copas():
+    mao = [("♦", 5), ("♥", 3)]
+    assert _validas_mask(mao, "♠", True, False) == {("♦", 5)}
+    assert _validas_mask(mao, "♠", False, False) == set(mao)
+
+
+def test_conversoes_de_carta():
+    baralho = criar_baralho()
+    assert cards.INT_CARTA == sorted(baralho, key=cards.peso_carta)
+    for carta in baralho:
+        idx = cards.carta_to_int(carta)
+        assert cards.int_to_carta(idx) == carta
+        assert cards.param_to_carta(cards.carta_to_param(carta)) == carta
+        assert cards.param_to_int(cards.int_to_param(idx)) == idx
+    assert cards.carta_to_param(("♥", 10)) == "10H"
+    assert cards.param_to_carta("QS") == ("♠", "Q")
+    for invalido in ("", None, "H", "1S", "11H", "AX", "AS ", "aS"):
+        assert cards.param_to_carta(invalido) is None
+        assert cards.param_to_int(invalido) is None
+
+
+def test_mascara_de_mao_ida_e_volta():
+    rng = random.Random(5)
+    baralho = criar_baralho()
+    for _ in range(200):
+        mao = rng.sample(baralho, rng.randint(0, 13))
+        mask = cards.mao_to_mask(mao)
+        assert cards.popcount(mask) == len(mao)
+        assert cards.mask_to_mao(mask) == sorted(mao, key=cards.peso_carta)
+
+
+def test_vencedor_da_vaza_mask_igual_ao_engine():
+    rng = random.Random(7)
+    baralho = criar_baralho()
+    for _ in range(500):
+        jogadas = rng.sample(baralho, rng.randint(2, 6))
+        mesa = [(f"J{i}", carta) for i, carta in enumerate(jogadas)]
+        naipe = jogadas[0][0]
+        mesa_int = [(nome, cards.CARTA_INT[carta]) for nome, carta in mesa]
+        assert cards.vencedor_da_vaza_mask(mesa_int, NAIPE_LANE[naipe]) == engine.vencedor_da_vaza(mesa, naipe)
@@ -0,0 +1,88 @@
+import pytest
+
+from prognostico import codec
+from prognostico.codec import CodecError, decode, encode
+from prognostico.memoria import MemoriaCartas
+from prognostico.salas import ROOM_STATE_KEYS
+
+ESTADOS = codec._estados_de_exemplo()
+
+
+def _ida_e_volta(state, key_versions=None):
+    volta, volta_kv = decode(encode(state, key_versions))
+    assert codec._igual(volta, state)
+    assert volta_kv == key_versions
+    return volta
+
+
+def test_exemplos_cobrem_todas_as_chaves():
+    for state in ESTADOS:
+        assert list(state) == ROOM_STATE_KEYS
+
+
+@pytest.mark.parametrize("state", ESTADOS, ids=lambda s: f"{len(s['nomes'])}j-{s['fase']}")
+def test_ida_e_volta_dos_estados_da_sala(state):
+    _ida_e_volta(state)
+    _ida_e_volta(state, {key: i for i, key in enumerate(state)})
+
+
+@pytest.mark.parametrize("key", ROOM_STATE_KEYS)
+def test_ida_e_volta_de_cada_chave_sozinha(key):
+    for state in ESTADOS:
+        _ida_e_volta({key: state[key]}, {key: 7})
+
+
+def test_valores_vazios():
+    _ida_e_volta({
+        "nomes": [], "humanos": [], "maos": {}, "mesa": [], "ordem": [], "trick_snapshot": [],
+        "prognosticos": {}, "pontos": {}, "pile_counts": {}, "players_online": [],
+        "fase": "", "naipe_base": None, "pending_play": None,
+    })
+    _ida_e_volta({"maos": {"Ana": [], "Bia": []}, "mesa": (), "sobras_monte": b""})
+    _ida_e_volta({})
+
+
+def test_textos_unicode_e_chaves_fora_da_lista():
+    nomes = ["José ♥", "日本語", "🂡 Ás", "Zoë"]
+    state = {
+        "nomes": nomes,
+        "prognosticos": {nome: i for i, nome in enumerate(nomes)},
+        "mesa": [(nomes[0], ("♥", "A")), (nomes[2], ("♣", 10))],
+        "winner_flash_name": nomes[1],
+        "chave nova ✓": {"ñ": [nomes[3], None, True]},
+    }
+    _ida_e_volta(state, dict.fromkeys(state, 3))
+
+
+def test_numeros():
+    _ida_e_volta({"pontos": {"a": 0, "b": -1, "c": 2**62, "d": -(2**62)}, "autoplay_last": -0.5, "trick_fly_until": 1e18})
+
+
+def test_memoria_de_cartas():
+    memoria = MemoriaCartas()
+    volta = _ida_e_volta({"memoria": memoria})["memoria"]
+    assert volta == memoria and volta is not memoria
+
+
+def test_tipo_sem_codificacao():
+    with pytest.raises(CodecError):
+        encode({"x": object()})
+
+
+@pytest.mark.parametrize("com_versoes", [False, True])
+def test_entrada_truncada(com_versoes):
+    state = ESTADOS[-1]
+    dados = encode(state, {key: 1 for key in state} if com_versoes else None)
+    for n in range(len(dados)):
+        with pytest.raises(CodecError):
+            decode(dados[:n])
+
+
+def test_sobra_no_fim_e_cabecalho_errado():
+    dados = encode(ESTADOS[0])
+    with pytest.raises(CodecError):
+        decode(dados + b"\x00")
+    with pytest.raises(CodecError):
+        decode(b"XX" + dados[2:])
+    with pytest.raises(CodecError):
+        decode(dados[:2] + bytes([codec.VERSAO + 1]) + dados[3:])
@@ -0,0 +1,17 @@
+from prognostico import fragmentos
+from prognostico.cards import criar_baralho
+
+
+def test_precarregar_cobre_as_chamadas_da_mao():
+    fragmentos.cache_clear()
+    fragmentos.precarregar()
+    info = fragmentos.card_btn_html.cache_info()
+    assert info.currsize == info.maxsize == 52 * len(fragmentos.VARIANTES_BOTAO)
+    # como o app chama: extra_class por nome
+    for carta in criar_baralho():
+        for extra in fragmentos.VARIANTES_BOTAO:
+            fragmentos.card_btn_html(carta, extra_class=extra)
+    depois = fragmentos.card_btn_html.cache_info()
+    assert depois.misses == info.misses
+    assert depois.currsize == info.currsize
+    fragmentos.cache_clear()
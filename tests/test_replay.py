@@ -0,0 +1,91 @@
+import io
+import random
+
+import pytest
+
+from prognostico import replay, servidor
+from prognostico.engine import GameState
+from prognostico.replay import ReplayError, Registro, juntar, ler, reproduzir
+
+NOMES = ["IA 1", "IA 2", "IA 3"]
+
+
+def _partida(registros, seed=7):
+    """Partida só de bots pelo worker (avancar_sala), anotada alternando entre `registros`.
+
+    Cada passo é uma "publicação" com a versão seguinte da sala, como o worker
+    de cada processo faz com o seu arquivo.
+    """
+    sala = servidor.nova_sala(NOMES, [], random.Random(seed), cartas_inicio=4)
+    arquivos = [io.BytesIO() for _ in range(registros)]
+    anotadores = [Registro(arquivo, GameState.from_mapping(sala)) for arquivo in arquivos]
+    agora = 0.0
+    versao = 1
+    while True:
+        registro = anotadores[versao % registros]
+        prazo = servidor.avancar_sala(sala, agora, registro)
+        if prazo is None and sala["fase"] != "fim":
+            servidor.aplicar_acao(sala, (servidor.PROXIMA_RODADA,), agora)
+        registro.gravar(versao)
+        versao += 1
+        if sala["fase"] == "fim":
+            break
+        if prazo is not None:
+            agora = prazo
+    return [arquivo.getvalue() for arquivo in arquivos], sala
+
+
+def test_reproduzir_refaz_a_partida_do_worker():
+    (dados,), sala = _partida(1)
+    semente, cartas_inicio, nomes, registros = ler(dados)
+    assert (semente, cartas_inicio, nomes) == (sala["semente_partida"], 4, NOMES)
+    assert any(tipo == replay.R_JOGADA for _, tipo, _, _ in registros)
+    assert reproduzir(dados).pontos == sala["pontos"]
+
+
+def test_juntar_arquivos_de_dois_processos():
+    partes, sala = _partida(2)
+    # sozinho, o arquivo de um processo não fecha a partida
+    with pytest.raises(ReplayError):
+        reproduzir(partes[0])
+    # a ordem dos arquivos não importa: os blocos vão pela versão da sala
+    assert reproduzir(juntar(partes[::-1])).pontos == sala["pontos"]
+    assert juntar(partes) == juntar(partes[::-1])
+
+
+def test_juntar_partidas_diferentes():
+    (a,), _ = _partida(1, seed=1)
+    (b,), _ = _partida(1, seed=2)
+    with pytest.raises(ReplayError):
+        juntar([a, b])
+
+
+def test_versao_fora_de_ordem():
+    (dados,), _ = _partida(1)
+    cabecalho = dados[:replay._cabecalho(dados)[3]]
+    with pytest.raises(ReplayError, match="juntar"):
+        reproduzir(cabecalho + bytes((replay.R_VERSAO, 2, replay.R_VERSAO, 1)))
+
+
+@pytest.mark.parametrize("ler_log", [reproduzir, ler, lambda dados: juntar([dados])])
+def test_log_truncado_ou_corrompido_levanta_replay_error(ler_log):
+    (dados,), _ = _partida(1)
+    # cortado na divisa de dois registros o log só é mais curto; fora dela, ReplayError
+    for corte in range(len(dados)):
+        try:
+            ler_log(dados[:corte])
+        except ReplayError:
+            pass
+    with pytest.raises(ReplayError):
+        ler_log(dados[:5])
+    with pytest.raises(ReplayError):
+        ler_log(dados[:-1])  # no meio do último R_PONTOS
+
+    rng = random.Random(0)
+    for _ in range(500):
+        corrompido = bytearray(dados)
+        corrompido[rng.randrange(len(corrompido))] = rng.randrange(256)
+        try:
+            ler_log(bytes(corrompido))
+        except ReplayError:
+            pass
@@ -0,0 +1,191 @@
+import time
+
+import pytest
+
+from prognostico import salas
+from prognostico.persistencia import SQLiteBackend
+from prognostico.salas import ConflitoVersao, RoomStore
+
+
+def _sessao(store, code):
+    sessao = {"room_snapshot": None}
+    salas.puxar(store, sessao, code)
+    return sessao
+
+
+def test_publish_incrementa_versao_e_guarda_versao_das_chaves():
+    store = RoomStore()
+    assert store.publish("S", {"fase": "prognostico", "pontos": {}}).version == 1
+    snap = store.publish("S", {"pontos": {"Ana": 3}}, esperado=1)
+    assert snap.version == 2
+    assert snap.state["fase"] == "prognostico"
+    assert snap.changed_since(1) == ["pontos"]
+
+
+def test_publish_com_versao_antiga_levanta_conflito():
+    store = RoomStore()
+    store.publish("S", {"fase": "jogo"})
+    store.publish("S", {"fase": "fim"}, esperado=1)
+    with pytest.raises(ConflitoVersao) as erro:
+        store.publish("S", {"fase": "prognostico"}, esperado=1)
+    assert erro.value.esperado == 1
+    assert erro.value.atual.version == 2
+    assert store.get("S").state["fase"] == "fim"
+    assert store.estatisticas()["conflitos"] == 1
+
+
+def test_publish_de_sala_nova_so_uma_vez():
+    store = RoomStore()
+    store.publish("S", {"fase": "jogo"}, esperado=0)
+    with pytest.raises(ConflitoVersao):
+        store.publish("S", {"fase": "jogo"}, esperado=0)
+
+
+def test_empurrar_junta_chaves_diferentes():
+    store = RoomStore()
+    store.publish("S", {key: None for key in salas.ROOM_STATE_KEYS})
+    ana, bia = _sessao(store, "S"), _sessao(store, "S")
+    ana["players_online"] = ["Ana"]
+    bia["neon_mode"] = True
+    assert salas.empurrar(store, ana, "S") == (True, set())
+    assert salas.empurrar(store, bia, "S") == (True, set())
+    state = store.get("S").state
+    assert state["players_online"] == ["Ana"]
+    assert state["neon_mode"] is True
+    assert bia["players_online"] == ["Ana"]
+
+
+def test_empurrar_relata_a_chave_que_os_dois_mudaram():
+    store = RoomStore()
+    store.publish("S", {key: None for key in salas.ROOM_STATE_KEYS})
+    ana, bia = _sessao(store, "S"), _sessao(store, "S")
+    ana["players_online"], ana["fast_mode"] = ["Ana"], True
+    bia["players_online"] = ["Bia"]
+    assert salas.empurrar(store, ana, "S") == (True, set())
+    assert salas.empurrar(store, bia, "S") == (True, {"players_online"})
+    assert store.get("S").state["players_online"] == ["Ana"]
+    assert bia["players_online"] == ["Ana"] and bia["fast_mode"] is True
+
+
+def test_cliente_nao_publica_estado_do_jogo():
+    store = RoomStore()
+    store.publish("S", dict({key: None for key in salas.ROOM_STATE_KEYS}, fase="jogo", pontos={"Ana": 0}))
+    ana = {"room_snapshot": None}
+    salas.puxar(store, ana, "S", jogador="Ana")
+    ana["fase"], ana["pontos"] = "fim", {"Ana": 99}
+    ana["players_online"] = ["Ana"]
+    assert salas.empurrar(store, ana, "S", jogador="Ana") == (True, set())
+    state = store.get("S").state
+    assert state["fase"] == "jogo" and state["pontos"] == {"Ana": 0}
+    assert state["players_online"] == ["Ana"]
+    # a sessão volta ao estado da sala
+    assert ana["fase"] == "jogo" and ana["pontos"] == {"Ana": 0}
+
+    with pytest.raises(salas.ChaveDoServidor):
+        store.publish("S", {"fase": "fim"}, cliente=True)
+    assert store.get("S").state["fase"] == "jogo"
+
+
+def test_empurrar_sem_base_nao_cria_sala():
+    store = RoomStore()
+    sessao = dict({key: None for key in salas.ROOM_STATE_KEYS}, fase="prognostico", room_snapshot=None)
+    assert salas.empurrar(store, sessao, "S", jogador="Ana") == (True, set())
+    assert store.get("S") is None
+
+
+def test_sqlite_confere_versao_entre_stores(tmp_path):
+    caminho = str(tmp_path / "salas.db")
+    a = RoomStore(backend=SQLiteBackend(caminho))
+    b = RoomStore(backend=SQLiteBackend(caminho))
+    try:
+        a.publish("S", {"fase": "prognostico"}, esperado=0)
+        assert b.get("S").version == 1
+        a.publish("S", {"fase": "jogo"}, esperado=1)
+        with pytest.raises(ConflitoVersao) as erro:
+            b.publish("S", {"fase": "fim"}, esperado=1)
+        assert erro.value.atual.state["fase"] == "jogo"
+        # sem esperado, a mudança vai por cima da versão do outro processo
+        assert b.publish("S", {"rodada": 2}).version == 3
+        assert a.backend.load("S").state == {"fase": "jogo", "rodada": 2}
+    finally:
+        a.close()
+        b.close()
+
+
+def test_sqlite_sala_nova_criada_por_dois_stores(tmp_path):
+    caminho = str(tmp_path / "salas.db")
+    a = RoomStore(backend=SQLiteBackend(caminho))
+    b = RoomStore(backend=SQLiteBackend(caminho))
+    try:
+        a.publish("S", {"fase": "prognostico"}, esperado=0)
+        with pytest.raises(ConflitoVersao):
+            b.publish("S", {"fase": "jogo"}, esperado=0)
+    finally:
+        a.close()
+        b.close()
+
+
+def test_limpar_so_tira_do_limite_salas_ociosas():
+    store = RoomStore(max_salas=2, ociosa_min=600, ttl=3600)
+    for code in ("A", "B", "C"):
+        store.publish(code, {"fase": "jogo"})
+    agora = max(store._acesso.values())
+    assert store.limpar(agora + 10) == 0
+    assert len(store) == 3
+    assert store.limpar(agora + 601) == 1
+    assert store.get("A") is None and store.get("C") is not None
+    assert store.limpar(agora + 3601) == 2
+    assert "maior_sala" not in store.resumo()
+
+
+def test_sessao_so_recebe_a_propria_mao():
+    store = RoomStore()
+    maos = {"Ana": [("♠", 2), ("♥", "A")], "Bia": [("♣", 3), ("♦", 4)]}
+    store.publish("S", dict({key: None for key in salas.ROOM_STATE_KEYS}, maos=maos))
+
+    bia = {"room_snapshot": None}
+    salas.puxar(store, bia, "S", jogador="Bia")
+    assert bia["maos"] == {"Ana": [None, None], "Bia": maos["Bia"]}
+
+    # a mão oculta nunca volta para a sala, nem uma mão alterada pela sessão
+    bia["players_online"] = ["Bia"]
+    bia["maos"]["Bia"] = [("♥", "A")]
+    assert salas.empurrar(store, bia, "S", jogador="Bia") == (True, set())
+    assert store.get("S").state["maos"] == maos
+    assert bia["maos"] == {"Ana": [None, None], "Bia": maos["Bia"]}
+
+
+def test_sessao_de_cliente_nunca_recebe_a_semente():
+    store = RoomStore()
+    store.publish("S", dict({key: None for key in salas.ROOM_STATE_KEYS}, semente_partida=123456789))
+    bia = {"room_snapshot": None}
+    salas.puxar(store, bia, "S", jogador="Bia")
+    assert bia["semente_partida"] is None
+
+    # nova partida: a semente muda na sala e continua fora da sessão
+    store.publish("S", {"semente_partida": 987654321, "rodada": 1})
+    assert salas.puxar(store, bia, "S", jogador="Bia")
+    assert bia["semente_partida"] is None and bia["rodada"] == 1
+    assert 987654321 not in bia.values()
+
+    # nem o None nem outro valor da sessão chegam à semente da sala
+    bia["players_online"] = ["Bia"]
+    assert salas.empurrar(store, bia, "S", jogador="Bia") == (True, set())
+    bia["semente_partida"] = 42
+    assert salas.empurrar(store, bia, "S", jogador="Bia") == (True, set())
+    assert store.get("S").state["semente_partida"] == 987654321
+    assert bia["semente_partida"] is None
+
+
+def test_get_de_codigos_desconhecidos_nao_acumula(tmp_path):
+    store = RoomStore(backend=SQLiteBackend(str(tmp_path / "salas.db")))
+    try:
+        for i in range(1000):
+            assert store.get(f"X{i}") is None
+        assert store._conferido == {} and store._acesso == {}
+        store.publish("S", {"fase": "jogo"})
+        store.get("S")
+        store.limpar(time.monotonic() + store.ttl + 1)
+        assert store._conferido == {} and store._acesso == {}
+    finally:
+        store.close()
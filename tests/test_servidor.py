@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from prognostico import engine, servidor
+from prognostico.engine import GameState, ordem_da_mesa
+from prognostico.salas import RoomStore
+from prognostico.servidor import JOGAR, NOVA_PARTIDA, PROGNOSTICO, PROXIMA_RODADA, AcaoInvalida, aplicar_acao
+
+NOMES = ["Ana", "IA 1", "IA 2"]
+
+
+@pytest.fixture
+def sala():
+    return servidor.nova_sala(NOMES, ["Ana"], random.Random(1), cartas_inicio=3)
+
+
+def _da_vez(sala):
+    return ordem_da_mesa(sala["nomes"], sala["mao_da_rodada"])[sala["progn_turn_idx"]]
+
+
+def _em_jogo(sala):
+    servidor.avancar_sala(sala, 0.0)
+    while sala["fase"] == "prognostico":
+        aplicar_acao(sala, (PROGNOSTICO, _da_vez(sala), 1), 0.0)
+        servidor.avancar_sala(sala, 0.0)
+    return sala
+
+
+def test_prognostico_aceito(sala):
+    nome = _da_vez(sala)
+    aplicar_acao(sala, (PROGNOSTICO, nome, 2), 0.0)
+    assert sala["prognosticos"][nome] == 2
+    assert sala["progn_turn_idx"] == 1
+
+
+def test_prognostico_fora_da_vez(sala):
+    outro = next(n for n in sala["nomes"] if n != _da_vez(sala))
+    with pytest.raises(AcaoInvalida):
+        aplicar_acao(sala, (PROGNOSTICO, outro, 1), 0.0)
+
+
+@pytest.mark.parametrize("valor", [-1, 4])
+def test_prognostico_fora_do_intervalo(sala, valor):
+    with pytest.raises(AcaoInvalida):
+        aplicar_acao(sala, (PROGNOSTICO, _da_vez(sala), valor), 0.0)
+
+
+def test_prognostico_fora_da_fase(sala):
+    _em_jogo(sala)
+    with pytest.raises(AcaoInvalida):
+        aplicar_acao(sala, (PROGNOSTICO, "Ana", 1), 0.0)
+
+
+def test_jogar_na_fase_de_prognostico(sala):
+    with pytest.raises(AcaoInvalida):
+        aplicar_acao(sala, (JOGAR, "Ana", sala["maos"]["Ana"][0]), 0.0)
+
+
+def test_jogar_fora_da_vez_e_carta_invalida(sala):
+    _em_jogo(sala)
+    assert sala["ordem"][sala["turn_idx"]] == "Ana"
+    with pytest.raises(AcaoInvalida):
+        aplicar_acao(sala, (JOGAR, "IA 1", sala["maos"]["IA 1"][0]), 0.0)
+    with pytest.raises(AcaoInvalida):
+        aplicar_acao(sala, (JOGAR, "Ana", sala["maos"]["IA 1"][0]), 0.0)
+    validas = engine.cartas_validas_para_jogar(GameState.from_mapping(sala), "Ana")
+    aplicar_acao(sala, (JOGAR, "Ana", validas[0]), 0.0)
+    assert validas[0] not in sala["maos"]["Ana"]
+    assert sala["mesa"][-1] == ("Ana", validas[0])
+
+
+def test_jogar_com_vaza_pendente(sala):
+    _em_jogo(sala)
+    sala["trick_pending"] = True
+    with pytest.raises(AcaoInvalida):
+        aplicar_acao(sala, (JOGAR, "Ana", sala["maos"]["Ana"][0]), 0.0)
+
+
+def test_proxima_rodada_antes_do_fim(sala):
+    _em_jogo(sala)
+    with pytest.raises(AcaoInvalida):
+        aplicar_acao(sala, (PROXIMA_RODADA,), 0.0)
+
+
+def test_acao_desconhecida(sala):
+    with pytest.raises(AcaoInvalida):
+        aplicar_acao(sala, ("trapacear", "Ana"), 0.0)
+
+
+def test_nova_partida_cria_a_sala():
+    sala = {}
+    aplicar_acao(sala, (NOVA_PARTIDA, "Ana", NOMES, ["Ana"], {"cartas_inicio": 3, "hard_mode": True}), 0.0)
+    assert sala["fase"] == "prognostico" and sala["started"]
+    assert all(len(mao) == 3 for mao in sala["maos"].values())
+    assert sala["hard_mode"] is True and sala["players_online"] == ["Ana"]
+    assert sala["semente_partida"] is not None
+
+
+def test_nova_partida_com_partida_em_andamento(sala):
+    with pytest.raises(AcaoInvalida):
+        aplicar_acao(sala, (NOVA_PARTIDA, "Ana", NOMES, ["Ana"], {}), 0.0)
+    sala["fase"] = "fim"
+    aplicar_acao(sala, (NOVA_PARTIDA, "Ana", NOMES, ["Ana"], {}), 0.0)
+    assert sala["fase"] == "prognostico" and sala["cartas_inicio"] == 52 // 3
+
+
+@pytest.mark.parametrize("acao", [
+    (NOVA_PARTIDA, "Bia", NOMES, ["Ana"], {}),
+    (NOVA_PARTIDA, "Ana", ["Ana"], ["Ana"], {}),
+    (NOVA_PARTIDA, "Ana", ["Ana", "Ana"], ["Ana"], {}),
+    (NOVA_PARTIDA, "Ana", NOMES, ["Ana"], {"cartas_inicio": 18}),
+    (NOVA_PARTIDA, "Ana", NOMES, ["Ana"], {"pontos": {"Ana": 50}}),
+])
+def test_nova_partida_invalida(acao):
+    with pytest.raises(AcaoInvalida):
+        aplicar_acao({}, acao, 0.0)
+
+
+def test_worker_cria_a_sala_com_nova_partida():
+    store = RoomStore()
+    srv = servidor.Servidor(store)
+    pedido = srv.enviar("S", (PROGNOSTICO, "Ana", 1))
+    assert pedido.esperar(5.0) and pedido.erro == "sala não encontrada"
+    pedido = srv.enviar("S", (NOVA_PARTIDA, "Ana", NOMES, ["Ana"], {"cartas_inicio": 3}))
+    assert pedido.esperar(5.0) and pedido.erro is None
+    state = store.get("S").state
+    assert state["nomes"] == NOMES and state["fase"] in ("prognostico", "jogo")
+    pedido = srv.enviar("S", (NOVA_PARTIDA, "Ana", NOMES, ["Ana"], {}))
+    assert pedido.esperar(5.0) and pedido.erro == "a sala já tem uma partida em andamento"
@@ -0,0 +1,103 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from prognostico import engine, solver
+from prognostico.cards import TRUNFO, criar_baralho
+
+
+def _forcadas(eu, ordem, maos, mesa, turno, naipe, primeira, quebrada):
+    """Minimax sem poda nem tabela, pelas regras do engine: vazas que `eu` garante contra todos."""
+    nome = ordem[turno]
+    if not maos[nome]:
+        return 0
+    estado = SimpleNamespace(maos=maos, naipe_base=naipe, primeira_vaza=primeira, copas_quebrada=quebrada)
+    fecha_vaza = len(mesa) + 1 == len(ordem)
+    valores = []
+    for carta in engine.cartas_validas_para_jogar(estado, nome):
+        depois = _jogar(ordem, maos, mesa, turno, naipe, primeira, quebrada, carta)
+        ganho = 1 if fecha_vaza and ordem[depois[3]] == eu else 0
+        valores.append(ganho + _forcadas(eu, *depois))
+    return max(valores) if nome == eu else min(valores)
+
+
+def _jogar(ordem, maos, mesa, turno, naipe, primeira, quebrada, carta):
+    """Posição depois de ordem[turno] jogar `carta` (recolhendo a vaza, se completou)."""
+    nome = ordem[turno]
+    maos = dict(maos)
+    maos[nome] = [c for c in maos[nome] if c != carta]
+    mesa = mesa + [(nome, carta)]
+    naipe = naipe if naipe is not None else carta[0]
+    quebrada = quebrada or (carta[0] == TRUNFO and not primeira)
+    turno = (turno + 1) % len(ordem)
+    if len(mesa) == len(ordem):
+        turno = ordem.index(engine.vencedor_da_vaza(mesa, naipe))
+        mesa, naipe, primeira = [], None, False
+    return ordem, maos, mesa, turno, naipe, primeira, quebrada
+
+
+def _final(rng):
+    """Final de rodada aleatório: até 4 cartas por mão, às vezes no meio de uma vaza."""
+    n = rng.randint(2, 4)
+    cartas = rng.randint(1, 4)
+    ordem = [f"J{i}" for i in range(n)]
+    baralho = criar_baralho()
+    rng.shuffle(baralho)
+    lider = rng.randrange(n)
+    jogaram = rng.randrange(n)
+    maos, mesa = {}, []
+    for i in range(n):
+        seat = (lider + i) % n
+        mao = [baralho.pop() for _ in range(cartas)]
+        if i < jogaram:
+            mesa.append((ordem[seat], mao.pop()))
+        maos[ordem[seat]] = mao
+    primeira = rng.random() < 0.3
+    quebrada = not primeira and rng.random() < 0.5
+    naipe = mesa[0][1][0] if mesa else None
+    return ordem, maos, mesa, naipe, primeira, quebrada, (lider + jogaram) % n
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_vazas_garantidas_igual_ao_minimax(seed):
+    ordem, maos, mesa, naipe, primeira, quebrada, turno = _final(random.Random(seed))
+    esperado = {
+        eu: _forcadas(eu, ordem, maos, mesa, turno, naipe, primeira, quebrada) for eu in ordem
+    }
+    obtido = solver.vazas_garantidas(ordem, maos, mesa, naipe, primeira, quebrada, turno, orcamento=10**7)
+    assert obtido == esperado
+
+
+def test_tabela_de_transposicao_entre_chamadas():
+    solver._tt.clear()
+    rng = random.Random(99)
+    while True:
+        ordem, maos, mesa, naipe, primeira, quebrada, turno = _final(rng)
+        if not mesa and len(maos[ordem[0]]) >= 3:
+            break
+    args = (ordem, maos, mesa, naipe, primeira, quebrada, turno)
+    primeira_chamada = solver.vazas_garantidas(*args, orcamento=10**7)
+    assert solver._tt
+    # a posição inteira já está na tabela: basta um nó por jogador
+    assert solver.vazas_garantidas(*args, orcamento=len(ordem)) == primeira_chamada
+    assert primeira_chamada == {
+        eu: _forcadas(eu, ordem, maos, mesa, turno, naipe, primeira, quebrada) for eu in ordem
+    }
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_jogadas_seguidas_reaproveitam_a_tabela(seed):
+    # cada chamada encontra na tabela as posições (e os limites alfa-beta) da anterior
+    rng = random.Random(seed)
+    ordem, maos, mesa, naipe, primeira, quebrada, turno = _final(rng)
+    posicao = (ordem, maos, mesa, turno, naipe, primeira, quebrada)
+    while posicao[1][ordem[posicao[3]]]:
+        ordem, maos, mesa, turno, naipe, primeira, quebrada = posicao
+        esperado = {
+            eu: _forcadas(eu, ordem, maos, mesa, turno, naipe, primeira, quebrada) for eu in ordem
+        }
+        assert solver.vazas_garantidas(ordem, maos, mesa, naipe, primeira, quebrada, turno, orcamento=10**7) == esperado
+        estado = SimpleNamespace(maos=maos, naipe_base=naipe, primeira_vaza=primeira, copas_quebrada=quebrada)
+        carta = rng.choice(engine.cartas_validas_para_jogar(estado, ordem[turno]))
+        posicao = _jogar(*posicao, carta)